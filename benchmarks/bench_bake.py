@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark the island bake pipeline stage by stage on procedural maps.
+Generates square maps (default 1k and 4k, 16k on request) with a controllable
+island count and coastline roughness, times each bake stage separately and
+compares the output sizes against the committed baseline and the timings
+against ones recorded on this machine.
+
+Usage:
+    python benchmarks/bench_bake.py
+    python benchmarks/bench_bake.py --sizes 1024 4096 16384 --roughness 0.5
+    python benchmarks/bench_bake.py --update-timings
+    python benchmarks/bench_bake.py --update-baseline
+"""
+
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from detect_islands import (calculate_waypoint_connections, create_island_label_map,
+                            create_water_mask_from_polygons, detect_water, find_island_contours,
+                            generate_collision_data, generate_waypoints, save_collision_data,
+                            save_collision_js, waypoint_dicts)
+
+# AIDEV-NOTE: Synthetic map colours sit well inside detect_water's rules: teal water
+# (teal_mask) and olive land (fails every water rule). Islands are placed one per
+# cell of a jittered grid so the requested count is what the bake sees (rarely merged).
+WATER_RGB = (30, 90, 110)
+LAND_RGB = (120, 110, 70)
+ISLANDS_PER_1K = 16  # Default island count per 1024x1024 of map area
+COASTLINE_HARMONICS = 24  # Sine terms in each island's radius-vs-angle profile
+ISLAND_RADIUS_RANGE = (0.12, 0.28)  # Base radius as a fraction of the grid cell
+
+# AIDEV-NOTE: The output counts are deterministic for a given map, so their baseline is
+# committed. Timings depend on the machine and are recorded locally (git-ignored).
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bake_baseline.json')
+DEFAULT_TIMINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bake_timings.json')
+REGRESSION_TOLERANCE = 1.25  # Stage is flagged when slower than baseline by this factor...
+REGRESSION_MIN_SECONDS = 0.05  # ...and by at least this much (ignores timer noise on tiny stages)
+STAGES = ('detect_water', 'find_island_contours', 'create_water_mask_from_polygons',
+          'create_island_label_map', 'generate_waypoints', 'calculate_waypoint_connections', 'export')
+
+def synthetic_map(size, islands, roughness, seed):
+    """
+    Procedural size x size RGB map with `islands` land blobs on open water.
+    Each coastline is a polar curve r(θ) = R * (1 + roughness * noise(θ)), where noise
+    is a random sum of harmonics normalised to [-1, 1]; roughness 0 gives discs.
+    """
+    rng = np.random.default_rng(seed)
+    img = np.empty((size, size, 3), dtype=np.uint8)
+    img[:] = WATER_RGB
+
+    grid = int(np.ceil(np.sqrt(islands)))
+    cell = size / grid
+    for slot in rng.choice(grid * grid, size=islands, replace=False):
+        cx = (slot % grid + rng.uniform(0.3, 0.7)) * cell
+        cy = (slot // grid + rng.uniform(0.3, 0.7)) * cell
+        radius = rng.uniform(*ISLAND_RADIUS_RANGE) * cell
+
+        # Higher harmonics get smaller amplitudes (rougher coast = more small bays)
+        harmonics = np.arange(2, COASTLINE_HARMONICS + 2)
+        amplitude = rng.uniform(-1, 1, len(harmonics)) / np.sqrt(harmonics)
+        amplitude /= np.abs(amplitude).sum()
+        phase = rng.uniform(0, 2 * np.pi, len(harmonics))
+
+        reach = int(np.ceil(radius * (1 + roughness))) + 1
+        x0, x1 = max(int(cx) - reach, 0), min(int(cx) + reach + 1, size)
+        y0, y1 = max(int(cy) - reach, 0), min(int(cy) + reach + 1, size)
+        dy, dx = np.mgrid[y0:y1, x0:x1].astype(np.float32)
+        dx -= cx
+        dy -= cy
+        theta = np.arctan2(dy, dx)
+        noise = np.zeros_like(theta)
+        for k, a, p in zip(harmonics, amplitude, phase):
+            noise += np.float32(a) * np.sin(k * theta + np.float32(p))
+        land = np.hypot(dx, dy) <= radius * (1 + roughness * noise)
+        img[y0:y1, x0:x1][land] = LAND_RGB
+
+    return img
+
+def time_stages(img_array):
+    """Run the bake stages once (bake logs suppressed). Returns ({stage: seconds}, counts)."""
+    height, width = img_array.shape[:2]
+    seconds = {}
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds[stage] = time.perf_counter() - start
+        return result
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+            tempfile.TemporaryDirectory() as out_dir:
+        image_water_mask = timed('detect_water', detect_water, img_array)
+        contours = timed('find_island_contours', find_island_contours, image_water_mask)
+        water_mask = timed('create_water_mask_from_polygons', create_water_mask_from_polygons,
+                           contours, width, height)
+        labels = timed('create_island_label_map', create_island_label_map, contours, width, height)
+        graph = timed('generate_waypoints', generate_waypoints, contours, water_mask, labels, width, height)
+        graph = timed('calculate_waypoint_connections', calculate_waypoint_connections, graph, water_mask)
+
+        def export():
+            data = generate_collision_data(contours, width, height, waypoint_dicts(graph))
+            save_collision_data(data, os.path.join(out_dir, 'collision.json'))
+            save_collision_js(data, os.path.join(out_dir, 'collision.js'))
+
+        timed('export', export)
+
+    counts = {
+        'islands': len(contours),
+        'points': sum(len(c) for c in contours),
+        'waypoints': len(graph['x']),
+        'edges': len(graph['edges'])
+    }
+    return seconds, counts
+
+def load_entries(path):
+    """{size: entry} recorded in a baseline or timings file, or {} if there is none yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def matching_entry(entries, size, params, kind):
+    """The entry recorded for this size, or None if missing or recorded on a different map."""
+    entry = entries.get(str(size))
+    if entry is not None and entry['map'] != params:
+        print(f"  ({kind} recorded with {entry['map']}, not comparing)")
+        return None
+    return entry
+
+def save_entries(entries, path):
+    """Write {size: entry} sorted by size, so re-recording gives a stable diff."""
+    with open(path, 'w') as f:
+        json.dump(dict(sorted(entries.items(), key=lambda item: int(item[0]))), f, indent=2)
+        f.write('\n')
+
+def compare(size, params, seconds, counts, baseline, timings, tolerance):
+    """
+    Print one size's stage table against its recorded timings and counts.
+    Returns the problems found: (slower stages, changed counts).
+    """
+    timed = matching_entry(timings, size, params, 'timings')
+    entry = matching_entry(baseline, size, params, 'baseline')
+
+    slower, changed = [], []
+    print(f"  {'stage':<32} {'time':>10} {'recorded':>10} {'ratio':>7}")
+    for stage in STAGES:
+        line = f"  {stage:<32} {seconds[stage] * 1000:>8.1f}ms"
+        if timed is not None and stage in timed['seconds']:
+            base = timed['seconds'][stage]
+            ratio = seconds[stage] / base if base > 0 else float('inf')
+            line += f" {base * 1000:>8.1f}ms {ratio:>6.2f}x"
+            if ratio > tolerance and seconds[stage] - base > REGRESSION_MIN_SECONDS:
+                line += "  SLOWER"
+                slower.append(f"{size}px {stage}: {ratio:.2f}x recorded time")
+        print(line)
+    print(f"  {'total':<32} {sum(seconds.values()) * 1000:>8.1f}ms")
+
+    print("  " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+    if entry is not None:
+        for name, count in counts.items():
+            if entry['counts'].get(name) != count:
+                changed.append(f"{size}px {name}: {entry['counts'].get(name)} -> {count} (output changed)")
+    return slower, changed
+
+def main():
+    """Benchmark entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the bake pipeline stage by stage on synthetic maps')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 4096],
+                       help='Square map sizes (px) to generate and bake (16384 needs several GB of RAM)')
+    parser.add_argument('--islands', type=int, default=None,
+                       help=f'Islands per map (default: {ISLANDS_PER_1K} per 1024x1024 of area)')
+    parser.add_argument('--roughness', type=float, default=0.35,
+                       help='Coastline roughness in [0, 0.9]: 0 = discs, higher = ragged bays and headlands')
+    parser.add_argument('--seed', type=int, default=1,
+                       help='Map generator seed')
+    parser.add_argument('--repeats', type=int, default=1,
+                       help='Bake each map this many times and keep the best time per stage')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                       help='Baseline output counts JSON to compare against (committed)')
+    parser.add_argument('--update-baseline', action='store_true',
+                       help="Record this run's output counts as the baseline for the sizes benchmarked")
+    parser.add_argument('--timings', default=DEFAULT_TIMINGS,
+                       help='Stage timings JSON recorded on this machine to compare against')
+    parser.add_argument('--update-timings', action='store_true',
+                       help="Record this run's stage timings for the sizes benchmarked")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                       help='Flag stages slower than baseline by more than this factor')
+    args = parser.parse_args()
+
+    if not 0 <= args.roughness <= 0.9:
+        parser.error('--roughness must be between 0 and 0.9')
+
+    baseline = load_entries(args.baseline)
+    if not baseline and not args.update_baseline:
+        print(f"No baseline at {args.baseline} (record one with --update-baseline)")
+    timings = load_entries(args.timings)
+    if not timings and not args.update_timings:
+        print(f"No timings at {args.timings} (record them on this machine with --update-timings)")
+
+    problems = []
+    for size in args.sizes:
+        islands = args.islands or max(1, round(ISLANDS_PER_1K * (size / 1024) ** 2))
+        params = {'islands': islands, 'roughness': args.roughness, 'seed': args.seed}
+        start = time.perf_counter()
+        img_array = synthetic_map(size, islands, args.roughness, args.seed)
+        print(f"\n{size}x{size} map, {islands} islands, roughness {args.roughness} "
+              f"(generated in {time.perf_counter() - start:.1f}s)")
+
+        best = None
+        for _ in range(args.repeats):
+            seconds, counts = time_stages(img_array)
+            best = seconds if best is None else {s: min(best[s], seconds[s]) for s in STAGES}
+        del img_array
+
+        slower, changed = compare(size, params, best, counts, baseline, timings, args.tolerance)
+        problems += ([] if args.update_timings else slower) + ([] if args.update_baseline else changed)
+        if args.update_baseline:
+            baseline[str(size)] = {'map': params, 'counts': counts}
+        if args.update_timings:
+            timings[str(size)] = {'map': params, 'seconds': best}
+
+    if args.update_baseline:
+        save_entries(baseline, args.baseline)
+        print(f"\nBaseline written to {args.baseline}")
+    if args.update_timings:
+        save_entries(timings, args.timings)
+        print(f"\nTimings written to {args.timings}")
+    if problems:
+        print("\nRegressions:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
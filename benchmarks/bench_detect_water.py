@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fused integer detect_water kernel against the original float rules.
+Checks the masks are bit-identical (optionally over every 24-bit colour), then
+reports time and peak traced memory for both on the real map and on larger
+maps tiled from it.
+
+Usage:
+    python benchmarks/bench_detect_water.py
+    python benchmarks/bench_detect_water.py --sizes 1024 4096 8192 --all-colours
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from detect_islands import detect_water, load_map
+
+REPEATS = 3  # Best-of timing runs per implementation and size
+
+def detect_water_reference(img_array):
+    """The original float32 / full-size-temporary rules, kept as the correctness reference."""
+    r, g, b = img_array[:,:,0], img_array[:,:,1], img_array[:,:,2]
+    brightness = (r.astype(np.float32) + g.astype(np.float32) + b.astype(np.float32)) / 3
+    is_snow_white = brightness > 140
+    is_snow_light = (r > 100) & (g > 100) & (b > 100)
+    is_snow = is_snow_white | is_snow_light
+    teal_mask = (b > 80) & (g > 60) & (r < 100) & (b > r + 15) & (g > r * 0.8) & (brightness < 130)
+    dark_water = (b > r + 15) & (b > g) & (b > 50) & (brightness < 130)
+    very_dark = (b > r + 10) & (b > g) & (r < 80) & (g < 100) & (b > 30) & (b < 150)
+    swamp = (b > 60) & (g > 50) & (b > r + 10) & (r < 120) & (brightness < 130)
+    return (teal_mask | dark_water | very_dark | swamp) & ~is_snow
+
+def colour_cube():
+    """Every 24-bit RGB colour once, as a 4096x4096 image."""
+    codes = np.arange(1 << 24, dtype=np.uint32)
+    rgb = np.stack([codes >> 16, (codes >> 8) & 255, codes & 255], axis=-1).astype(np.uint8)
+    return rgb.reshape(4096, 4096, 3)
+
+def tiled_map(img_array, size):
+    """Repeat the map to size x size pixels (keeps real colour statistics)."""
+    height, width = img_array.shape[:2]
+    reps = (-(-size // height), -(-size // width), 1)
+    return np.ascontiguousarray(np.tile(img_array, reps)[:size, :size])
+
+def measure(classify, img_array):
+    """Return (best seconds, peak traced MB, mask) for one classifier."""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        mask = classify(img_array)
+        best = min(best, time.perf_counter() - start)
+        del mask
+
+    tracemalloc.start()
+    mask = classify(img_array)
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return best, peak, mask
+
+def main():
+    """Benchmark entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark detect_water against the original rules')
+    parser.add_argument('--input', default='assets/map/world_map.png',
+                       help='Map image whose colours are tiled up to each size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 4096],
+                       help='Square map sizes (px) to benchmark')
+    parser.add_argument('--all-colours', action='store_true',
+                       help='Also verify the kernel over all 2^24 colours')
+    args = parser.parse_args()
+
+    if args.all_colours:
+        cube = colour_cube()
+        mismatches = int(np.count_nonzero(detect_water(cube) != detect_water_reference(cube)))
+        print(f"All 2^24 colours: {mismatches} mismatches")
+        if mismatches:
+            sys.exit(1)
+        del cube
+
+    base = load_map(args.input)
+    print(f"{'size':>7} {'reference':>18} {'fused':>18} {'speedup':>8} {'memory':>7}")
+    for size in args.sizes:
+        img_array = tiled_map(base, size)
+        ref_time, ref_peak, ref_mask = measure(detect_water_reference, img_array)
+        new_time, new_peak, new_mask = measure(detect_water, img_array)
+        if not np.array_equal(ref_mask, new_mask):
+            print(f"Error: masks differ at {size}px")
+            sys.exit(1)
+        print(f"{size:>6}² {ref_time * 1000:>8.1f}ms {ref_peak:>6.0f}MB "
+              f"{new_time * 1000:>8.1f}ms {new_peak:>6.0f}MB "
+              f"{ref_time / new_time:>7.1f}x {ref_peak / new_peak:>6.1f}x")
+
+if __name__ == '__main__':
+    main()
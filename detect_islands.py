@@ -6,8 +6,113 @@ Analyzes the world map to detect land masses and generate collision polygons.
 
 import numpy as np
 from PIL import Image
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import base64
+import contextlib
+import cProfile
+import csv
+import hashlib
+import heapq
+import inspect
+import itertools
 import json
+import math
+import os
 import sys
+import threading
+import time
+import tracemalloc
+
+# AIDEV-NOTE: --profile telemetry. Bake stages are consecutive: start_stage() closes the
+# previous stage, so each call site is one line and no pipeline code is re-indented.
+# Peak memory is what tracemalloc sees (Python objects and NumPy buffers; OpenCV's
+# internal allocations are not traced). Counters are thread-safe (tiled workers count
+# too). Everything is a no-op until enable() is called.
+PROFILE_REPORT_VERSION = 1
+BYTES_PER_MB = 1024 * 1024
+
+class BakeProfiler:
+    """Per-stage wall time, CPU time and peak traced memory plus work counters for --profile."""
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._current = None
+        self._use_cprofile = False
+        self._cprofiles = {}
+
+    def enable(self, use_cprofile=False):
+        """Start tracing; with use_cprofile every stage also runs under its own cProfile."""
+        self.enabled = True
+        self._use_cprofile = use_cprofile
+        self._started = (time.perf_counter(), time.process_time())
+        tracemalloc.start()
+
+    def count(self, name, amount=1):
+        """Add amount to a work counter."""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + int(amount)
+
+    def start_stage(self, name):
+        """End the current stage (if any) and start timing the named one."""
+        if not self.enabled:
+            return
+        self.end_stage()
+        tracemalloc.reset_peak()
+        profile = None
+        if self._use_cprofile:
+            profile = cProfile.Profile()
+            profile.enable()
+        self._current = (name, time.perf_counter(), time.process_time(),
+                         tracemalloc.get_traced_memory()[0], profile)
+
+    def end_stage(self):
+        """Record the current stage's measurements."""
+        if self._current is None:
+            return
+        name, wall_start, cpu_start, traced_start, profile = self._current
+        if profile is not None:
+            profile.disable()
+            self._cprofiles[name] = profile
+        peak = tracemalloc.get_traced_memory()[1]
+        self.stages.append({
+            'name': name,
+            'wall_seconds': round(time.perf_counter() - wall_start, 4),
+            'cpu_seconds': round(time.process_time() - cpu_start, 4),
+            'peak_traced_mb': round(peak / BYTES_PER_MB, 2),
+            'allocated_mb': round((peak - traced_start) / BYTES_PER_MB, 2)
+        })
+        self._current = None
+
+    def write_report(self, path, run_info, cprofile_path=None):
+        """End the last stage and write the JSON report (and the hottest stage's cProfile stats)."""
+        self.end_stage()
+        report = {
+            'version': PROFILE_REPORT_VERSION,
+            **run_info,
+            'total': {
+                'wall_seconds': round(time.perf_counter() - self._started[0], 4),
+                'cpu_seconds': round(time.process_time() - self._started[1], 4),
+                'peak_traced_mb': max((s['peak_traced_mb'] for s in self.stages), default=0.0)
+            },
+            'stages': self.stages,
+            'counters': dict(sorted(self.counters.items()))
+        }
+        if cprofile_path:
+            hottest = max(self.stages, key=lambda s: s['wall_seconds'])['name']
+            self._cprofiles[hottest].dump_stats(cprofile_path)
+            report['cprofile'] = {'stage': hottest, 'path': cprofile_path}
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        tracemalloc.stop()
+        print(f"Profile report saved to: {path}")
+        if cprofile_path:
+            print(f"cProfile stats for the '{hottest}' stage saved to: {cprofile_path}")
+
+PROFILER = BakeProfiler()
 
 def load_map(path):
     """Load the map image."""
@@ -18,52 +123,300 @@ def load_map(path):
         print(f"Error loading map: {e}")
         sys.exit(1)
 
-def detect_water(img_array):
+# AIDEV-NOTE: detect_water runs as a fused integer kernel over row chunks that reuses a
+# handful of small buffers instead of building ~10 full-size float/bool temporaries.
+# Each chunk is de-interleaved into contiguous r/g/b planes first (strided reads were
+# the main cost).
+# Brightness tests compare r+g+b against 3x the threshold, and g > 0.8r becomes
+# 5g > 4r. b > r + 15 / r + 10 are evaluated in uint8 and wrap for r > 240 / r > 245,
+# exactly like the original expressions on uint8 arrays. The mask is bit-identical
+# to the original float rules (checked over all 2^24 colours by
+# benchmarks/bench_detect_water.py).
+WATER_CHUNK_PIXELS = 1 << 16  # Pixels per chunk; keeps the scratch buffers cache-resident
+SNOW_BRIGHT_SUM = 3 * 140  # Snow: brightness > 140
+WATER_DIM_SUM = 3 * 130  # Water: brightness < 130
+
+def detect_water(img_array, out=None):
     """
     Create a binary mask where water=True, land=False.
     Water detection: Any blue-ish or teal colors (not green/brown land or white snow).
+    Writes into `out` (any (H, W) bool array, e.g. a memmap slice) when given.
     
     AIDEV-NOTE: Snow can have blue tint but is much brighter than water.
     Key distinction: Snow is bright (high overall luminosity), water is more saturated blue.
-    """
-    r, g, b = img_array[:,:,0], img_array[:,:,1], img_array[:,:,2]
-    
-    # Calculate brightness and saturation metrics
-    brightness = (r.astype(np.float32) + g.astype(np.float32) + b.astype(np.float32)) / 3
-    
-    # AIDEV-NOTE: Enhanced snow detection
-    # Snow is bright with high R, G, and B values, even if slightly blue-tinted
-    # Key: brightness must be high (>140) even if there's a blue tint
-    is_snow_white = brightness > 140  # Much brighter than water
     
-    # Additional snow check: light colors where no channel is too dark
-    # Snow typically has all channels above 100, even in shadows
-    is_snow_light = (r > 100) & (g > 100) & (b > 100)
-    
-    # Combine snow masks - if it's bright OR all channels are light, it's probably snow
-    is_snow = is_snow_white | is_snow_light
-    
-    # Method 1: Bright teal/cyan water (shallow water)
-    # Must be saturated enough and not too bright (not snow)
-    teal_mask = (b > 80) & (g > 60) & (r < 100) & (b > r + 15) & (g > r * 0.8) & (brightness < 130)
-    
-    # Method 2: Darker blue-teal deep water
-    # Blue must be dominant and not too bright
-    dark_water = (b > r + 15) & (b > g) & (b > 50) & (brightness < 130)
-    
-    # Method 3: Very dark water (almost black-blue)
-    very_dark = (b > r + 10) & (b > g) & (r < 80) & (g < 100) & (b > 30) & (b < 150)
-    
-    # Method 4: Swamp water (murky blue-green-brown)
-    # Has more blue than typical brown land, but not bright like snow
-    swamp = (b > 60) & (g > 50) & (b > r + 10) & (r < 120) & (brightness < 130)
-    
-    # Combine all water detection methods, then exclude snow
-    water_mask = (teal_mask | dark_water | very_dark | swamp) & ~is_snow
-    
-    return water_mask
+    Rules (brightness = (r + g + b) / 3):
+        snow      = brightness > 140 | (r > 100 & g > 100 & b > 100)
+        teal      = b > 80 & g > 60 & r < 100 & b > r + 15 & g > r * 0.8 & brightness < 130
+        dark      = b > r + 15 & b > g & b > 50 & brightness < 130
+        very_dark = b > r + 10 & b > g & r < 80 & g < 100 & b > 30 & b < 150
+        swamp     = b > 60 & g > 50 & b > r + 10 & r < 120 & brightness < 130
+        water     = (teal | dark | very_dark | swamp) & ~snow
+    """
+    height, width = img_array.shape[:2]
+    if out is None:
+        out = np.empty((height, width), dtype=bool)
+
+    rows = max(1, WATER_CHUNK_PIXELS // width)
+    size = rows * width
+    total = np.empty(size, dtype=np.int16)
+    shifted = np.empty(size, dtype=np.uint8)
+    water = np.empty(size, dtype=bool)
+    term = np.empty(size, dtype=bool)
+    test = np.empty(size, dtype=bool)
+    channels = np.empty((3, size), dtype=np.uint8)  # Contiguous r, g, b planes
+
+    for y0 in range(0, height, rows):
+        y1 = min(y0 + rows, height)
+        n = (y1 - y0) * width
+        pixels = np.asarray(img_array[y0:y1]).reshape(n, -1)
+        r, g, b = channels[0, :n], channels[1, :n], channels[2, :n]
+        np.copyto(channels[:, :n], pixels[:, :3].T)
+        total_n, shifted_n = total[:n], shifted[:n]
+        water_n, term_n, test_n = water[:n], term[:n], test[:n]
+
+        # dark: b > r + 15 & b > g & b > 50 & dim
+        np.add(r, 15, out=shifted_n)  # uint8, wraps like the original
+        np.greater(b, shifted_n, out=water_n)
+        np.greater(b, g, out=test_n)
+        np.logical_and(water_n, test_n, out=water_n)
+        np.greater(b, 50, out=test_n)
+        np.logical_and(water_n, test_n, out=water_n)
+
+        # teal: b > r + 15 & b > 80 & g > 60 & r < 100 & 5g > 4r & dim
+        np.greater(b, shifted_n, out=term_n)
+        np.greater(b, 80, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.greater(g, 60, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.less(r, 100, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.subtract(g, r, out=total_n, dtype=np.int16)  # 5g - 4r = 4(g - r) + g
+        np.left_shift(total_n, 2, out=total_n)
+        np.add(total_n, g, out=total_n, dtype=np.int16)
+        np.greater(total_n, 0, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.logical_or(water_n, term_n, out=water_n)
+
+        # swamp: b > r + 10 & b > 60 & g > 50 & r < 120 & dim
+        np.add(r, 10, out=shifted_n)  # uint8, wraps like the original
+        np.greater(b, shifted_n, out=term_n)
+        np.greater(b, 60, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.greater(g, 50, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.less(r, 120, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.logical_or(water_n, term_n, out=water_n)
+
+        # Everything so far requires dim; the dim test also rules out bright snow
+        np.add(r, g, out=total_n, dtype=np.int16)
+        np.add(total_n, b, out=total_n, dtype=np.int16)
+        np.less(total_n, WATER_DIM_SUM, out=test_n)
+        np.logical_and(water_n, test_n, out=water_n)
+
+        # very_dark: b > r + 10 & b > g & r < 80 & g < 100 & b > 30 & b < 150 & ~bright
+        np.greater(b, shifted_n, out=term_n)
+        np.greater(b, g, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.less(r, 80, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.less(g, 100, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.subtract(b, 31, out=shifted_n)  # 30 < b < 150  <=>  (b - 31) mod 256 < 119
+        np.less(shifted_n, 150 - 31, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.less_equal(total_n, SNOW_BRIGHT_SUM, out=test_n)
+        np.logical_and(term_n, test_n, out=term_n)
+        np.logical_or(water_n, term_n, out=water_n)
+
+        # Light snow: all channels > 100  <=>  min channel > 100
+        np.minimum(r, g, out=shifted_n)
+        np.minimum(shifted_n, b, out=shifted_n)
+        np.less_equal(shifted_n, 100, out=test_n)
+        np.logical_and(water_n, test_n, out=water_n)
+
+        out[y0:y1] = water_n.reshape(y1 - y0, width)
+
+    return out
+
+# AIDEV-NOTE: Colour lookup-table water classification. Every rule depends only on a
+# pixel's (r, g, b), so a rule set is baked once into a boolean table indexed by the
+# quantized colour and each pixel becomes one gather. Tables are built from
+# detect_water itself (bit-identical at 8 bits) or from a JSON rule set / palette for
+# seasonal map variants, and are cached on disk by StageCache.
+WATER_LUT_BITS = 8  # Bits per channel (8 = exact, 2^24-entry table)
+RULE_CHANNELS = ('r', 'g', 'b', 'brightness')  # Names a rule condition may use
+
+def _eval_rule_expr(node, channels):
+    """Evaluate an arithmetic rule expression AST over channel arrays (no eval)."""
+    import ast
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in channels:
+        return channels[node.id]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_eval_rule_expr(node.operand, channels)
+    if isinstance(node, ast.BinOp):
+        left = _eval_rule_expr(node.left, channels)
+        right = _eval_rule_expr(node.right, channels)
+        operators = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+        if type(node.op) in operators:
+            return operators[type(node.op)](left, right)
+    raise ValueError(f"unsupported rule expression: {ast.unparse(node)}")
+
+def eval_rule_condition(condition, channels):
+    """
+    Evaluate one condition string such as "b > r + 15" or "brightness < 130".
+    Channels are compared as plain numbers (no uint8 wraparound).
+    """
+    import ast
+
+    comparisons = {ast.Gt: np.greater, ast.GtE: np.greater_equal,
+                   ast.Lt: np.less, ast.LtE: np.less_equal}
+    tree = ast.parse(condition, mode='eval').body
+    if not (isinstance(tree, ast.Compare) and len(tree.ops) == 1 and type(tree.ops[0]) in comparisons):
+        raise ValueError(f"rule condition must be a single <, <=, > or >= comparison: {condition!r}")
+    left = _eval_rule_expr(tree.left, channels)
+    right = _eval_rule_expr(tree.comparators[0], channels)
+    return comparisons[type(tree.ops[0])](left, right)
+
+def load_water_rules(path):
+    """
+    Load and validate a JSON water rule set. Either
+        {"water": [[cond, ...], ...], "exclude": [[cond, ...], ...]}
+    (water if any water term has all its conditions true and no exclude term does), or
+        {"palette": {"water": [[r, g, b], ...], "land": [[r, g, b], ...]}}
+    (water if the nearest palette colour is a water colour).
+    """
+    try:
+        with open(path) as f:
+            rules = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading water rules: {e}")
+        sys.exit(1)
+
+    probe = {name: np.zeros(1) for name in RULE_CHANNELS}
+    try:
+        if 'palette' in rules:
+            for group in ('water', 'land'):
+                colours = np.asarray(rules['palette'][group], dtype=np.float64)
+                if colours.ndim != 2 or colours.shape[1] != 3 or len(colours) == 0:
+                    raise ValueError(f"palette '{group}' must be a non-empty list of [r, g, b]")
+        else:
+            if not rules.get('water'):
+                raise ValueError("rule set needs 'water' terms or a 'palette'")
+            for term in rules['water'] + rules.get('exclude', []):
+                for condition in term:
+                    eval_rule_condition(condition, probe)
+    except (KeyError, TypeError, ValueError, SyntaxError) as e:
+        print(f"Error: invalid water rules in {path}: {e}")
+        sys.exit(1)
+    return rules
+
+def evaluate_water_rules(rules, rgb):
+    """Classify an (N, 3) array of colours with a rule set from load_water_rules."""
+    if 'palette' in rules:
+        colours = rgb.astype(np.float64)
+        nearest = {}
+        for group in ('water', 'land'):
+            palette = np.asarray(rules['palette'][group], dtype=np.float64)
+            nearest[group] = np.min([((colours - c) ** 2).sum(axis=1) for c in palette], axis=0)
+        return nearest['water'] < nearest['land']
+
+    channels = {'r': rgb[:, 0].astype(np.float64),
+                'g': rgb[:, 1].astype(np.float64),
+                'b': rgb[:, 2].astype(np.float64)}
+    channels['brightness'] = (channels['r'] + channels['g'] + channels['b']) / 3
+
+    def any_term(terms):
+        hit = np.zeros(len(rgb), dtype=bool)
+        for term in terms:
+            hit |= np.logical_and.reduce([eval_rule_condition(c, channels) for c in term] +
+                                         [np.ones(len(rgb), dtype=bool)])
+        return hit
+
+    return any_term(rules['water']) & ~any_term(rules.get('exclude', []))
+
+def build_water_lut(rules, bits):
+    """
+    Build the water lookup table: entry (r >> s) << 2*bits | (g >> s) << bits | (b >> s),
+    with s = 8 - bits, classifies the colour at the centre of that quantization cell.
+    rules=None bakes detect_water itself.
+    """
+    shift = 8 - bits
+    levels = (np.arange(1 << bits, dtype=np.uint32) << shift) + ((1 << shift) >> 1)
+    codes = np.arange(1 << (3 * bits), dtype=np.uint32)
+    rgb = np.stack([levels[codes >> (2 * bits)],
+                    levels[(codes >> bits) & ((1 << bits) - 1)],
+                    levels[codes & ((1 << bits) - 1)]], axis=-1).astype(np.uint8)
+    if rules is None:
+        return detect_water(rgb.reshape(1 << (2 * bits), 1 << bits, 3)).ravel()
+    return evaluate_water_rules(rules, rgb)
+
+def load_water_lut(rules_path, bits, lut_cache):
+    """
+    Return the water LUT for a rule set file (None = detect_water's rules), building
+    it only if it is not already cached. The result is what classify_water takes.
+    """
+    rules = load_water_rules(rules_path) if rules_path else None
+    source = json.dumps(rules, sort_keys=True) if rules else 'detect_water'
+    key = lut_cache.key('water_lut', hashlib.sha256(source.encode()).hexdigest(), [bits])
+
+    def compute():
+        print(f"  Building {bits}-bit water lookup table ({rules_path or 'detect_water rules'})...")
+        return {'packed': np.packbits(build_water_lut(rules, bits))}
+
+    packed = lut_cache.run('water_lut', key, compute, 'npz')['packed']
+    return {'table': np.unpackbits(packed).astype(bool), 'bits': bits, 'key': key}
 
-def find_island_contours(water_mask, min_collision_area=800):
+def classify_water(img_array, water_lut=None, out=None):
+    """
+    Water mask through a lookup table from load_water_lut (one gather per pixel),
+    or through detect_water when water_lut is None. Writes into `out` when given.
+    """
+    PROFILER.count('pixels_classified', img_array.shape[0] * img_array.shape[1])
+    if water_lut is None:
+        return detect_water(img_array, out=out)
+
+    height, width = img_array.shape[:2]
+    if out is None:
+        out = np.empty((height, width), dtype=bool)
+    bits = water_lut['bits']
+
+    rows = max(1, WATER_CHUNK_PIXELS // width)
+    size = rows * width
+    channels = np.empty((3, size), dtype=np.uint8)
+    index = np.empty(size, dtype=np.uint32)
+    part = np.empty(size, dtype=np.uint32)
+    water = np.empty(size, dtype=bool)
+
+    for y0 in range(0, height, rows):
+        y1 = min(y0 + rows, height)
+        n = (y1 - y0) * width
+        pixels = np.asarray(img_array[y0:y1]).reshape(n, -1)
+        np.copyto(channels[:, :n], pixels[:, :3].T)
+        np.right_shift(channels[:, :n], 8 - bits, out=channels[:, :n])
+        index_n, part_n = index[:n], part[:n]
+        np.left_shift(channels[0, :n], 2 * bits, out=index_n, dtype=np.uint32)
+        np.left_shift(channels[1, :n], bits, out=part_n, dtype=np.uint32)
+        np.bitwise_or(index_n, part_n, out=index_n)
+        np.bitwise_or(index_n, channels[2, :n], out=index_n, dtype=np.uint32)
+        np.take(water_lut['table'], index_n, out=water[:n])
+        out[y0:y1] = water[:n].reshape(y1 - y0, width)
+
+    return out
+
+# AIDEV-NOTE: Contour simplification tuning (hand-tuned; --sweep explores alternatives).
+# Douglas-Peucker epsilon is a fraction of the island's perimeter, picked by area: the
+# first bucket whose minimum area the island exceeds (the last bucket catches the rest).
+MIN_COLLISION_AREA = 800  # Islands below this many px² are navigable and get no polygon
+CONTOUR_EPSILON_BUCKETS = ((50000, 0.0025), (10000, 0.004), (5000, 0.012), (0, 0.018))  # (area above, epsilon)
+KINK_DOT_THRESHOLD = 0.92  # |cos| between edges above which a short-edged vertex is a kink (~23°)
+
+def find_island_contours(water_mask, min_collision_area=MIN_COLLISION_AREA,
+                         epsilon_buckets=CONTOUR_EPSILON_BUCKETS, kink_threshold=KINK_DOT_THRESHOLD):
     """
     Find contours of land masses (inverse of water).
     Returns list of contours where each contour is a list of (x, y) points.
@@ -73,6 +426,7 @@ def find_island_contours(water_mask, min_collision_area=800):
         min_collision_area: Minimum area (pixels) for collision islands.
                            Islands smaller than this are excluded from collision
                            (e.g., small rocks, buoys that shouldn't block navigation)
+        epsilon_buckets, kink_threshold: simplification tuning (see AIDEV-NOTE above)
     """
     try:
         import cv2
@@ -91,13 +445,30 @@ def find_island_contours(water_mask, min_collision_area=800):
         cv2.CHAIN_APPROX_SIMPLE  # Compress contours
     )
     
+    return simplify_island_contours(contours, min_collision_area, epsilon_buckets, kink_threshold)
+
+def simplify_island_contours(contours, min_collision_area, epsilon_buckets=CONTOUR_EPSILON_BUCKETS,
+                             kink_threshold=KINK_DOT_THRESHOLD):
+    """
+    Filter and simplify raw OpenCV contours (findContours order and format) into
+    collision polygons: drops artifacts and small islands, then applies
+    Douglas-Peucker, convex hulls for small islands and kink removal.
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for contour simplification.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+    
+    PROFILER.count('contours_found', len(contours))
+
     # Convert contours to list of coordinate lists
-    island_contours = []
+    simplified_contours = []
+    kept_areas = []
     excluded_count = 0
     
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        
+    for contour, area in zip(contours, ring_areas([c.reshape(-1, 2) for c in contours]).tolist()):
         # Filter out tiny artifacts (< 100 pixels)
         if area < 100:
             continue
@@ -112,14 +483,10 @@ def find_island_contours(water_mask, min_collision_area=800):
         # Simplify contour to reduce points (Douglas-Peucker)
         # Keep large islands detailed, aggressively simplify small islands
         perimeter = cv2.arcLength(contour, True)
-        if area > 50000:  # Very large island - preserve good detail
-            epsilon = 0.0025 * perimeter
-        elif area > 10000:  # Large island (top ~6 islands)
-            epsilon = 0.004 * perimeter
-        elif area > 5000:  # Medium island - more aggressive
-            epsilon = 0.012 * perimeter  # Was 0.0055, now ~2x more aggressive
-        else:  # Small island - very aggressive
-            epsilon = 0.018 * perimeter  # Was 0.0075, now ~2.4x more aggressive
+        for bucket_area, fraction in epsilon_buckets:
+            if area > bucket_area:
+                break
+        epsilon = fraction * perimeter
         
         simplified = cv2.approxPolyDP(contour, epsilon, True)
         
@@ -127,326 +494,304 @@ def find_island_contours(water_mask, min_collision_area=800):
         # This reduces concave features and simplifies navigation
         if area < 3000:  # Small islands - make fully convex
             simplified = cv2.convexHull(simplified)
-        elif area < 5000:  # Medium-small islands - partial convex hull
-            # Blend between original and convex hull for smoother transition
-            hull = cv2.convexHull(simplified)
-            # Use hull if it's not too much larger than the original
-            hull_area = cv2.contourArea(hull)
-            simplified_area = cv2.contourArea(simplified)
-            if hull_area < simplified_area * 1.3:  # Only if hull adds <30% area
-                simplified = hull
-        
-        # Post-process: Remove kinks and zigzags from large islands
-        # A kink is when 3 consecutive points are nearly collinear or form a sharp angle
-        if area > 5000:  # Only for medium/large islands
-            points = simplified.reshape(-1, 2).tolist()
-            cleaned = []
-            n = len(points)
-            
-            for i in range(n):
-                p0 = points[(i - 1) % n]
-                p1 = points[i]
-                p2 = points[(i + 1) % n]
-                
-                # Calculate vectors
-                v1 = [p1[0] - p0[0], p1[1] - p0[1]]
-                v2 = [p2[0] - p1[0], p2[1] - p1[1]]
-                
-                # Calculate lengths
-                len1 = np.sqrt(v1[0]**2 + v1[1]**2)
-                len2 = np.sqrt(v2[0]**2 + v2[1]**2)
-                
-                # Skip if either segment is too short (degenerate)
-                if len1 < 1 or len2 < 1:
-                    continue
-                
-                # Normalize vectors
-                v1_norm = [v1[0] / len1, v1[1] / len1]
-                v2_norm = [v2[0] / len2, v2[1] / len2]
-                
-                # Calculate dot product (cos of angle)
-                dot = v1_norm[0] * v2_norm[0] + v1_norm[1] * v2_norm[1]
-                
-                # Keep point if:
-                # 1. Angle is significant (not nearly collinear or sharp reversal)
-                # 2. Both segments are reasonably long
-                # dot > 0.92 means angle < ~23 degrees (nearly straight line - remove)
-                # dot < -0.92 means angle > ~157 degrees (sharp reversal - remove)
-                # Only remove very obvious kinks - preserve most detail
-                keep_point = False
-                if abs(dot) < 0.92:
-                    # Significant angle - keep
-                    keep_point = True
-                elif len1 > 8 and len2 > 8:
-                    # Nearly straight but long segments - keep
-                    keep_point = True
-                
-                if keep_point:
-                    cleaned.append(p1)
-            
-            # Ensure we have at least 4 points
-            if len(cleaned) >= 4:
-                points = cleaned
-            else:
-                points = simplified.reshape(-1, 2).tolist()
-        else:
-            # Convert to list of [x, y] points
-            points = simplified.reshape(-1, 2).tolist()
-        
-        island_contours.append(points)
+        simplified_contours.append(simplified.reshape(-1, 2))
+        kept_areas.append(area)
+    
+    # Medium-small islands - partial convex hull: blend between original and convex
+    # hull for smoother transition, using the hull only if it adds <30% area
+    blend = [k for k, area in enumerate(kept_areas) if 3000 <= area < 5000]
+    hulls = [cv2.convexHull(simplified_contours[k]).reshape(-1, 2) for k in blend]
+    hull_areas = ring_areas(hulls)
+    simplified_areas = ring_areas([simplified_contours[k] for k in blend])
+    for k, hull, hull_area, simplified_area in zip(blend, hulls, hull_areas, simplified_areas):
+        if hull_area < simplified_area * 1.3:
+            simplified_contours[k] = hull
+    
+    # Post-process: Remove kinks and zigzags from medium/large islands
+    kinked = [k for k, area in enumerate(kept_areas) if area > 5000]
+    for k, cleaned in zip(kinked, remove_kinks([simplified_contours[k] for k in kinked], kink_threshold)):
+        simplified_contours[k] = cleaned
+    island_contours = [points.tolist() for points in simplified_contours]
     
     if excluded_count > 0:
         print(f"  Excluded {excluded_count} small island(s) from collision (navigable)")
     
     return island_contours
 
-def point_in_polygon(point, polygon):
+def ring_neighbours(lengths):
     """
-    Ray casting algorithm to determine if point is inside polygon.
-    point: (x, y) tuple
-    polygon: list of [x, y] points
+    Flat (prev, next) indices for closed rings stored back to back, one length per ring:
+    element i's ring neighbours are prev[i] and next[i] (wrapping within its ring).
     """
-    x, y = point
-    n = len(polygon)
-    inside = False
-    
-    p1x, p1y = polygon[0]
-    for i in range(1, n + 1):
-        p2x, p2y = polygon[i % n]
-        if y > min(p1y, p2y):
-            if y <= max(p1y, p2y):
-                if x <= max(p1x, p2x):
-                    if p1y != p2y:
-                        xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                    if p1x == p2x or x <= xinters:
-                        inside = not inside
-        p1x, p1y = p2x, p2y
-    
-    return inside
+    lengths = np.asarray(lengths, dtype=np.int64)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    ring_len = np.repeat(lengths, lengths)
+    position = np.arange(len(starts)) - starts
+    return starts + (position - 1) % ring_len, starts + (position + 1) % ring_len
 
-def find_nearest_water(x, y, water_mask, max_search_distance=50):
-    """
-    Find the nearest water pixel to the given position.
-    Returns (water_x, water_y) or None if no water found within max_search_distance.
-    """
-    # Quick check - already on water?
-    if (0 <= int(x) < water_mask.shape[1] and 
-        0 <= int(y) < water_mask.shape[0] and
-        water_mask[int(y), int(x)]):
-        return (x, y)
-    
-    # Search in expanding circles
-    for radius in range(1, max_search_distance + 1, 2):
-        # Sample points around circle
-        num_samples = max(8, radius * 2)
-        for i in range(num_samples):
-            angle = (i / num_samples) * 2 * np.pi
-            test_x = int(x + np.cos(angle) * radius)
-            test_y = int(y + np.sin(angle) * radius)
-            
-            # Check bounds
-            if 0 <= test_x < water_mask.shape[1] and 0 <= test_y < water_mask.shape[0]:
-                if water_mask[test_y, test_x]:
-                    return (test_x, test_y)
-    
-    return None
+def ring_areas(rings):
+    """
+    Unsigned shoelace areas of integer rings ((n, 2) arrays), all in one batch. Exact
+    integer sums, so each matches cv2.contourArea bit for bit.
+    """
+    lengths = np.array([len(ring) for ring in rings], dtype=np.int64)
+    if not len(lengths):
+        return np.zeros(0)
+    points = np.concatenate(rings).astype(np.int64)
+    _, following = ring_neighbours(lengths)
+    cross = points[:, 0] * points[following, 1] - points[following, 0] * points[:, 1]
+    sums = np.add.reduceat(cross, np.cumsum(lengths) - lengths)
+    return np.abs(np.where(lengths > 0, sums, 0)) * 0.5
 
-def can_see_neighbors(waypoint_x, waypoint_y, prev_wp, next_wp, water_mask, map_width, map_height, visibility_pct=0.90):
+def remove_kinks(polygons, kink_threshold):
     """
-    Check if a waypoint can see both its neighbors (line-of-sight over water).
-    Returns True if both connections are clear.
-    
-    AIDEV-NOTE: Checks visibility_pct (default 90%) of the way to neighbor to be more forgiving.
-    Neighbors might be on/near coastline, so we don't need perfect visibility to their exact position.
+    Remove kinks and zigzags from polygons ((n, 2) int arrays), all vertices in one batch.
+    A kink is when 3 consecutive points are nearly collinear or form a sharp angle.
+    Returns the cleaned polygons; a polygon left with fewer than 4 points is kept as is.
     """
-    for neighbor in [prev_wp, next_wp]:
-        if neighbor is None:
-            continue
-        
-        dx = neighbor['x'] - waypoint_x
-        dy = neighbor['y'] - waypoint_y
-        distance = np.sqrt(dx * dx + dy * dy)
-        
-        if distance < 1:
-            continue
-        
-        # Sample along line to visibility_pct of the distance
-        # Sample every ~5 pixels
-        num_samples = int((distance * visibility_pct) / 5) + 1
-        for i in range(1, num_samples + 1):
-            # t ranges from (1/num_samples)*visibility_pct to visibility_pct
-            t = (i / num_samples) * visibility_pct
-            test_x = int(waypoint_x + dx * t)
-            test_y = int(waypoint_y + dy * t)
-            
-            # Check bounds
-            if test_x < 0 or test_x >= map_width or test_y < 0 or test_y >= map_height:
-                return False
-            
-            # Check if on water
-            if not water_mask[test_y, test_x]:
-                return False
+    if not polygons:
+        return []
+    lengths = np.array([len(polygon) for polygon in polygons], dtype=np.int64)
+    points = np.concatenate(polygons).astype(np.int64)
+    prev, following = ring_neighbours(lengths)
+    
+    # Edge vectors into and out of each vertex, and their lengths
+    v1 = points - points[prev]
+    v2 = points[following] - points
+    len1 = np.sqrt(v1[:, 0] ** 2 + v1[:, 1] ** 2)
+    len2 = np.sqrt(v2[:, 0] ** 2 + v2[:, 1] ** 2)
+    
+    # Skip if either segment is too short (degenerate)
+    sound = (len1 >= 1) & (len2 >= 1)
+    len1_safe = np.where(sound, len1, 1.0)
+    len2_safe = np.where(sound, len2, 1.0)
+    
+    # Dot product of the normalized vectors (cos of angle)
+    dot = (v1[:, 0] / len1_safe) * (v2[:, 0] / len2_safe) + (v1[:, 1] / len1_safe) * (v2[:, 1] / len2_safe)
+    
+    # Keep point if:
+    # 1. Angle is significant (not nearly collinear or sharp reversal)
+    # 2. Both segments are reasonably long
+    # dot > kink_threshold means angle < ~23 degrees (nearly straight line - remove)
+    # dot < -kink_threshold means angle > ~157 degrees (sharp reversal - remove)
+    # Only remove very obvious kinks - preserve most detail
+    keep = sound & ((np.abs(dot) < kink_threshold) | ((len1 > 8) & (len2 > 8)))
     
-    return True
+    # Ensure we have at least 4 points
+    ends = np.cumsum(lengths)
+    kept_counts = np.add.reduceat(keep, ends - lengths)
+    return [polygon[keep[end - len(polygon):end]] if kept >= 4 else polygon
+            for polygon, end, kept in zip(polygons, ends.tolist(), kept_counts.tolist())]
 
-def push_waypoint_out(waypoint_x, waypoint_y, push_distance, island_contour, water_mask, map_width, map_height, prev_wp=None, next_wp=None, debug_island=None, wp_index=None, visibility_pct=0.90):
+# AIDEV-NOTE: Line-of-sight sampling constants shared by every LOS check in the bake
+LOS_SAMPLE_INTERVAL = 5  # Sample the water mask every 5 pixels along a segment
+LOS_BATCH_SAMPLES = 1 << 22  # Max mask samples gathered at once (bounds temporary memory)
+MAX_CONNECTION_DISTANCE = 300  # Don't connect waypoints more than 300px apart
+
+def batch_line_of_sight(x0, y0, x1, y1, water_mask, reach=1.0, include_start=True, include_end=True):
     """
-    Push a waypoint away from the island coastline.
-    Returns (new_x, new_y, success) where success indicates if the push was valid.
-    
-    Push direction is calculated by bisecting the angle between the vectors
-    to the previous and next waypoints, creating a natural "bulge outward"
-    that follows the coastline shape.
+    Check line-of-sight over water for many segments at once.
+    Returns a boolean array (True = every sample along the segment is water).
+
+    Each segment is sampled exactly like the original per-pixel loops:
+        num_samples = int(length * reach / LOS_SAMPLE_INTERVAL) + 1
+        t = (k / num_samples) * reach
+    where k runs from 0 (or 1 if not include_start) to num_samples
+    (or num_samples - 1 if not include_end). Sample points are truncated to
+    pixels and anything outside the map blocks line-of-sight.
+
+    AIDEV-NOTE: Samples for all segments are gathered from water_mask in one
+    fancy-index per batch. Float math mirrors the scalar loops operation for
+    operation so results are bit-identical to the old per-pair checks.
+    """
+    x0 = np.asarray(x0, dtype=np.float64).ravel()
+    y0 = np.asarray(y0, dtype=np.float64).ravel()
+    dx = np.asarray(x1, dtype=np.float64).ravel() - x0
+    dy = np.asarray(y1, dtype=np.float64).ravel() - y0
+
+    distance = np.sqrt(dx * dx + dy * dy)
+    num_samples = (distance * reach / LOS_SAMPLE_INTERVAL).astype(np.int64) + 1
+    first_k = 0 if include_start else 1
+    last_k = num_samples if include_end else num_samples - 1
+    counts = np.maximum(last_k - first_k + 1, 0)
+    PROFILER.count('los_segments', len(x0))
+    PROFILER.count('los_samples', counts.sum())
+
+    visible = np.ones(len(x0), dtype=bool)
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(x0):
+        # Grow the batch until it holds LOS_BATCH_SAMPLES samples (at least one segment)
+        base = ends[start] - counts[start]
+        stop = int(np.searchsorted(ends, base + LOS_BATCH_SAMPLES, side='right'))
+        stop = max(stop, start + 1)
+
+        batch_counts = counts[start:stop]
+        seg = np.repeat(np.arange(start, stop), batch_counts)
+        offsets = ends[start:stop] - batch_counts - base
+        k = np.arange(len(seg)) - np.repeat(offsets, batch_counts) + first_k
+
+        t = (k / num_samples[seg]) * reach
+        test_x = (x0[seg] + dx[seg] * t).astype(np.int64)
+        test_y = (y0[seg] + dy[seg] * t).astype(np.int64)
+
+        blocked = ~_mask_samples(water_mask, test_x, test_y)
+        blocked_counts = np.bincount(seg[blocked] - start, minlength=stop - start)
+        visible[start:stop] = blocked_counts == 0
+        start = stop
+
+    return visible
+
+def _mask_samples(mask, xs, ys):
+    """Gather mask values at integer pixel arrays; out-of-bounds samples read as False."""
+    height, width = mask.shape[:2]
+    in_bounds = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    values = mask[np.clip(ys, 0, height - 1), np.clip(xs, 0, width - 1)]
+    return in_bounds & values
+
+def pushed_positions_valid(test_x, test_y, prev_x, prev_y, next_x, next_y, water_mask, visibility_pct):
+    """
+    Check pushed waypoint positions (int arrays): each must be on the map, on water, and
+    see both neighbours over water for visibility_pct of the way (a neighbour sitting on
+    the position itself is skipped). Returns a boolean array.
+    """
+    valid = _mask_samples(water_mask, test_x, test_y)
+    for neighbour_x, neighbour_y in ((prev_x, prev_y), (next_x, next_y)):
+        check = np.flatnonzero(valid & ((neighbour_x != test_x) | (neighbour_y != test_y)))
+        # Sample every ~5 pixels out to visibility_pct of each distance (skip the waypoint itself)
+        visible = batch_line_of_sight(test_x[check], test_y[check], neighbour_x[check], neighbour_y[check],
+                                      water_mask, reach=visibility_pct, include_start=False)
+        valid[check[~visible]] = False
+    return valid
+
+def push_waypoints_out(wp_x, wp_y, prev_x, prev_y, next_x, next_y, centroid_x, centroid_y,
+                       push_distance, water_mask, visibility_pct):
+    """
+    Push waypoints away from their island's coastline (int arrays, one entry per
+    waypoint; centroids are per waypoint). Returns (new_x, new_y, success); failed
+    pushes keep their position.
     
-    Push is valid if:
-    - New position is on water
-    - Can still see both neighbors (if provided)
+    Push direction bisects the angle between the vectors to the previous and next
+    waypoints, creating a natural "bulge outward" that follows the coastline shape.
+    Where that fails (or the pushed position is invalid) the waypoint is pushed away
+    from the island centroid instead. A push is valid if the new position is on water
+    and can still see both neighbours (pushed_positions_valid).
     """
-    # Calculate push direction based on angle bisector between neighbors
-    if prev_wp is not None and next_wp is not None:
-        # Vector from current to previous
-        v1_x = prev_wp['x'] - waypoint_x
-        v1_y = prev_wp['y'] - waypoint_y
-        v1_len = np.sqrt(v1_x * v1_x + v1_y * v1_y)
-        
-        # Vector from current to next
-        v2_x = next_wp['x'] - waypoint_x
-        v2_y = next_wp['y'] - waypoint_y
-        v2_len = np.sqrt(v2_x * v2_x + v2_y * v2_y)
-        
-        # Normalize both vectors
-        if v1_len > 0.1:
-            v1_x /= v1_len
-            v1_y /= v1_len
-        else:
-            v1_x, v1_y = 0, 0
-        
-        if v2_len > 0.1:
-            v2_x /= v2_len
-            v2_y /= v2_len
-        else:
-            v2_x, v2_y = 0, 0
-        
-        # Add normalized vectors to get angle bisector
-        bisect_x = v1_x + v2_x
-        bisect_y = v1_y + v2_y
-        bisect_len = np.sqrt(bisect_x * bisect_x + bisect_y * bisect_y)
-        
-        if bisect_len > 0.1:
-            # Normalize bisector
-            bisect_x /= bisect_len
-            bisect_y /= bisect_len
-            
-            # AIDEV-NOTE: Use cross product to determine if corner is convex or concave
-            # OpenCV findContours returns contours in a consistent winding order.
-            # For exterior contours with RETR_EXTERNAL, the winding is counter-clockwise.
-            # 
-            # Edge vectors (in traversal order):
-            # e1 = current - previous (edge coming into current point)
-            # e2 = next - current (edge leaving current point)
-            # 
-            # Cross product: e1 × e2 = e1_x * e2_y - e1_y * e2_x
-            # - Positive cross product = left turn = convex corner (bulging outward)
-            #   → Angle bisector points inward, so negate it to push outward
-            # - Negative cross product = right turn = concave corner (indented)
-            #   → Angle bisector points outward, use as-is
-            
-            # Calculate edge vectors (in traversal order)
-            e1_x = waypoint_x - prev_wp['x']
-            e1_y = waypoint_y - prev_wp['y']
-            e2_x = next_wp['x'] - waypoint_x
-            e2_y = next_wp['y'] - waypoint_y
-            
-            # Cross product (z-component of 3D cross product)
-            cross = e1_x * e2_y - e1_y * e2_x
-            
-            # For CCW polygon: negative cross = convex = bisector points inward
-            # So negate the bisector to push outward
-            # (Most of the coastline is convex, concave corners are rare indentations)
-            if cross < 0:
-                bisect_x = -bisect_x
-                bisect_y = -bisect_y
-            
-            # Use bisector as push direction
-            dx = bisect_x
-            dy = bisect_y
-        else:
-            # Bisector is zero (neighbors are opposite), fall back to centroid method
-            centroid_x = sum(p[0] for p in island_contour) / len(island_contour)
-            centroid_y = sum(p[1] for p in island_contour) / len(island_contour)
-            dx = waypoint_x - centroid_x
-            dy = waypoint_y - centroid_y
-            dist = np.sqrt(dx * dx + dy * dy)
-            if dist > 0.1:
-                dx /= dist
-                dy /= dist
-            else:
-                return (waypoint_x, waypoint_y, False)
-    else:
-        # No neighbors provided, fall back to centroid method
-        centroid_x = sum(p[0] for p in island_contour) / len(island_contour)
-        centroid_y = sum(p[1] for p in island_contour) / len(island_contour)
-        dx = waypoint_x - centroid_x
-        dy = waypoint_y - centroid_y
-        dist = np.sqrt(dx * dx + dy * dy)
-        if dist > 0.1:
-            dx /= dist
-            dy /= dist
-        else:
-            return (waypoint_x, waypoint_y, False)
-    
-    # Helper function to validate a pushed position with detailed failure reason
-    def validate_position(test_x, test_y):
-        # Check bounds
-        if test_x < 0 or test_x >= map_width or test_y < 0 or test_y >= map_height:
-            return (False, 'out_of_bounds')
-        # Check if on water
-        if not water_mask[test_y, test_x]:
-            return (False, 'on_land')
-        # Check if can still see neighbors (use custom visibility percentage)
-        if not can_see_neighbors(test_x, test_y, prev_wp, next_wp, water_mask, map_width, map_height, visibility_pct):
-            return (False, 'lost_neighbor_visibility')
-        return (True, 'ok')
-    
-    # Try pushing using angle bisection direction
-    new_x = int(waypoint_x + dx * push_distance)
-    new_y = int(waypoint_y + dy * push_distance)
-    
-    bisect_valid, bisect_reason = validate_position(new_x, new_y)
-    if bisect_valid:
-        return (new_x, new_y, True)
+    # Normalised vectors to the previous and next waypoints (zero when nearly coincident)
+    v1_x, v1_y = prev_x - wp_x, prev_y - wp_y
+    v2_x, v2_y = next_x - wp_x, next_y - wp_y
+    v1_len = np.sqrt(v1_x * v1_x + v1_y * v1_y)
+    v2_len = np.sqrt(v2_x * v2_x + v2_y * v2_y)
+    zeros = np.zeros(len(wp_x))
+    v1_x = np.divide(v1_x, v1_len, out=zeros.copy(), where=v1_len > 0.1)
+    v1_y = np.divide(v1_y, v1_len, out=zeros.copy(), where=v1_len > 0.1)
+    v2_x = np.divide(v2_x, v2_len, out=zeros.copy(), where=v2_len > 0.1)
+    v2_y = np.divide(v2_y, v2_len, out=zeros.copy(), where=v2_len > 0.1)
     
-    # Fallback: Try pushing from island center
-    centroid_x = sum(p[0] for p in island_contour) / len(island_contour)
-    centroid_y = sum(p[1] for p in island_contour) / len(island_contour)
+    # Add normalized vectors to get angle bisector
+    bisect_x = v1_x + v2_x
+    bisect_y = v1_y + v2_y
+    bisect_len = np.sqrt(bisect_x * bisect_x + bisect_y * bisect_y)
+    bisected = bisect_len > 0.1
+    bisect_x = np.divide(bisect_x, bisect_len, out=zeros.copy(), where=bisected)
+    bisect_y = np.divide(bisect_y, bisect_len, out=zeros.copy(), where=bisected)
     
-    dx_center = waypoint_x - centroid_x
-    dy_center = waypoint_y - centroid_y
-    dist_center = np.sqrt(dx_center * dx_center + dy_center * dy_center)
+    # AIDEV-NOTE: Use cross product to determine if corner is convex or concave
+    # OpenCV findContours returns contours in a consistent winding order.
+    # For exterior contours with RETR_EXTERNAL, the winding is counter-clockwise.
+    # 
+    # Edge vectors (in traversal order):
+    # e1 = current - previous (edge coming into current point)
+    # e2 = next - current (edge leaving current point)
+    # 
+    # Cross product: e1 × e2 = e1_x * e2_y - e1_y * e2_x
+    # - Positive cross product = left turn = convex corner (bulging outward)
+    #   → Angle bisector points inward, so negate it to push outward
+    # - Negative cross product = right turn = concave corner (indented)
+    #   → Angle bisector points outward, use as-is
+    # For CCW polygon: negative cross = convex = bisector points inward
+    # So negate the bisector to push outward
+    # (Most of the coastline is convex, concave corners are rare indentations)
+    cross = (wp_x - prev_x) * (next_y - wp_y) - (wp_y - prev_y) * (next_x - wp_x)
+    flip = np.where(cross < 0, -1.0, 1.0)
+    bisect_x *= flip
+    bisect_y *= flip
     
-    center_valid = False
-    center_reason = 'centroid_too_close'
+    # Direction away from the island centroid (the fallback)
+    center_x = wp_x - centroid_x
+    center_y = wp_y - centroid_y
+    center_dist = np.sqrt(center_x * center_x + center_y * center_y)
+    centered = center_dist > 0.1
+    center_x = np.divide(center_x, center_dist, out=zeros.copy(), where=centered)
+    center_y = np.divide(center_y, center_dist, out=zeros.copy(), where=centered)
     
-    if dist_center > 0.1:
-        dx_center /= dist_center
-        dy_center /= dist_center
-        
-        new_x_center = int(waypoint_x + dx_center * push_distance)
-        new_y_center = int(waypoint_y + dy_center * push_distance)
-        
-        center_valid, center_reason = validate_position(new_x_center, new_y_center)
-        if center_valid:
-            return (new_x_center, new_y_center, True)
+    # Try pushing using angle bisection direction (the centroid one when neighbours are opposite)
+    dx = np.where(bisected, bisect_x, center_x)
+    dy = np.where(bisected, bisect_y, center_y)
+    new_x = (wp_x + dx * push_distance).astype(np.int64)
+    new_y = (wp_y + dy * push_distance).astype(np.int64)
+    success = (bisected | centered) & pushed_positions_valid(new_x, new_y, prev_x, prev_y, next_x, next_y,
+                                                             water_mask, visibility_pct)
+    
+    # Fallback: Try pushing from island center
+    retry = np.flatnonzero(~success & centered)
+    retry_x = (wp_x[retry] + center_x[retry] * push_distance).astype(np.int64)
+    retry_y = (wp_y[retry] + center_y[retry] * push_distance).astype(np.int64)
+    retried = pushed_positions_valid(retry_x, retry_y, prev_x[retry], prev_y[retry], next_x[retry], next_y[retry],
+                                     water_mask, visibility_pct)
+    new_x[retry[retried]] = retry_x[retried]
+    new_y[retry[retried]] = retry_y[retried]
+    success[retry[retried]] = True
     
-    # Both methods failed - log debug info if requested
-    if debug_island is not None:
-        print(f"    Waypoint {wp_index}: ({waypoint_x}, {waypoint_y}) FAILED push={push_distance}px")
-        print(f"      Bisect attempt: ({new_x}, {new_y}) failed: {bisect_reason}")
-        print(f"      Center attempt: ({new_x_center if dist_center > 0.1 else 'N/A'}, {new_y_center if dist_center > 0.1 else 'N/A'}) failed: {center_reason}")
-        if prev_wp and next_wp:
-            print(f"      Neighbors: prev=({prev_wp['x']}, {prev_wp['y']}) next=({next_wp['x']}, {next_wp['y']})")
+    new_x[~success] = wp_x[~success]
+    new_y[~success] = wp_y[~success]
+    return new_x, new_y, success
+
+def push_rings_out(xs, ys, rings, centroids, push_distance, water_mask, visibility_pct):
+    """
+    One push pass over whole coastal rings: rings are waypoint index arrays into xs/ys
+    (int64 arrays, updated in place), centroids one (x, y) per ring.
+    Returns a boolean array over the concatenated rings (True = pushed).
     
-    return (waypoint_x, waypoint_y, False)
+    AIDEV-NOTE: The pass behaves as if each ring were walked in order with waypoints moved
+    in place: a waypoint sees its previous neighbour already pushed (the ring's last one
+    also sees its first pushed). Every waypoint is pushed at once against the current
+    estimate of its already-walked neighbours, then only those whose neighbour estimate
+    changed are pushed again, until nothing changes. The walk's result is the only fixed
+    point (the first waypoint reads no pass results, the second only the first's, ...),
+    so this converges to it, typically in a handful of rounds.
+    """
+    lengths = np.array([len(ring) for ring in rings], dtype=np.int64)
+    ids = np.concatenate(rings) if rings else np.zeros(0, dtype=np.int64)
+    prev, following = ring_neighbours(lengths)
+    walk = np.arange(len(ids))
+    prev_walked = prev < walk  # Walked earlier in the pass (the ring's last waypoint also follows its first)
+    next_walked = following < walk
+    centroid_x = np.repeat([c[0] for c in centroids], lengths).astype(np.float64)
+    centroid_y = np.repeat([c[1] for c in centroids], lengths).astype(np.float64)
+
+    old_x, old_y = xs[ids], ys[ids]
+    new_x, new_y = old_x.copy(), old_y.copy()
+    success = np.zeros(len(ids), dtype=bool)
+    seen = np.zeros((4, len(ids)), dtype=np.int64)  # Neighbour positions each push assumed
+    todo = np.arange(len(ids))
+    rounds = 0
+    while len(todo):
+        p, f = prev[todo], following[todo]
+        seen[:, todo] = [np.where(prev_walked[todo], new_x[p], old_x[p]), np.where(prev_walked[todo], new_y[p], old_y[p]),
+                         np.where(next_walked[todo], new_x[f], old_x[f]), np.where(next_walked[todo], new_y[f], old_y[f])]
+        new_x[todo], new_y[todo], success[todo] = push_waypoints_out(
+            old_x[todo], old_y[todo], *seen[:, todo], centroid_x[todo], centroid_y[todo],
+            push_distance, water_mask, visibility_pct)
+        rounds += 1
+        stale = (prev_walked & ((new_x[prev] != seen[0]) | (new_y[prev] != seen[1]))) | \
+                (next_walked & ((new_x[following] != seen[2]) | (new_y[following] != seen[3])))
+        todo = np.flatnonzero(stale)
+
+    PROFILER.count('push_rounds', rounds)
+    xs[ids] = new_x
+    ys[ids] = new_y
+    return success
 
 def create_water_mask_from_polygons(island_contours, map_width, map_height):
     """
@@ -477,24 +822,316 @@ def create_water_mask_from_polygons(island_contours, map_width, map_height):
     print(f"  Generated water mask from {len(island_contours)} collision polygons")
     water_percent = (water_mask.sum() / water_mask.size) * 100
     print(f"  Water coverage: {water_percent:.1f}%")
-    
+
     return water_mask
 
-def generate_waypoints(island_contours, water_mask, map_width, map_height):
+# AIDEV-NOTE: Clearance grid quantization. value = round(clearance / step) + zero_level,
+# clamped to the dtype range. uint8 keeps whole pixels of water clearance (land = 0);
+# uint16 keeps signed 1/16px steps so land depth survives for steering back to water.
+CLEARANCE_ENCODINGS = {
+    'uint8': {'dtype': np.uint8, 'step': 1.0, 'zero_level': 0},
+    'uint16': {'dtype': np.uint16, 'step': 1.0 / 16, 'zero_level': 32768},
+}
+CLEARANCE_CELL_SIZE = 4  # Exported grid spacing (px); the game interpolates between cell centres
+
+def compute_clearance_field(water_mask):
+    """
+    Compute a signed Euclidean distance field from the authoritative water mask.
+    Positive values = distance (px) from a water pixel to the nearest land pixel,
+    negative values = distance from a land pixel to the nearest water pixel.
+
+    Computed once per bake; every lookup afterwards is a single array index.
+    """
+    clearance = signed_distance(water_mask)
+
+    water_clearance = clearance[water_mask]
+    if water_clearance.size > 0:
+        print(f"  Clearance field: max {water_clearance.max():.1f}px from shore, "
+              f"mean {water_clearance.mean():.1f}px over water")
+
+    return clearance
+
+def signed_distance(water_mask):
+    """Exact Euclidean signed distance (px) of a water mask: + over water, - on land."""
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for the clearance field.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    water_u8 = np.asarray(water_mask).astype(np.uint8)
+    # distanceTransform measures distance to the nearest zero pixel
+    to_land = cv2.distanceTransform(water_u8, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    to_water = cv2.distanceTransform(1 - water_u8, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    return to_land - to_water
+
+def clearance_at(clearance, x, y):
+    """
+    Look up clearance (px from shore, negative on land) at pixel positions.
+    Accepts scalars or arrays; positions are truncated to pixels like the mask checks.
+    """
+    xs = np.asarray(x).astype(np.int64)
+    ys = np.asarray(y).astype(np.int64)
+    return clearance[ys, xs]
+
+def clearance_gradient(clearance):
+    """
+    Gradient (d/dx, d/dy) of a clearance field by central differences, computed once.
+    It points away from the nearest shore: uphill over water, towards water on land.
+    """
+    grad_y, grad_x = np.gradient(np.asarray(clearance, dtype=np.float32))
+    return grad_x, grad_y
+
+def clearance_and_gradient_at(clearance, gradient, x, y):
+    """Clearance and its gradient at pixel positions (scalars or arrays). Returns (clearance, grad_x, grad_y)."""
+    xs = np.asarray(x).astype(np.int64)
+    ys = np.asarray(y).astype(np.int64)
+    return clearance[ys, xs], gradient[0][ys, xs], gradient[1][ys, xs]
+
+NEAREST_WATER_STEPS = 8  # Gradient steps find_nearest_water takes before giving up
+
+def find_nearest_water(x, y, clearance, gradient, min_clearance=0, max_search_distance=50):
+    """
+    Water pixel near (x, y) with more than min_clearance px of water around it, reached
+    along the shortest way off the land. None if that is further than max_search_distance
+    (or off the map).
+
+    AIDEV-NOTE: Walks up the clearance gradient: each step moves by the missing clearance,
+    which lands on the target contour in one step wherever the field is a true distance
+    (away from the medial axis of the land). A flat gradient (equidistant from two coasts)
+    has no direction and gives up.
+    """
+    height, width = clearance.shape[:2]
+    px, py = float(x), float(y)
+    for _ in range(NEAREST_WATER_STEPS):
+        if not (0 <= px < width and 0 <= py < height) or math.hypot(px - x, py - y) > max_search_distance:
+            return None
+        value, grad_x, grad_y = (float(v) for v in clearance_and_gradient_at(clearance, gradient, px, py))
+        if value > min_clearance:
+            return float(int(px)), float(int(py))
+        slope = math.hypot(grad_x, grad_y)
+        if slope < 0.1:
+            return None
+        step = min_clearance - value + 1
+        px += grad_x / slope * step
+        py += grad_y / slope * step
+    return None
+
+def quantize_clearance(clearance, encoding):
+    """Quantize a clearance field to the integer grid described by CLEARANCE_ENCODINGS[encoding]."""
+    spec = CLEARANCE_ENCODINGS[encoding]
+    info = np.iinfo(spec['dtype'])
+    levels = np.rint(clearance / spec['step']) + spec['zero_level']
+    return np.clip(levels, info.min, info.max).astype(spec['dtype'])
+
+def encode_clearance_grid(clearance, encoding, cell_size=CLEARANCE_CELL_SIZE):
+    """
+    Sample the clearance field at the centre of every cell_size px cell and pack the
+    quantized grid for the collision data (row-major [row][column], little-endian, base64).
+    """
+    spec = CLEARANCE_ENCODINGS[encoding]
+    samples = clearance[cell_size // 2::cell_size, cell_size // 2::cell_size]
+    grid = quantize_clearance(samples, encoding)
+    rows, columns = grid.shape
+    print(f"  Clearance grid: {columns}x{rows} cells of {cell_size}px ({encoding}, {grid.nbytes // 1024}KB)")
+
+    return {
+        'cellSize': cell_size,
+        'columns': columns,
+        'rows': rows,
+        'dtype': encoding,
+        'step': spec['step'],
+        'zeroLevel': spec['zero_level'],
+        'values': base64.b64encode(grid.astype(np.dtype(spec['dtype']).newbyteorder('<')).tobytes()).decode('ascii')
+    }
+
+def report_waypoint_clearance(graph, clearance):
+    """Print how far the final waypoints sit from shore (O(1) lookup per waypoint)."""
+    if not len(graph['x']):
+        return
+
+    wp_clearance = clearance_at(clearance, graph['x'], graph['y'])
+    hugging = int((wp_clearance < 5).sum())
+    print(f"  Waypoint clearance: min {wp_clearance.min():.1f}px, mean {wp_clearance.mean():.1f}px "
+          f"({hugging} within 5px of shore)")
+
+# AIDEV-NOTE: Label raster values are island id + 1 (0 = water). RLE file layout
+# (little-endian): 16-byte header [magic 'BOTL', u8 version, u8 bytes per label,
+# u16 reserved, u32 width, u32 height], u32 run count, u32 run lengths[count],
+# then labels[count] (u8 or u16). Runs cover the raster in row-major order.
+LABEL_RLE_MAGIC = b'BOTL'
+LABEL_RLE_VERSION = 1
+
+def island_label_dtype(island_count):
+    """uint8 holds up to 255 islands; larger maps need uint16 (fillPoly supports both)."""
+    return np.uint8 if island_count < 256 else np.uint16
+
+def create_island_label_map(island_contours, map_width, map_height, out=None):
+    """
+    Rasterize collision polygons into a label map: each pixel holds island id + 1, 0 = water.
+    Uses the same fillPoly rasterization as create_water_mask_from_polygons, so
+    (labels == 0) is exactly the authoritative water mask.
+    out: optional preallocated (map_height, map_width) array to fill (e.g. a memmap).
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for label rasterization.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    if out is None:
+        labels = np.zeros((map_height, map_width), dtype=island_label_dtype(len(island_contours)))
+    else:
+        labels = out
+        labels[:] = 0
+    for island_id, contour in enumerate(island_contours):
+        pts = np.array(contour, dtype=np.int32)
+        cv2.fillPoly(labels, [pts], island_id + 1)
+
+    return labels
+
+def encode_label_rle(labels):
+    """Run-length encode a label raster in row-major order. Returns (lengths, values)."""
+    flat = labels.ravel()
+    if flat.size == 0:
+        return np.zeros(0, dtype=np.uint32), flat[:0]
+
+    starts = np.concatenate([[0], np.flatnonzero(flat[1:] != flat[:-1]) + 1])
+    lengths = np.diff(np.append(starts, flat.size)).astype(np.uint32)
+    return lengths, flat[starts]
+
+def save_island_labels(labels, output_base):
+    """
+    Save the label raster as <output_base>.npy and <output_base>.bin (RLE).
+    Returns the metadata dict to embed in collision data.
+    """
+    npy_path = output_base + '.npy'
+    rle_path = output_base + '.bin'
+
+    with open(npy_path, 'wb') as f:
+        np.save(f, labels)
+
+    lengths, values = encode_label_rle(labels)
+    height, width = labels.shape
+    with open(rle_path, 'wb') as f:
+        f.write(LABEL_RLE_MAGIC)
+        f.write(np.array([LABEL_RLE_VERSION, labels.itemsize], dtype='<u1').tobytes())
+        f.write(np.zeros(1, dtype='<u2').tobytes())
+        f.write(np.array([width, height, len(lengths)], dtype='<u4').tobytes())
+        f.write(lengths.astype('<u4').tobytes())
+        f.write(values.astype(labels.dtype.newbyteorder('<')).tobytes())
+
+    print(f"Island labels saved to: {npy_path} ({labels.nbytes // 1024}KB) "
+          f"and {rle_path} ({len(lengths)} runs, {os.path.getsize(rle_path) // 1024}KB)")
+
+    return {
+        'npy': os.path.basename(npy_path),
+        'rle': os.path.basename(rle_path),
+        'width': width,
+        'height': height,
+        'dtype': labels.dtype.name,
+        'idOffset': 1
+    }
+
+def load_island_labels_rle(path):
+    """Decode an RLE label file written by save_island_labels back into a 2D array."""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data[:4] != LABEL_RLE_MAGIC:
+        raise ValueError(f"{path} is not a BOTA label raster (bad magic)")
+    version, label_bytes = data[4], data[5]
+    if version != LABEL_RLE_VERSION:
+        raise ValueError(f"{path}: unsupported label raster version {version}")
+
+    width, height, run_count = np.frombuffer(data, dtype='<u4', count=3, offset=8)
+    lengths = np.frombuffer(data, dtype='<u4', count=run_count, offset=20)
+    label_dtype = np.dtype('<u1' if label_bytes == 1 else '<u2')
+    values = np.frombuffer(data, dtype=label_dtype, count=run_count, offset=20 + 4 * int(run_count))
+
+    return np.repeat(values, lengths).reshape(int(height), int(width))
+
+# AIDEV-NOTE: Inside the bake the waypoint graph is struct-of-arrays:
+#   'x', 'y'        int64 [n] waypoint coordinates (image space)
+#   'island'        int64 [n] island id of each waypoint
+#   'ring_offsets'  int64 [rings + 1]; waypoints ring_offsets[k]:ring_offsets[k+1] are one
+#                   island's coastal ring, in ring order (ids are assigned ring by ring)
+#   'edges'         int64 [e, 2] undirected edges (COO): ring edges first, then cross-water
+#                   edges in (i, j) order, each pair once (set-based dedup on insert)
+#   'stuck'         int64 scalar; waypoints no push pass could move (generate_waypoints only)
+# The stage cache stores it as .npz. waypoint_dicts() converts it to the exported
+# {'id', 'x', 'y', 'island', 'connections'} form; connection order is edge order.
+def ring_edges(ring_offsets):
+    """COO edges joining each waypoint to the next around its ring (closing the loop)."""
+    starts = np.repeat(ring_offsets[:-1], np.diff(ring_offsets))
+    ends = np.repeat(ring_offsets[1:], np.diff(ring_offsets))
+    ids = np.arange(ring_offsets[-1], dtype=np.int64)
+    following = ids + 1
+    following[following == ends] = starts[following == ends]
+    return np.stack([ids, following], axis=1)
+
+def append_unique_edges(edges, candidates):
+    """Append candidate (a, b) edges not already present in either direction; self-loops are dropped."""
+    seen = {(a, b) if a < b else (b, a) for a, b in edges.tolist()}
+    added = []
+    for a, b in candidates.tolist():
+        key = (a, b) if a < b else (b, a)
+        if a != b and key not in seen:
+            seen.add(key)
+            added.append((a, b))
+    return np.concatenate([edges, np.array(added, dtype=np.int64).reshape(-1, 2)])
+
+def waypoint_graph_arrays(xs, ys, islands, ring_lengths, edges):
+    """Assemble a waypoint graph dict (see AIDEV-NOTE above) from its parts."""
+    return {
+        'x': np.asarray(xs, dtype=np.int64),
+        'y': np.asarray(ys, dtype=np.int64),
+        'island': np.asarray(islands, dtype=np.int64),
+        'ring_offsets': np.concatenate([[0], np.cumsum(ring_lengths, dtype=np.int64)]).astype(np.int64),
+        'edges': np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    }
+
+def waypoint_dicts(graph):
+    """Export form of a waypoint graph: [{'id', 'x', 'y', 'island', 'connections'}, ...]."""
+    waypoints = [{'id': i, 'x': x, 'y': y, 'island': island, 'connections': []}
+                 for i, (x, y, island) in enumerate(zip(graph['x'].tolist(), graph['y'].tolist(),
+                                                        graph['island'].tolist()))]
+    for a, b in graph['edges'].tolist():
+        waypoints[a]['connections'].append(b)
+        waypoints[b]['connections'].append(a)
+    return waypoints
+
+# AIDEV-NOTE: Waypoint push passes (hand-tuned; --sweep explores alternatives). Each pass
+# pushes every waypoint further out; early passes are more forgiving about neighbour
+# visibility because the neighbours have not been pushed yet:
+# Pass 1: 75% (very forgiving - neighbors unpushed)
+# Pass 2: 85% (more forgiving - some neighbors pushed)
+# Pass 3: 90% (standard - most neighbors pushed)
+PUSH_DISTANCES = (10, 15, 20)  # px per pass, increasing
+PUSH_VISIBILITY = (0.75, 0.85, 0.90)  # Fraction of the way to each neighbour that must stay visible, per pass
+
+def generate_waypoints(island_contours, water_mask, island_labels, map_width, map_height, island_ids=None,
+                       push_distances=PUSH_DISTANCES, push_visibility=PUSH_VISIBILITY):
     """
     Generate waypoints around island perimeters for pathfinding.
-    Returns list of waypoints with format: {'id': n, 'x': px, 'y': py, 'connections': []}
+    Returns the array-backed waypoint graph (coastal ring edges only; see AIDEV-NOTE above).
+    island_ids gives each contour's island id (label raster value - 1); defaults to list order.
+    push_distances / push_visibility: one entry per push pass (see AIDEV-NOTE above).
     
     New algorithm:
     1. Place waypoints at each polygon vertex (collision point)
-    2. Connect neighbors around each island
+    2. Neighbors around each island are consecutive entries of its ring index array
     3. Push waypoints out in 3 passes (checking for land and neighbor visibility)
     4. Simplify by removing redundant middle waypoints
-    5. Connect waypoints between islands
+    5. Connect waypoints between islands (calculate_waypoint_connections)
     """
-    waypoints = []
-    waypoint_id = 0
-    island_waypoint_groups = []  # Track which waypoints belong to which island
+    if island_ids is None:
+        island_ids = list(range(len(island_contours)))
+    if len(push_distances) != len(push_visibility):
+        raise ValueError(f"push_distances and push_visibility need one entry per pass "
+                         f"(got {len(push_distances)} and {len(push_visibility)})")
     
     print("Generating waypoints around islands...")
     
@@ -521,132 +1158,71 @@ def generate_waypoints(island_contours, water_mask, map_width, map_height):
             'is_small': area < 5000  # Small islands use center-based push
         })
     
-    # STEP 1: Place waypoints at each polygon vertex
+    # STEP 1: Place waypoints at each polygon vertex; each island's ring is an index array
+    xs = [vertex[0] for contour in island_contours for vertex in contour]
+    ys = [vertex[1] for contour in island_contours for vertex in contour]
+    rings = []
     for island_idx, contour in enumerate(island_contours):
-        island_waypoints = []
+        start = sum(len(ring) for ring in rings)
+        rings.append(np.arange(start, start + len(contour), dtype=np.int64))
         
-        for vertex in contour:
-            # Place waypoint at vertex
-                        waypoints.append({
-                            'id': waypoint_id,
-                'x': vertex[0],
-                'y': vertex[1],
-                            'connections': []
-                        })
-                        island_waypoints.append(waypoint_id)
-                        waypoint_id += 1
-                
-        island_info = island_properties[island_idx]
-        small_marker = " (small/convex)" if island_info['is_small'] else ""
-        print(f"  Island #{island_idx}: {len(island_waypoints)} initial waypoints (at vertices){small_marker}")
-        
-        if len(island_waypoints) > 0:
-            island_waypoint_groups.append(island_waypoints)
-    
-    # STEP 2: Connect neighbors around each island
-    print("Connecting neighbor waypoints around islands...")
-    for island_wps in island_waypoint_groups:
-        for i in range(len(island_wps)):
-            wp_id = island_wps[i]
-            next_wp_id = island_wps[(i + 1) % len(island_wps)]
-            
-            waypoints[wp_id]['connections'].append(next_wp_id)
-            waypoints[next_wp_id]['connections'].append(wp_id)
+        small_marker = " (small/convex)" if island_properties[island_idx]['is_small'] else ""
+        print(f"  Island #{island_ids[island_idx]}: {len(contour)} initial waypoints (at vertices){small_marker}")
+    
+    # STEP 3: Push waypoints out, one pass per push distance
+    print(f"Pushing waypoints away from shore ({len(push_distances)} passes)...")
+    xs = np.array(xs, dtype=np.int64)
+    ys = np.array(ys, dtype=np.int64)
     
-    # STEP 3: Push waypoints out in 3 passes
-    print("Pushing waypoints away from shore (3 passes)...")
-    PUSH_DISTANCES = [10, 15, 20]  # Three passes with increasing push distances
+    # For small islands, use simple center-based push (they're convex)
+    # For large islands, use angle bisection (handles concave features)
+    small = [island_idx for island_idx, info in enumerate(island_properties) if info['is_small']]
+    large = [island_idx for island_idx, info in enumerate(island_properties) if not info['is_small']]
+    small_ids = np.concatenate([rings[i] for i in small]) if small else np.zeros(0, dtype=np.int64)
+    small_lengths = [len(rings[i]) for i in small]
+    small_center_x = np.repeat([island_properties[i]['center_x'] for i in small], small_lengths).astype(np.int64)
+    small_center_y = np.repeat([island_properties[i]['center_y'] for i in small], small_lengths).astype(np.int64)
+    small_labels = np.repeat([island_ids[i] + 1 for i in small], small_lengths).astype(np.int64)
+    large_ids = np.concatenate([rings[i] for i in large]) if large else np.zeros(0, dtype=np.int64)
+    large_centroids = [(sum(p[0] for p in island_contours[i]) / len(island_contours[i]),
+                        sum(p[1] for p in island_contours[i]) / len(island_contours[i])) for i in large]
     
     # Track which waypoints were pushed at least once
-    pushed_at_least_once = set()
+    pushed_at_least_once = np.zeros(len(xs), dtype=bool)
     
-    for pass_num, push_distance in enumerate(PUSH_DISTANCES):
-        pushed_count = 0
-        
-        # Use more forgiving visibility check for early passes
-        # Pass 1: 75% (very forgiving - neighbors unpushed)
-        # Pass 2: 85% (more forgiving - some neighbors pushed)
-        # Pass 3: 90% (standard - most neighbors pushed)
-        visibility_pct = [0.75, 0.85, 0.90][pass_num]
+    for pass_num, (push_distance, visibility_pct) in enumerate(zip(push_distances, push_visibility)):
+        # Small islands: push straight away from the island center. For small convex islands
+        # we only check bounds, water and not-in-island (one label raster lookup instead of
+        # a polygon test); the radial push keeps neighbours in a circle, so no visibility check
+        dx = xs[small_ids] - small_center_x
+        dy = ys[small_ids] - small_center_y
+        dist = np.sqrt(dx * dx + dy * dy)
+        movable = dist > 0.1
+        safe_dist = np.where(movable, dist, 1.0)
+        new_x = (xs[small_ids] + (dx / safe_dist) * push_distance).astype(np.int64)
+        new_y = (ys[small_ids] + (dy / safe_dist) * push_distance).astype(np.int64)
+        height, width = island_labels.shape[:2]
+        own_island = island_labels[np.clip(new_y, 0, height - 1), np.clip(new_x, 0, width - 1)] == small_labels
+        small_pushed = movable & _mask_samples(water_mask, new_x, new_y) & ~own_island
+        xs[small_ids[small_pushed]] = new_x[small_pushed]
+        ys[small_ids[small_pushed]] = new_y[small_pushed]
+        pushed_at_least_once[small_ids[small_pushed]] = True
         
-        for island_idx, island_wps in enumerate(island_waypoint_groups):
-            contour = island_contours[island_idx]
-            island_info = island_properties[island_idx]
-            
-            for i in range(len(island_wps)):
-                wp_id = island_wps[i]
-                prev_wp_id = island_wps[(i - 1) % len(island_wps)]
-                next_wp_id = island_wps[(i + 1) % len(island_wps)]
-                
-                wp = waypoints[wp_id]
-                prev_wp = waypoints[prev_wp_id]
-                next_wp = waypoints[next_wp_id]
-                
-                # Disable debug output
-                debug_island = None
-                
-                # For small islands, use simple center-based push (they're convex)
-                # For large islands, use angle bisection (handles concave features)
-                if island_info['is_small']:
-                    # Simple push away from island center
-                    dx = wp['x'] - island_info['center_x']
-                    dy = wp['y'] - island_info['center_y']
-                    dist = np.sqrt(dx * dx + dy * dy)
-                    
-                    if dist > 0.1:
-                        dx /= dist
-                        dy /= dist
-                        
-                        new_x = int(wp['x'] + dx * push_distance)
-                        new_y = int(wp['y'] + dy * push_distance)
-                        
-                        # Debug output for Island #0
-                        if debug_island is not None:
-                            print(f"    Waypoint {i}: ({wp['x']}, {wp['y']}) -> ({new_x}, {new_y})")
-                        
-                        # For small convex islands, we only check bounds, water, and not-in-island
-                        # No need for neighbor visibility check since radial push guarantees circular pattern
-                        in_bounds = new_x >= 0 and new_x < map_width and new_y >= 0 and new_y < map_height
-                        on_water = water_mask[new_y, new_x] if in_bounds else False
-                        not_in_island = not point_in_polygon((new_x, new_y), contour) if in_bounds else False
-                        
-                        if debug_island is not None:
-                            print(f"      in_bounds={in_bounds}, on_water={on_water}, not_in_island={not_in_island}")
-                        
-                        if in_bounds and on_water and not_in_island:
-                            wp['x'] = new_x
-                            wp['y'] = new_y
-                            pushed_count += 1
-                            pushed_at_least_once.add(wp_id)
-                            if debug_island is not None:
-                                print(f"      SUCCESS!")
-                        else:
-                            if debug_island is not None:
-                                print(f"      FAILED!")
-                else:
-                    # Large island - use angle bisection method
-                    new_x, new_y, success = push_waypoint_out(
-                        wp['x'], wp['y'],
-                        push_distance,
-                        contour,
-                        water_mask,
-                        map_width, map_height,
-                        prev_wp, next_wp,
-                        debug_island, i,
-                        visibility_pct
-                    )
-                    
-                    if success:
-                        wp['x'] = new_x
-                        wp['y'] = new_y
-                        pushed_count += 1
-                        pushed_at_least_once.add(wp_id)
+        # Large islands: angle bisection with neighbour visibility, whole rings at once
+        large_pushed = push_rings_out(xs, ys, [rings[i] for i in large], large_centroids,
+                                      push_distance, water_mask, visibility_pct)
+        pushed_at_least_once[large_ids[large_pushed]] = True
+        pushed_count = int(small_pushed.sum() + large_pushed.sum())
         
         print(f"  Pass {pass_num + 1}: Pushed {pushed_count} waypoints by {push_distance}px")
+        push_attempts = sum(len(ring) for ring in rings)
+        PROFILER.count('push_attempts', push_attempts)
+        PROFILER.count('push_failures', push_attempts - pushed_count)
+    xs = xs.tolist()
+    ys = ys.tolist()
     
     # Report waypoints that were never pushed
-    total_waypoints = len(waypoints)
-    never_pushed = total_waypoints - len(pushed_at_least_once)
+    never_pushed = int((~pushed_at_least_once).sum())
     if never_pushed > 0:
         print(f"  WARNING: {never_pushed} waypoint(s) never pushed (stuck at coastline)")
     
@@ -656,235 +1232,926 @@ def generate_waypoints(island_contours, water_mask, map_width, map_height):
     for pass_num in range(3):
         pass_merged = 0
         
-        for island_idx, island_wps in enumerate(island_waypoint_groups):
+        for island_idx, ring in enumerate(rings):
             island_merged = 0
             
             # Don't simplify if we'd go below 4 waypoints
-            if len(island_wps) <= 4:
+            if len(ring) <= 4:
                 continue
             
-            # Single pass through the list, merging every other pair
-            # Process in stride of 2 to avoid re-processing merged waypoints
-            i = 0
-            while i < len(island_wps) - 1:  # -1 because we need at least 2 waypoints
+            # Single pass along the ring, merging every other pair. The surviving ring is
+            # kept + ring[p:], so "before" is the last kept waypoint (or the ring's last
+            # before anything is kept) and "after" wraps to the first kept waypoint.
+            ring = ring.tolist()
+            kept = []
+            p = 0
+            while p < len(ring) - 1:  # -1 because we need at least 2 waypoints
                 # Stop if we'd go below 4 waypoints
-                if len(island_wps) <= 4:
+                if len(kept) + len(ring) - p <= 4:
                     break
                 
-                # Get four consecutive waypoints: before, first, second, after
-                before_idx = (i - 1) % len(island_wps)
-                first_idx = i
-                second_idx = i + 1
-                after_idx = (i + 2) % len(island_wps)
-                
-                wp_before_id = island_wps[before_idx]
-                wp_first_id = island_wps[first_idx]
-                wp_second_id = island_wps[second_idx]
-                wp_after_id = island_wps[after_idx]
-                
-                wp_before = waypoints[wp_before_id]
-                wp_first = waypoints[wp_first_id]
-                wp_second = waypoints[wp_second_id]
-                wp_after = waypoints[wp_after_id]
+                # Four consecutive waypoints: before, first, second, after
+                wp_before_id = kept[-1] if kept else ring[-1]
+                wp_first_id = ring[p]
+                wp_second_id = ring[p + 1]
+                wp_after_id = ring[p + 2] if p + 2 < len(ring) else kept[0]
                 
                 # Calculate averaged position
-                avg_x = int((wp_first['x'] + wp_second['x']) / 2)
-                avg_y = int((wp_first['y'] + wp_second['y']) / 2)
+                avg_x = int((xs[wp_first_id] + xs[wp_second_id]) / 2)
+                avg_y = int((ys[wp_first_id] + ys[wp_second_id]) / 2)
                 
                 # Check if averaged position is on water
                 if not (avg_x >= 0 and avg_x < map_width and 
                         avg_y >= 0 and avg_y < map_height and
                         water_mask[avg_y, avg_x]):
-                    # Averaged position not on water, skip
-                    i += 2
+                    # Averaged position not on water, keep both
+                    kept += [wp_first_id, wp_second_id]
+                    p += 2
                     continue
                 
-                # Check if before→averaged crosses land
-                dx1 = avg_x - wp_before['x']
-                dy1 = avg_y - wp_before['y']
-                dist1 = np.sqrt(dx1 * dx1 + dy1 * dy1)
-                
-                crosses_land = False
-                if dist1 > 5:  # Only check if distance is significant
-                    num_samples = int(dist1 / 5) + 1
-                    for j in range(1, num_samples):
-                        t = j / num_samples
-                        test_x = int(wp_before['x'] + dx1 * t)
-                        test_y = int(wp_before['y'] + dy1 * t)
-                        
-                        if (test_x < 0 or test_x >= map_width or 
-                            test_y < 0 or test_y >= map_height or
-                            not water_mask[test_y, test_x]):
-                            crosses_land = True
-                            break
-                
-                if crosses_land:
-                    # Connection would cross land, skip
-                    i += 2
-                    continue
-                
-                # Check if averaged→after crosses land
-                dx2 = wp_after['x'] - avg_x
-                dy2 = wp_after['y'] - avg_y
-                dist2 = np.sqrt(dx2 * dx2 + dy2 * dy2)
-                
-                if dist2 > 5:  # Only check if distance is significant
-                    num_samples = int(dist2 / 5) + 1
-                    for j in range(1, num_samples):
-                        t = j / num_samples
-                        test_x = int(avg_x + dx2 * t)
-                        test_y = int(avg_y + dy2 * t)
-                        
-                        if (test_x < 0 or test_x >= map_width or 
-                            test_y < 0 or test_y >= map_height or
-                            not water_mask[test_y, test_x]):
-                            crosses_land = True
-                            break
-                
-                if crosses_land:
-                    # Connection would cross land, skip
-                    i += 2
+                # Check if before→averaged and averaged→after cross land
+                # (interior samples only; segments of 5px or less are always clear)
+                seg_x0 = np.array([xs[wp_before_id], avg_x])
+                seg_y0 = np.array([ys[wp_before_id], avg_y])
+                seg_x1 = np.array([avg_x, xs[wp_after_id]])
+                seg_y1 = np.array([avg_y, ys[wp_after_id]])
+                seg_dx = seg_x1 - seg_x0
+                seg_dy = seg_y1 - seg_y0
+                significant = np.sqrt(seg_dx * seg_dx + seg_dy * seg_dy) > 5
+
+                clear = batch_line_of_sight(
+                    seg_x0[significant], seg_y0[significant],
+                    seg_x1[significant], seg_y1[significant],
+                    water_mask, include_start=False, include_end=False
+                )
+                if not clear.all():
+                    # Connection would cross land, keep both
+                    kept += [wp_first_id, wp_second_id]
+                    p += 2
                     continue
                 
-                # SUCCESS! All checks passed - merge the pair
-                # 1. Moving first waypoint to averaged position
-                # 2. Removing second waypoint
-                waypoints[wp_first_id]['x'] = avg_x
-                waypoints[wp_first_id]['y'] = avg_y
-                
-                # Remove second waypoint
-                island_wps.pop(second_idx)
-                waypoints[wp_second_id]['connections'] = []
+                # SUCCESS! All checks passed - move first waypoint to the averaged
+                # position and drop the second from the ring
+                xs[wp_first_id] = avg_x
+                ys[wp_first_id] = avg_y
+                kept.append(wp_first_id)
+                p += 2
                 island_merged += 1
                 pass_merged += 1
-                
-                # Skip ahead by 1 (the merged point)
-                i += 1
+            
+            rings[island_idx] = np.array(kept + ring[p:], dtype=np.int64)
             
             if island_merged > 0:
                 if pass_num == 0:  # Only print on first pass to avoid spam
-                    print(f"  Island #{island_idx}: Starting simplification...")
+                    print(f"  Island #{island_ids[island_idx]}: Starting simplification...")
         
         print(f"  Pass {pass_num + 1}: Merged {pass_merged} waypoint pairs")
     
-    # Rebuild neighbor connections after simplification
+    # Rebuild neighbor connections after simplification: surviving waypoints are
+    # renumbered ring by ring (ring order is ascending id order), then joined in a loop
     print("Rebuilding neighbor connections after simplification...")
-    for island_idx, island_wps in enumerate(island_waypoint_groups):
-        # Debug check
-        if len(island_wps) < 3:
-            print(f"  WARNING: Island #{island_idx} has only {len(island_wps)} waypoints after simplification!")
-        
-        # Clear all old connections for this island first
-        for i in range(len(island_wps)):
-            wp_id = island_wps[i]
-            waypoints[wp_id]['connections'] = []
-        
-        # Add new ring connections (each waypoint connects to next, forming a closed loop)
-        for i in range(len(island_wps)):
-            wp_id = island_wps[i]
-            next_wp_id = island_wps[(i + 1) % len(island_wps)]
-            
-            # Add bidirectional connection
-            if next_wp_id not in waypoints[wp_id]['connections']:
-                waypoints[wp_id]['connections'].append(next_wp_id)
-            if wp_id not in waypoints[next_wp_id]['connections']:
-                waypoints[next_wp_id]['connections'].append(wp_id)
-    
-    # Filter out waypoints with no connections (removed during simplification)
-    active_waypoints = [wp for wp in waypoints if len(wp['connections']) > 0]
+    for island_idx, ring in enumerate(rings):
+        if len(ring) < 3:
+            print(f"  WARNING: Island #{island_ids[island_idx]} has only {len(ring)} waypoints after simplification!")
     
-    # Renumber waypoint IDs to be sequential
-    id_mapping = {}
-    for new_id, wp in enumerate(active_waypoints):
-        old_id = wp['id']
-        id_mapping[old_id] = new_id
-        wp['id'] = new_id
+    survivors = np.concatenate(rings) if rings else np.zeros(0, dtype=np.int64)
+    ring_lengths = [len(ring) for ring in rings]
+    islands = np.repeat(np.array(island_ids, dtype=np.int64), ring_lengths)
+    graph = waypoint_graph_arrays(np.array(xs)[survivors], np.array(ys)[survivors], islands, ring_lengths,
+                                  np.zeros((0, 2), dtype=np.int64))
+    graph['edges'] = append_unique_edges(graph['edges'], ring_edges(graph['ring_offsets']))
+    graph['stuck'] = np.array(never_pushed, dtype=np.int64)
     
-    # Update connection IDs to match new numbering
-    for wp in active_waypoints:
-        wp['connections'] = [id_mapping[old_id] for old_id in wp['connections'] if old_id in id_mapping]
-    
-    print(f"Total waypoints after simplification and cleanup: {len(active_waypoints)}")
-    return active_waypoints
+    print(f"Total waypoints after simplification and cleanup: {len(survivors)}")
+    return graph
+
+def find_pairs_within_radius(xs, ys, radius):
+    """
+    Find every index pair (i < j) whose points are at most radius apart.
+    Returns (pair_i, pair_j) arrays sorted by i, then j.
+
+    AIDEV-NOTE: Uniform grid (spatial hash) with cell size = radius, so each
+    point is only compared against the 3x3 block of cells around it. Work is
+    proportional to the number of nearby pairs, not n².
+    """
+    n = len(xs)
+    if n < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    # Cell coordinates, shifted by one so the -1/+1 neighbour offsets never wrap
+    cell_x = np.floor(xs / radius).astype(np.int64)
+    cell_y = np.floor(ys / radius).astype(np.int64)
+    cell_x -= cell_x.min() - 1
+    cell_y -= cell_y.min() - 1
+    grid_width = int(cell_x.max()) + 2
+    cell_key = cell_y * grid_width + cell_x
+
+    order = np.argsort(cell_key, kind='stable')
+    sorted_keys = cell_key[order]
+
+    pair_i_parts = []
+    pair_j_parts = []
+    for offset_y in (-1, 0, 1):
+        for offset_x in (-1, 0, 1):
+            neighbour_key = cell_key + offset_y * grid_width + offset_x
+            lo = np.searchsorted(sorted_keys, neighbour_key, side='left')
+            hi = np.searchsorted(sorted_keys, neighbour_key, side='right')
+            counts = hi - lo
+
+            # Expand each point into the run of points stored in the neighbour cell
+            src = np.repeat(np.arange(n), counts)
+            run_start = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            dst = order[np.arange(len(src)) + run_start]
+
+            keep = dst > src
+            src, dst = src[keep], dst[keep]
+            dx = xs[dst] - xs[src]
+            dy = ys[dst] - ys[src]
+            in_range = np.sqrt(dx * dx + dy * dy) <= radius
+            pair_i_parts.append(src[in_range])
+            pair_j_parts.append(dst[in_range])
 
-def calculate_waypoint_connections(waypoints, water_mask, island_contours):
+    pair_i = np.concatenate(pair_i_parts)
+    pair_j = np.concatenate(pair_j_parts)
+    order = np.lexsort((pair_j, pair_i))
+    return pair_i[order], pair_j[order]
+
+def calculate_waypoint_connections(graph, water_mask, max_distance=MAX_CONNECTION_DISTANCE):
     """
     Calculate which waypoints have line-of-sight to each other (no land in between).
-    Updates waypoint 'connections' lists in place.
-    
-    Note: Coastal ring connections (neighbors around same island) are already added,
-    this function adds additional cross-water connections between distant waypoints.
+    Returns the graph with cross-water edges appended after its coastal ring edges.
+    max_distance: longest connection considered (px).
     """
     print("Calculating cross-water waypoint connections...")
-    
-    SAMPLE_INTERVAL = 5  # Check every 5 pixels along line
-    MAX_CONNECTION_DISTANCE = 300  # Don't connect waypoints more than 300px apart
-    
-    # Count existing connections (coastal rings)
-    existing_connections = sum(len(wp['connections']) for wp in waypoints) // 2
+
+    # Existing edges are the coastal rings
+    ring_edge_list = graph['edges']
+    existing_connections = len(ring_edge_list)
     print(f"  Starting with {existing_connections} coastal ring connections")
-    
-    total_connections = 0
-    
-    for i, wp1 in enumerate(waypoints):
-        if i % 50 == 0:
-            print(f"  Processing waypoint {i}/{len(waypoints)}...")
-        
-        for j in range(i + 1, len(waypoints)):
-            wp2 = waypoints[j]
-            
-            # Calculate distance
-            dx = wp2['x'] - wp1['x']
-            dy = wp2['y'] - wp1['y']
-            distance = np.sqrt(dx * dx + dy * dy)
-            
-            # Skip if too far apart
-            if distance > MAX_CONNECTION_DISTANCE:
-                continue
-            
-            # Check if line is clear (all water)
-            num_samples = int(distance / SAMPLE_INTERVAL) + 1
-            line_clear = True
-            
-            for k in range(num_samples + 1):
-                t = k / max(num_samples, 1)
-                test_x = int(wp1['x'] + dx * t)
-                test_y = int(wp1['y'] + dy * t)
-                
-                # Check bounds
-                if test_x < 0 or test_x >= water_mask.shape[1] or test_y < 0 or test_y >= water_mask.shape[0]:
-                    line_clear = False
-                    break
-                
-                # Check if on water
-                if not water_mask[test_y, test_x]:
-                    line_clear = False
-                    break
-            
-            # Add bidirectional connection if clear (and not already connected)
-            if line_clear:
-                # Check if already connected (avoid duplicates from coastal rings)
-                if wp2['id'] not in wp1['connections']:
-                    wp1['connections'].append(wp2['id'])
-                    wp2['connections'].append(wp1['id'])
-                    total_connections += 1
-    
+
+    # Candidate pairs within range (i < j, in the same order the old nested loop visited them)
+    xs = graph['x'].astype(np.float64)
+    ys = graph['y'].astype(np.float64)
+    pair_i, pair_j = find_pairs_within_radius(xs, ys, max_distance)
+    print(f"  Testing line-of-sight for {len(pair_i)} candidate pairs...")
+
+    # Check every candidate line at once (all samples, both endpoints included)
+    line_clear = batch_line_of_sight(xs[pair_i], ys[pair_i], xs[pair_j], ys[pair_j], water_mask)
+
+    # Add clear pairs in (i, j) order, skipping those already joined by a coastal ring
+    edges = append_unique_edges(ring_edge_list, np.stack([pair_i[line_clear], pair_j[line_clear]], axis=1))
+    total_connections = len(edges) - existing_connections
+    PROFILER.count('edges_tested', len(pair_i))
+    PROFILER.count('edges_accepted', line_clear.sum())
+
     print(f"Added {total_connections} cross-water connections")
-    final_connections = sum(len(wp['connections']) for wp in waypoints) // 2
-    print(f"Total connections: {final_connections} ({existing_connections} coastal + {total_connections} cross-water)")
+    print(f"Total connections: {len(edges)} ({existing_connections} coastal + {total_connections} cross-water)")
     
     # Print stats
-    connections_per_waypoint = [len(wp['connections']) for wp in waypoints]
-    if connections_per_waypoint:
-        avg_connections = sum(connections_per_waypoint) / len(connections_per_waypoint)
-        print(f"Average connections per waypoint: {avg_connections:.1f}")
-        print(f"Min connections: {min(connections_per_waypoint)}")
-        print(f"Max connections: {max(connections_per_waypoint)}")
+    connections_per_waypoint = np.bincount(edges.ravel(), minlength=len(xs))
+    if len(connections_per_waypoint):
+        print(f"Average connections per waypoint: {connections_per_waypoint.mean():.1f}")
+        print(f"Min connections: {connections_per_waypoint.min()}")
+        print(f"Max connections: {connections_per_waypoint.max()}")
+
+    return {**graph, 'edges': edges}
+
+# AIDEV-NOTE: Connection pruning builds a greedy t-spanner: edges are tried shortest
+# first and kept only if the graph kept so far has no route between their ends within
+# stretch * edge length. Every route in the pruned graph is therefore at most `stretch`
+# times its unpruned length. The optional sector cap then drops each waypoint's longest
+# edges beyond `sector_degree` per angular sector, but only where that keeps both ends
+# connected; its effect on stretch is measured, not bounded.
+def bounded_distance(neighbours, source, target, limit):
+    """Shortest source->target distance if it is <= limit, else inf (Dijkstra cut off at limit)."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if node == target:
+            return d
+        if d > dist[node]:
+            continue
+        for neighbour, cost in neighbours[node]:
+            nd = d + cost
+            if nd <= limit and nd < dist.get(neighbour, float('inf')):
+                dist[neighbour] = nd
+                heapq.heappush(heap, (nd, neighbour))
+    return float('inf')
+
+def _remove_edge(neighbours, i, j):
+    neighbours[i] = [(n, c) for n, c in neighbours[i] if n != j]
+    neighbours[j] = [(n, c) for n, c in neighbours[j] if n != i]
+
+def cap_sector_degree(waypoints, neighbours, sectors, sector_degree):
+    """Drop edges beyond sector_degree per angular sector at either end, keeping the graph connected."""
+    sector_width = 2 * np.pi / sectors
+
+    def sector(i, j):
+        angle = np.arctan2(waypoints[j]['y'] - waypoints[i]['y'], waypoints[j]['x'] - waypoints[i]['x'])
+        return int((angle + np.pi) // sector_width) % sectors
+
+    def over_cap(i, j):
+        s = sector(i, j)
+        return sum(1 for n, _ in neighbours[i] if sector(i, n) == s) > sector_degree
+
+    candidates = sorted(((c, i, j) for i in range(len(neighbours)) for j, c in neighbours[i] if i < j),
+                        reverse=True)
+    removed = 0
+    for cost, i, j in candidates:
+        if not (over_cap(i, j) or over_cap(j, i)):
+            continue
+        _remove_edge(neighbours, i, j)
+        if bounded_distance(neighbours, i, j, float('inf')) == float('inf'):
+            neighbours[i].append((j, cost))  # Bridge: keep it
+            neighbours[j].append((i, cost))
+        else:
+            removed += 1
+    return removed
+
+def prune_waypoint_connections(waypoints, stretch, sectors=0, sector_degree=2):
+    """
+    Remove redundant connections (see AIDEV-NOTE above) in place.
+    Prints the edge-count reduction against the resulting route stretch.
+    """
+    neighbours = waypoint_graph(waypoints)
+    edges = sorted((c, i, j) for i in range(len(neighbours)) for j, c in neighbours[i] if i < j)
+
+    kept = [[] for _ in waypoints]
+    for cost, i, j in edges:
+        if bounded_distance(kept, i, j, stretch * cost) > stretch * cost:
+            kept[i].append((j, cost))
+            kept[j].append((i, cost))
+    spanner_edges = sum(len(k) for k in kept) // 2
+
+    capped = cap_sector_degree(waypoints, kept, sectors, sector_degree) if sectors else 0
+
+    for i, wp in enumerate(waypoints):
+        keep = {j for j, _ in kept[i]}
+        wp['connections'] = [j for j in wp['connections'] if j in keep]
+
+    # Detour of each removed connection through the pruned graph. Replacing every edge of a
+    # route by its detour bounds the route, so the worst detour is the worst route stretch.
+    detours = np.array([bounded_distance(kept, i, j, float('inf')) / cost for cost, i, j in edges
+                        if not any(n == j for n, _ in kept[i])])
+    final_edges = spanner_edges - capped
+    print(f"  Pruned connections: {len(edges)} -> {final_edges} "
+          f"({(1 - final_edges / max(len(edges), 1)) * 100:.1f}% fewer; "
+          f"{len(edges) - spanner_edges} redundant at stretch {stretch}, {capped} over sector cap)")
+    if len(detours):
+        print(f"  Route stretch: at most {detours.max():.3f} "
+              f"(removed connections detour by {detours.mean():.4f}x on average)")
+    degrees = [len(wp['connections']) for wp in waypoints]
+    print(f"  Connections per waypoint: average {np.mean(degrees):.1f}, max {max(degrees)}")
+
+# AIDEV-NOTE: Two-level (HPA*-style) graph. Waypoints are grouped into square grid
+# clusters. An entrance is a waypoint with a connection into another cluster. The
+# abstract graph joins entrances of the same cluster by their shortest route inside
+# that cluster (interior waypoints cached, so refining a route is a lookup) and keeps
+# the cluster-crossing connections. A long query only searches entrances, plus the
+# start/end clusters locally.
+HIERARCHY_CLUSTER_SIZE = 256  # Cluster edge (px)
+
+def cluster_routes(neighbours, source, members):
+    """Dijkstra from source restricted to waypoints in `members`. Returns (dist, parent) dicts."""
+    dist, parent = {source: 0.0}, {source: None}
+    heap = [(0.0, source)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for neighbour, cost in neighbours[node]:
+            nd = d + cost
+            if neighbour in members and nd < dist.get(neighbour, float('inf')):
+                dist[neighbour] = nd
+                parent[neighbour] = node
+                heapq.heappush(heap, (nd, neighbour))
+    return dist, parent
+
+def build_waypoint_hierarchy(waypoints, map_width, map_height, cluster_size=HIERARCHY_CLUSTER_SIZE):
+    """
+    Build the two-level graph over the waypoint connections.
+    Returns a dict for the collision data: clusters (grid cell, bounds, waypoints,
+    entrances) and abstract edges [from, to, cost, interior waypoint ids].
+    """
+    neighbours = waypoint_graph(waypoints)
+    clusters_x = -(-map_width // cluster_size)
+    cluster_of = [(wp['y'] // cluster_size) * clusters_x + wp['x'] // cluster_size for wp in waypoints]
+
+    members = {}
+    for i, cluster in enumerate(cluster_of):
+        members.setdefault(cluster, set()).add(i)
+
+    entrances = {cluster: set() for cluster in members}
+    edges = []
+    for i, links in enumerate(neighbours):
+        for j, cost in links:
+            if cluster_of[i] != cluster_of[j]:
+                entrances[cluster_of[i]].add(i)
+                if i < j:
+                    edges.append([i, j, round(cost, 2), []])
+
+    for cluster, gates in entrances.items():
+        gates = sorted(gates)
+        for k, source in enumerate(gates):
+            dist, parent = cluster_routes(neighbours, source, members[cluster])
+            for target in gates[k + 1:]:
+                if target not in dist:
+                    continue  # Not connected inside this cluster
+                interior = []
+                node = parent[target]
+                while node != source:
+                    interior.append(node)
+                    node = parent[node]
+                edges.append([source, target, round(dist[target], 2), interior[::-1]])
+
+    clusters = []
+    for cluster in sorted(members):
+        cy, cx = divmod(cluster, clusters_x)
+        clusters.append({
+            'id': cluster,
+            'bounds': {'minX': cx * cluster_size - map_width / 2, 'minY': cy * cluster_size - map_height / 2,
+                       'maxX': (cx + 1) * cluster_size - map_width / 2, 'maxY': (cy + 1) * cluster_size - map_height / 2},
+            'waypoints': sorted(members[cluster]),
+            'entrances': sorted(entrances[cluster])
+        })
+
+    node_count = sum(len(c['entrances']) for c in clusters)
+    base_edges = sum(len(links) for links in neighbours) // 2
+    print(f"  Hierarchy: {len(clusters)} clusters ({cluster_size}px), {node_count} entrance nodes, "
+          f"{len(edges)} abstract edges (base graph {len(waypoints)} waypoints, {base_edges} connections)")
+    return {
+        'clusterSize': cluster_size,
+        'clustersX': clusters_x,
+        'clusters': clusters,
+        'edges': edges
+    }
+
+# AIDEV-NOTE: Port route atlas. Ports join the final waypoint graph as extra nodes
+# linked to every waypoint (and port) they can see within MAX_CONNECTION_DISTANCE, using
+# the same line-of-sight test as calculate_waypoint_connections. Each port pair's
+# shortest route is then string-pulled: from each corner, jump to the furthest later
+# route point in clear line of sight. Port entries drawn slightly inside a coastline
+# polygon are snapped to the nearest water pixel with more than PORT_SNAP_CLEARANCE px
+# of water around it (find_nearest_water; a pixel hugging the coast rarely sees any waypoint).
+PORT_SNAP_DISTANCE = 16  # Furthest a port entry may be moved to reach water (px)
+PORT_SNAP_CLEARANCE = 3  # Water required around a snapped entry (px)
+
+class UnsnappablePort(Exception):
+    """A port entry is on land and too far from open water to snap."""
+
+def load_ports(path, map_width, map_height):
+    """
+    Load ports [{id, x, y[, entryX, entryY]}] (world space); boats use the entry point when given.
+    Raises ValueError if the file cannot be read or a port is malformed.
+    """
+    try:
+        with open(path) as f:
+            ports = json.load(f)
+        return [{'id': port['id'],
+                 'x': port.get('entryX', port['x']) + map_width / 2,
+                 'y': port.get('entryY', port['y']) + map_height / 2} for port in ports]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"cannot load ports from {path}: {e}") from e
+
+def string_pull(points, water_mask):
+    """Shorten a polyline by skipping to the furthest later point in line of sight."""
+    points = np.asarray(points, dtype=np.float64)
+    corners = [0]
+    while corners[-1] < len(points) - 1:
+        i = corners[-1]
+        later = np.arange(i + 1, len(points))
+        clear = batch_line_of_sight(np.full(len(later), points[i, 0]), np.full(len(later), points[i, 1]),
+                                    points[later, 0], points[later, 1], water_mask)
+        visible = later[clear]
+        corners.append(int(visible.max()) if len(visible) else i + 1)
+    return points[corners]
+
+def build_route_atlas(ports, waypoints, water_mask, clearance, gradient, map_width, map_height):
+    """
+    Shortest, string-pulled route between every pair of ports.
+    clearance / gradient: the bake's clearance field and clearance_gradient, for snapping.
+    Returns a dict for the collision data: port ids and routes
+    [{from, to, distance, polyline}] (world space, one entry per unordered pair).
+    Raises UnsnappablePort if a port entry is too far from open water.
+    """
+    snapped = []
+    for port in ports:
+        if _mask_samples(water_mask, np.array([int(port['x'])]), np.array([int(port['y'])]))[0]:
+            continue
+        water = find_nearest_water(port['x'], port['y'], clearance, gradient, PORT_SNAP_CLEARANCE, PORT_SNAP_DISTANCE)
+        if water is None:
+            raise UnsnappablePort(f"port {port['id']} is more than {PORT_SNAP_DISTANCE}px from open water")
+        port['x'], port['y'] = water
+        snapped.append(port['id'])
+    if snapped:
+        print(f"  Snapped {len(snapped)} port entries on land to the nearest open water")
+
+    neighbours = waypoint_graph(waypoints)
+    count = len(waypoints)
+    nodes = np.array([[wp['x'], wp['y']] for wp in waypoints] + [[p['x'], p['y']] for p in ports],
+                     dtype=np.float64).reshape(-1, 2)
+    neighbours += [[] for _ in ports]
+
+    # Link ports to visible waypoints and ports (same rules as cross-water connections)
+    for p in range(len(ports)):
+        node = count + p
+        # Waypoints and later ports (earlier ports already tested their link to this one)
+        others = np.array([n for n in range(len(nodes)) if n < count or n > node])
+        lengths = np.hypot(*(nodes[others] - nodes[node]).T)
+        others, lengths = others[lengths <= MAX_CONNECTION_DISTANCE], lengths[lengths <= MAX_CONNECTION_DISTANCE]
+        clear = batch_line_of_sight(np.full(len(others), nodes[node, 0]), np.full(len(others), nodes[node, 1]),
+                                    nodes[others, 0], nodes[others, 1], water_mask)
+        for other, length in zip(others[clear].tolist(), lengths[clear].tolist()):
+            neighbours[node].append((other, length))
+            neighbours[other].append((node, length))
+
+    unlinked = [ports[p]['id'] for p in range(len(ports)) if not neighbours[count + p]]
+    if unlinked:
+        print(f"  Warning: {len(unlinked)} port(s) see no waypoint and get no routes: {', '.join(unlinked)}")
+
+    offset = np.array([map_width / 2, map_height / 2])
+    routes = []
+    for p in range(len(ports)):
+        dist, parent = cluster_routes(neighbours, count + p, range(len(nodes)))
+        for q in range(p + 1, len(ports)):
+            if count + q not in dist:
+                continue
+            chain = [count + q]
+            while chain[-1] != count + p:
+                chain.append(parent[chain[-1]])
+            polyline = string_pull(nodes[chain[::-1]], water_mask)
+            length = np.hypot(*np.diff(polyline, axis=0).T).sum()
+            routes.append({
+                'from': ports[p]['id'],
+                'to': ports[q]['id'],
+                'distance': round(float(length), 1),
+                'polyline': np.round(polyline - offset, 1).tolist()
+            })
+
+    pairs = len(ports) * (len(ports) - 1) // 2
+    corners = sum(len(route['polyline']) for route in routes)
+    print(f"  Route atlas: {len(routes)} of {pairs} port pairs routed, "
+          f"{corners / max(len(routes), 1):.1f} corners per route on average")
+    return {'ports': [port['id'] for port in ports], 'routes': routes}
+
+# AIDEV-NOTE: Baked all-pairs routing. next_hop[i, j] is the waypoint to move to from i
+# on a shortest path to j (i itself when i == j), so the game walks a route with table
+# lookups instead of running A*. The graph is undirected, so one Dijkstra rooted at
+# each target j fills column j: the parent of i in j's shortest-path tree is i's next hop.
+ROUTING_UNREACHABLE = 0xFFFF  # next_hop / uint16 distance value for "no path"
+ROUTING_DISTANCE_DTYPES = ('float32', 'uint16')
+
+def waypoint_graph(waypoints):
+    """Adjacency lists [(neighbour, Euclidean cost), ...] per waypoint from its connections."""
+    xs = np.array([wp['x'] for wp in waypoints], dtype=np.float64)
+    ys = np.array([wp['y'] for wp in waypoints], dtype=np.float64)
+    return [[(j, float(np.hypot(xs[j] - xs[i], ys[j] - ys[i]))) for j in wp['connections']]
+            for i, wp in enumerate(waypoints)]
+
+def all_pairs_shortest_paths(waypoints):
+    """
+    Run Dijkstra from every waypoint over the connection graph (Euclidean edge costs).
+    Returns (next_hop, distance): uint16 and float64 [n, n] arrays indexed [from, to].
+    Unreachable pairs get ROUTING_UNREACHABLE and inf.
+    Raises ValueError if the waypoints do not fit uint16 indices.
+    """
+    count = len(waypoints)
+    if count >= ROUTING_UNREACHABLE:
+        raise ValueError(f"routing tables support at most {ROUTING_UNREACHABLE - 1} waypoints (got {count})")
+
+    neighbours = waypoint_graph(waypoints)
+
+    next_hop = np.full((count, count), ROUTING_UNREACHABLE, dtype=np.uint16)
+    distance = np.full((count, count), np.inf)
+    for target in range(count):
+        dist = distance[:, target]
+        parent = next_hop[:, target]
+        dist[target] = 0.0
+        parent[target] = target
+        heap = [(0.0, target)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for neighbour, cost in neighbours[node]:
+                nd = d + cost
+                if nd < dist[neighbour]:
+                    dist[neighbour] = nd
+                    parent[neighbour] = node
+                    heapq.heappush(heap, (nd, neighbour))
+
+    return next_hop, distance
+
+def compute_routing_tables(waypoints):
+    """All-pairs next-hop and distance tables (see all_pairs_shortest_paths), with stats."""
+    count = len(waypoints)
+    next_hop, distance = all_pairs_shortest_paths(waypoints)
+    reachable = np.isfinite(distance)
+    longest = distance[reachable].max() if reachable.any() else 0.0
+    print(f"  Routing tables: {count} waypoints, {int(reachable.sum()) - count} of "
+          f"{count * (count - 1)} ordered pairs reachable, longest route {longest:.0f}px")
+    return next_hop, distance
+
+def encode_routing_tables(next_hop, distance, distance_dtype):
+    """
+    Pack routing tables for the collision data: row-major [from][to] little-endian
+    arrays, base64 encoded. uint16 distances are quantized to the smallest power-of-two
+    step that fits the longest route; ROUTING_UNREACHABLE marks "no path".
+    """
+    count = len(next_hop)
+    reachable = np.isfinite(distance)
+    if distance_dtype == 'float32':
+        step = None
+        encoded = distance.astype('<f4')
+    else:
+        longest = distance[reachable].max() if reachable.any() else 0.0
+        step = 2.0 ** np.ceil(np.log2(max(longest, 1.0) / (ROUTING_UNREACHABLE - 1)))
+        encoded = np.full(distance.shape, ROUTING_UNREACHABLE, dtype='<u2')
+        encoded[reachable] = np.rint(distance[reachable] / step)
+
+    routing = {
+        'count': count,
+        'unreachable': ROUTING_UNREACHABLE,
+        'nextHop': base64.b64encode(next_hop.astype('<u2').tobytes()).decode('ascii'),
+        'distanceDtype': distance_dtype,
+        'distance': base64.b64encode(encoded.tobytes()).decode('ascii')
+    }
+    if step is not None:
+        routing['distanceStep'] = float(step)
+    print(f"  Routing tables encoded: {(next_hop.nbytes + encoded.nbytes) // 1024}KB "
+          f"(next hop uint16 + distance {distance_dtype})")
+    return routing
+
+# AIDEV-NOTE: Water navmesh. A conforming Delaunay triangulation of the island polygons
+# and the map border: constraint edges are split to at most NAVMESH_MAX_EDGE px, then any
+# constraint missing from the triangulation is split at its midpoint and the points are
+# retriangulated until every constraint is an edge. Each triangle then lies wholly in
+# water or on land and is classified by its centroid. The border runs along the outer
+# pixel edges (-0.5 / size - 0.5) so it never overlaps a polygon edge.
+NAVMESH_MAX_EDGE = 32  # Longest constraint edge before triangulation (px)
+NAVMESH_REFINE_PASSES = 16  # Constraint recovery passes before giving up
+NAVMESH_GRID_CELL = 64  # Point-location grid cell size (px)
+
+def conforming_delaunay(rings, bounds, max_edge):
+    """
+    Triangulate closed rings (lists of [x, y]) so every ring edge is covered by
+    triangulation edges. Returns (vertices (V, 2) float64, triangles (T, 3) int64,
+    unrecovered constraint count).
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for navmesh triangulation.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    vertices = []
+    index = {}
+    segments = []
+    for ring in rings:
+        ring_ids = []
+        for k in range(len(ring)):
+            a, b = np.asarray(ring[k], dtype=np.float64), np.asarray(ring[(k + 1) % len(ring)], dtype=np.float64)
+            pieces = max(1, int(np.ceil(np.hypot(*(b - a)) / max_edge)))
+            for step in range(pieces):
+                point = a + (b - a) * step / pieces
+                key = (np.float32(point[0]), np.float32(point[1]))
+                if key not in index:
+                    index[key] = len(vertices)
+                    vertices.append(point)
+                ring_ids.append(index[key])
+        segments += [(i, j) for i, j in zip(ring_ids, ring_ids[1:] + ring_ids[:1]) if i != j]
+
+    min_x, min_y, max_x, max_y = bounds
+    for _ in range(NAVMESH_REFINE_PASSES):
+        subdiv = cv2.Subdiv2D((int(np.floor(min_x)) - 1, int(np.floor(min_y)) - 1,
+                               int(np.ceil(max_x - min_x)) + 3, int(np.ceil(max_y - min_y)) + 3))
+        subdiv.insert([(float(x), float(y)) for x, y in vertices])
+        edges = set()
+        for x0, y0, x1, y1 in subdiv.getEdgeList():
+            a, b = index.get((np.float32(x0), np.float32(y0))), index.get((np.float32(x1), np.float32(y1)))
+            if a is not None and b is not None:
+                edges.add((min(a, b), max(a, b)))
+
+        missing = [(i, j) for i, j in segments if (min(i, j), max(i, j)) not in edges]
+        if not missing:
+            break
+        missing_set = set(missing)
+        split = []
+        for i, j in segments:
+            if (i, j) not in missing_set:
+                split.append((i, j))
+                continue
+            mid = (vertices[i] + vertices[j]) / 2
+            index[(np.float32(mid[0]), np.float32(mid[1]))] = len(vertices)
+            vertices.append(mid)
+            split += [(i, len(vertices) - 1), (len(vertices) - 1, j)]
+        segments = split
+
+    triangles = []
+    for tri in subdiv.getTriangleList():
+        ids = [index.get((np.float32(tri[k]), np.float32(tri[k + 1]))) for k in (0, 2, 4)]
+        if None not in ids:  # Skip triangles using Subdiv2D's virtual outer vertices
+            triangles.append(ids)
+    return np.array(vertices), np.array(triangles, dtype=np.int64).reshape(-1, 3), len(missing)
+
+def build_water_navmesh(island_contours, map_width, map_height, max_edge=NAVMESH_MAX_EDGE):
+    """
+    Triangulate the water between the map border and the island polygons.
+    Returns a dict (image space) with vertices, triangles (counter-clockwise in
+    x-right/y-down axes), adjacency [T, 3] (neighbour across edge k = (v[k], v[k+1]),
+    -1 at coast or map edge), portals [P, 4] (triA, triB, v0, v1) and a
+    point-location grid (CSR: cell_start, cell_triangles).
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for navmesh generation.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    border = [[-0.5, -0.5], [map_width - 0.5, -0.5], [map_width - 0.5, map_height - 0.5], [-0.5, map_height - 0.5]]
+    vertices, triangles, unrecovered = conforming_delaunay(
+        island_contours + [border], (-0.5, -0.5, map_width - 0.5, map_height - 0.5), max_edge)
+    if unrecovered:
+        print(f"  Warning: {unrecovered} coastline edges not recovered after {NAVMESH_REFINE_PASSES} passes "
+              f"(crossing polygons?); triangles there are classified by centroid only")
+
+    # Counter-clockwise winding (positive signed area in image axes)
+    a, b, c = vertices[triangles[:, 0]], vertices[triangles[:, 1]], vertices[triangles[:, 2]]
+    signed_area = ((b - a)[:, 0] * (c - a)[:, 1] - (b - a)[:, 1] * (c - a)[:, 0]) / 2
+    flip = signed_area < 0
+    triangles[flip] = triangles[flip][:, [0, 2, 1]]
+    signed_area = np.abs(signed_area)
+
+    # Keep triangles whose centroid is outside every island polygon
+    centroids = (a + b + c) / 3
+    water = signed_area > 0
+    polygons = [np.asarray(contour, dtype=np.float32) for contour in island_contours]
+    for polygon in polygons:
+        (min_x, min_y), (max_x, max_y) = polygon.min(axis=0), polygon.max(axis=0)
+        near = np.flatnonzero(water & (centroids[:, 0] >= min_x) & (centroids[:, 0] <= max_x) &
+                              (centroids[:, 1] >= min_y) & (centroids[:, 1] <= max_y))
+        for t in near.tolist():
+            if cv2.pointPolygonTest(polygon, (float(centroids[t, 0]), float(centroids[t, 1])), False) >= 0:
+                water[t] = False
+    triangles = triangles[water]
+    water_area = signed_area[water].sum()
 
-def generate_collision_data(island_contours, map_width, map_height, waypoints=None):
+    # Drop vertices only used by land triangles
+    used, triangles = np.unique(triangles, return_inverse=True)
+    triangles = triangles.reshape(-1, 3)
+    vertices = vertices[used]
+
+    # Adjacency across shared edges; each shared edge is one portal
+    edge_a = triangles.ravel()
+    edge_b = triangles[:, [1, 2, 0]].ravel()
+    keys = np.minimum(edge_a, edge_b) * len(vertices) + np.maximum(edge_a, edge_b)
+    order = np.argsort(keys, kind='stable')
+    shared = np.flatnonzero(keys[order][1:] == keys[order][:-1])
+    first, second = order[shared], order[shared + 1]
+    adjacency = np.full(len(edge_a), -1, dtype=np.int64)
+    adjacency[first] = second // 3
+    adjacency[second] = first // 3
+    portals = np.stack([first // 3, second // 3, edge_a[first], edge_b[first]], axis=1)
+
+    # Point-location grid: each cell lists the triangles whose bounding box touches it
+    cells_x = -(-map_width // NAVMESH_GRID_CELL)
+    cells_y = -(-map_height // NAVMESH_GRID_CELL)
+    corners = vertices[triangles]
+    cell_min = np.clip(np.floor(corners.min(axis=1) / NAVMESH_GRID_CELL).astype(np.int64), 0, [cells_x - 1, cells_y - 1])
+    cell_max = np.clip(np.floor(corners.max(axis=1) / NAVMESH_GRID_CELL).astype(np.int64), 0, [cells_x - 1, cells_y - 1])
+    cell_ids, tri_ids = [], []
+    for t, ((cx0, cy0), (cx1, cy1)) in enumerate(zip(cell_min.tolist(), cell_max.tolist())):
+        for cy in range(cy0, cy1 + 1):
+            cell_ids += [cy * cells_x + cx for cx in range(cx0, cx1 + 1)]
+            tri_ids += [t] * (cx1 - cx0 + 1)
+    cell_ids, tri_ids = np.array(cell_ids, dtype=np.int64), np.array(tri_ids, dtype=np.int64)
+    order = np.argsort(cell_ids, kind='stable')
+    cell_start = np.concatenate([[0], np.cumsum(np.bincount(cell_ids, minlength=cells_x * cells_y))])
+
+    print(f"  Navmesh: {len(vertices)} vertices, {len(triangles)} water triangles, {len(portals)} portals, "
+          f"{water_area:.0f}px² of water")
+    return {
+        'vertices': vertices,
+        'triangles': triangles,
+        'adjacency': adjacency.reshape(-1, 3),
+        'portals': portals,
+        'grid_cell': NAVMESH_GRID_CELL,
+        'grid_size': (cells_x, cells_y),
+        'cell_start': cell_start,
+        'cell_triangles': tri_ids[order]
+    }
+
+def encode_navmesh(navmesh, map_width, map_height):
+    """
+    Pack a navmesh from build_water_navmesh for the collision data: world-space float32
+    vertices and integer index arrays, row-major little-endian, base64 encoded.
+    """
+    def pack(array, dtype):
+        return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+    index_dtype = '<u2' if len(navmesh['vertices']) < 0xFFFF else '<u4'
+    world = navmesh['vertices'] - [map_width / 2, map_height / 2]
+    cells_x, cells_y = navmesh['grid_size']
+    return {
+        'vertexCount': len(navmesh['vertices']),
+        'triangleCount': len(navmesh['triangles']),
+        'portalCount': len(navmesh['portals']),
+        'indexDtype': 'uint16' if index_dtype == '<u2' else 'uint32',
+        'vertices': pack(world, '<f4'),
+        'triangles': pack(navmesh['triangles'], index_dtype),
+        'adjacency': pack(navmesh['adjacency'], '<i4'),
+        'portals': pack(navmesh['portals'], '<i4'),
+        'grid': {
+            'cellSize': navmesh['grid_cell'],
+            'width': cells_x,
+            'height': cells_y,
+            'cellStart': pack(navmesh['cell_start'], '<u4'),
+            'cellTriangles': pack(navmesh['cell_triangles'], '<u4')
+        }
+    }
+
+# AIDEV-NOTE: Island levels of detail, coarsest first: 'hull' (convex hull) contains
+# 'coarse', which contains 'polygon' (the detail level). Coarse is an outer
+# simplification built from two moves that only ever add water:
+#   - drop a reflex (or collinear) vertex: the chord between its neighbours bridges a bay
+#   - collapse an edge between two convex vertices: extend the neighbouring edges to
+#     where they meet and replace the edge with that apex
+# A move is taken only if the triangle it adds holds no other vertex and (for a
+# collapse, which adds two new edges) no coastline edge touches the new edges, so the
+# outline stays simple. Moves run in order of how far they push the outline out,
+# while that distance is within LOD_COARSE_EPSILON. The hull is taken from the coarse
+# polygon, because collapse apexes can lie outside the detail polygon's hull.
+LOD_COARSE_EPSILON = 12  # px a coarse edge may sit outside the detail coastline
+
+def outer_simplify(polygon, epsilon):
+    """
+    Simplify a polygon to one that contains it (see AIDEV-NOTE above): vertex drops and
+    edge collapses, smallest outward shift first, while the shift is <= epsilon.
+    """
+    n = len(polygon)
+    if n <= 3:
+        return [list(p) for p in polygon]
+
+    x = np.array([p[0] for p in polygon], dtype=np.float64)
+    y = np.array([p[1] for p in polygon], dtype=np.float64)
+    orientation = np.sign(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+    prev_idx = [(i - 1) % n for i in range(n)]
+    next_idx = [(i + 1) % n for i in range(n)]
+    alive = np.ones(n, dtype=bool)
+    version = [0] * n
+
+    def turn(i, j, k):
+        """Cross product of the turn i -> j -> k, positive when convex for this polygon."""
+        return orientation * ((x[j] - x[i]) * (y[k] - y[j]) - (y[j] - y[i]) * (x[k] - x[j]))
+
+    def triangle_is_empty(corners, own):
+        """True if no live vertex other than `own` lies in or on the triangle."""
+        (ax, ay), (bx, by), (cx, cy) = corners
+        others = alive.copy()
+        others[own] = False
+        px, py = x[others], y[others]
+        sides = [(qx - sx) * (py - sy) - (qy - sy) * (px - sx)
+                 for (sx, sy), (qx, qy) in (((ax, ay), (bx, by)), ((bx, by), (cx, cy)), ((cx, cy), (ax, ay)))]
+        inside = ((sides[0] >= 0) & (sides[1] >= 0) & (sides[2] >= 0)) | \
+                 ((sides[0] <= 0) & (sides[1] <= 0) & (sides[2] <= 0))
+        return not inside.any()
+
+    def crosses_coastline(p, q, skip):
+        """True if segment p-q touches any live edge other than those starting at `skip`."""
+        starts = np.flatnonzero(alive)
+        starts = starts[~np.isin(starts, skip)]
+        ends = np.array([next_idx[k] for k in starts], dtype=np.int64)
+        sx, sy, ex, ey = x[starts], y[starts], x[ends], y[ends]
+        d1 = (q[0] - p[0]) * (sy - p[1]) - (q[1] - p[1]) * (sx - p[0])
+        d2 = (q[0] - p[0]) * (ey - p[1]) - (q[1] - p[1]) * (ex - p[0])
+        d3 = (ex - sx) * (p[1] - sy) - (ey - sy) * (p[0] - sx)
+        d4 = (ex - sx) * (q[1] - sy) - (ey - sy) * (q[0] - sx)
+        return bool(((d1 * d2 <= 0) & (d3 * d4 <= 0)).any())
+
+    def moves(i):
+        """Candidate moves at vertex i: dropping it, or collapsing its edge to the next vertex."""
+        a, b = prev_idx[i], next_idx[i]
+        found = []
+        if turn(a, i, b) <= 0:
+            chord = np.hypot(x[b] - x[a], y[b] - y[a])
+            shift = abs(turn(a, i, b)) / chord if chord > 0 else 0.0
+            found.append((shift, 'drop', None))
+
+        # Edge i -> b: extend a -> i past i and c -> b past b until they meet
+        c = next_idx[b]
+        if turn(a, i, b) > 0 and turn(i, b, c) > 0 and c != a:
+            ux, uy = x[i] - x[a], y[i] - y[a]
+            vx, vy = x[b] - x[c], y[b] - y[c]
+            denom = ux * vy - uy * vx
+            if denom != 0:
+                t = ((x[b] - x[i]) * vy - (y[b] - y[i]) * vx) / denom
+                s = ((x[b] - x[i]) * uy - (y[b] - y[i]) * ux) / denom
+                if t > 0 and s > 0:
+                    apex = (x[i] + t * ux, y[i] + t * uy)
+                    edge = np.hypot(x[b] - x[i], y[b] - y[i])
+                    shift = abs((x[b] - x[i]) * (apex[1] - y[i]) - (y[b] - y[i]) * (apex[0] - x[i])) / edge
+                    found.append((shift, 'collapse', apex))
+        return found
+
+    heap = []
+    def queue(i):
+        version[i] += 1
+        for shift, kind, apex in moves(i):
+            heapq.heappush(heap, (shift, i, version[i], kind, apex))
+
+    for i in range(n):
+        queue(i)
+    count = n
+    while heap and count > 3:
+        shift, i, ver, kind, apex = heapq.heappop(heap)
+        if shift > epsilon:
+            break
+        if not alive[i] or ver != version[i]:
+            continue
+
+        a, b = prev_idx[i], next_idx[i]
+        if kind == 'drop':
+            if not triangle_is_empty(((x[a], y[a]), (x[i], y[i]), (x[b], y[b])), [a, i, b]):
+                continue
+            removed, keep = i, a
+        else:
+            # Two new sides, so an edge could pass through without a vertex inside
+            if (not triangle_is_empty(((x[i], y[i]), apex, (x[b], y[b])), [i, b])
+                    or crosses_coastline((x[i], y[i]), apex, [a, i, b])
+                    or crosses_coastline(apex, (x[b], y[b]), [a, i, b])):
+                continue
+            x[i], y[i] = apex
+            removed, keep = b, i
+
+        alive[removed] = False
+        count -= 1
+        before, after = prev_idx[removed], next_idx[removed]
+        next_idx[before], prev_idx[after] = after, before
+        # Requeue every vertex whose moves read the changed neighbourhood
+        for j in (prev_idx[prev_idx[keep]], prev_idx[keep], keep, next_idx[keep], next_idx[next_idx[keep]]):
+            queue(j)
+
+    # Untouched vertices keep their original (integer) coordinates
+    return [list(polygon[i]) if (x[i], y[i]) == (polygon[i][0], polygon[i][1]) else [float(x[i]), float(y[i])]
+            for i in np.flatnonzero(alive)]
+
+def polygon_area(polygon):
+    """Unsigned shoelace area."""
+    points = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    x, y = points[:, 0], points[:, 1]
+    return abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+def build_island_lods(island_contours, epsilon=LOD_COARSE_EPSILON, auto=False):
+    """
+    Per island {'hull': [...], 'coarse': [...]} (image space) around each detail polygon.
+    auto: keep levels only where they pay off: for a point uniformly placed in the island's
+    bounds, the kept levels minimise the expected number of polygon edges tested (a point
+    reaches the next level with probability area(level) / area(bounds)).
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for island levels of detail.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    lods = []
+    for contour in island_contours:
+        coarse = outer_simplify(contour, epsilon)
+        hull_idx = cv2.convexHull(np.array(coarse, dtype=np.float32).reshape(-1, 1, 2), returnPoints=False)
+        levels = {'hull': [coarse[i] for i in hull_idx.ravel()], 'coarse': coarse}
+        if not auto:
+            lods.append(levels)
+            continue
+        (min_x, min_y), (max_x, max_y) = np.min(contour, axis=0), np.max(contour, axis=0)
+        bounds_area = max((max_x - min_x) * (max_y - min_y), 1)
+
+        def expected_edges(names):
+            reach, cost = 1.0, 0.0
+            for polygon in [levels[name] for name in names] + [contour]:
+                cost += reach * len(polygon)
+                reach = polygon_area(polygon) / bounds_area
+            return cost
+
+        best = min([(), ('coarse',), ('hull',), ('hull', 'coarse')], key=expected_edges)
+        lods.append({name: levels[name] for name in best})
+
+    for level in ('hull', 'coarse'):
+        kept = [lod[level] for lod in lods if level in lod]
+        print(f"  {level.capitalize()} level on {len(kept)} of {len(lods)} islands "
+              f"({sum(len(p) for p in kept)} points)")
+    print(f"  Detail level: {sum(len(c) for c in island_contours)} points")
+    return lods
+
+def generate_collision_data(island_contours, map_width, map_height, waypoints=None, lods=None):
     """
     Generate collision data structure for game use.
     All coordinates are in world space (0,0 at center of map).
+    lods: per-island coarser levels from build_island_lods, exported as island['lod'].
     """
     # Calculate offset to convert from image space to world space
     offsetX = map_width / 2
@@ -911,6 +2178,9 @@ def generate_collision_data(island_contours, map_width, map_height, waypoints=No
             },
             'area': len(world_contour)  # Approximate
         }
+        if lods and lods[i]:
+            island_data['lod'] = {level: [[p[0] - offsetX, p[1] - offsetY] for p in polygon]
+                                  for level, polygon in lods[i].items()}
         islands.append(island_data)
     
     result = {
@@ -933,22 +2203,463 @@ def generate_collision_data(island_contours, map_width, map_height, waypoints=No
     
     return result
 
+@contextlib.contextmanager
+def atomic_write(path, mode='w'):
+    """
+    Open a temporary file next to path for writing and rename it over path when the
+    block finishes, so readers (the game, a running watcher) never see a partial file.
+    """
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def save_collision_data(data, output_path):
     """Save collision data to JSON file."""
-    with open(output_path, 'w') as f:
+    with atomic_write(output_path) as f:
         json.dump(data, f, indent=2)
     print(f"Collision data saved to: {output_path}")
 
-def save_collision_js(data, output_path):
-    """Save collision data as JavaScript module."""
-    with open(output_path, 'w') as f:
+# AIDEV-NOTE: Broadphase grid over the exported (world-space) island polygons. The map
+# is cut into square cells. Each cell lists every polygon edge touching it (CSR:
+# cellOffsets[c]..cellOffsets[c+1] into cellEdges) and the island (-1 = water) at its
+# reference point, a fixed point inside the cell. An edge id is the index of its start
+# point in the islands' polygons concatenated in id order; the edge ends at the next
+# point of the same polygon. A cell without edges is wholly water or wholly that island.
+# In any other cell a query walks the segment from the reference point to the query
+# point. That segment never leaves the cell, so only the cell's edges can cross it, and
+# each crossing toggles the query in or out of that edge's island. The side tests are
+# half-open (a vertex on the segment counts for exactly one of its two edges). The
+# reference point sits off-centre at an odd fraction of the cell, so axis-aligned edges
+# on whole or half pixels never pass through it.
+BROADPHASE_CELL_SIZE = 32  # Cell edge (px)
+BROADPHASE_REF_FRACTION = (0.4629, 0.5371)  # Reference point within its cell (x, y)
+BROADPHASE_CELL_MARGIN = 1e-3  # px an edge may miss a cell by and still be listed
+BROADPHASE_VALIDATION_SAMPLES = 20000  # Points checked against the polygons after baking
+BROADPHASE_COAST_JITTER = 4  # px around edges where half of the validation points go
+
+def points_in_polygon(xs, ys, polygon):
+    """Ray-casting test with the game's pointInPolygon rules, vectorised over points."""
+    poly = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    inside = np.zeros(len(xs), dtype=bool)
+    for (p1x, p1y), (p2x, p2y) in zip(poly.tolist(), np.roll(poly, -1, axis=0).tolist()):
+        if p1y == p2y:
+            continue
+        hit = (ys > min(p1y, p2y)) & (ys <= max(p1y, p2y)) & (xs <= max(p1x, p2x))
+        if p1x != p2x:
+            hit &= xs <= (ys - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+        inside ^= hit
+    return inside
+
+def island_at_points(islands, xs, ys):
+    """Reference land test: id of the first island containing each point (-1 on water), like isOnLand."""
+    result = np.full(len(xs), -1, dtype=np.int64)
+    for island in islands:
+        b = island['bounds']
+        near = np.flatnonzero((result < 0) & (xs >= b['minX']) & (xs <= b['maxX']) &
+                              (ys >= b['minY']) & (ys <= b['maxY']))
+        result[near[points_in_polygon(xs[near], ys[near], island['polygon'])]] = island['id']
+    return result
+
+def broadphase_edges(islands):
+    """(ax, ay, bx, by, island id) arrays over every polygon edge, indexed by edge id."""
+    lengths = np.array([len(island['polygon']) for island in islands], dtype=np.int64)
+    points = np.array([p for island in islands for p in island['polygon']], dtype=np.float64).reshape(-1, 2)
+    ends = np.arange(1, len(points) + 1)
+    ends[np.cumsum(lengths) - 1] = np.cumsum(lengths) - lengths  # Last point closes the ring
+    edge_islands = np.repeat([island['id'] for island in islands], lengths).astype(np.int64)
+    return points[:, 0], points[:, 1], points[ends, 0], points[ends, 1], edge_islands
+
+def segments_cross(px, py, qx, qy, ax, ay, bx, by):
+    """Half-open crossing test between segments p-q and a-b (see the broadphase note)."""
+    ux, uy = qx - px, qy - py
+    if (ux * (ay - py) - uy * (ax - px) > 0) == (ux * (by - py) - uy * (bx - px) > 0):
+        return False
+    vx, vy = bx - ax, by - ay
+    return (vx * (py - ay) - vy * (px - ax) > 0) != (vx * (qy - ay) - vy * (qx - ax) > 0)
+
+def build_broadphase_grid(collision_data, cell_size=BROADPHASE_CELL_SIZE):
+    """
+    Uniform grid over the islands of generate_collision_data (world space): per cell the
+    touching polygon edges (CSR) and the island at the cell's reference point.
+    """
+    islands = collision_data['islands']
+    columns = -(-collision_data['mapWidth'] // cell_size)
+    rows = -(-collision_data['mapHeight'] // cell_size)
+    origin_x, origin_y = -collision_data['mapWidth'] / 2, -collision_data['mapHeight'] / 2
+    ax, ay, bx, by, _ = broadphase_edges(islands)
+
+    # Candidate cells: every cell in each edge's bounding box (grown by the margin)
+    def cell_range(lo, hi, origin, count):
+        first = np.floor((lo - BROADPHASE_CELL_MARGIN - origin) / cell_size).astype(np.int64)
+        last = np.floor((hi + BROADPHASE_CELL_MARGIN - origin) / cell_size).astype(np.int64)
+        return np.clip(first, 0, count - 1), np.clip(last, 0, count - 1)
+
+    x_first, x_last = cell_range(np.minimum(ax, bx), np.maximum(ax, bx), origin_x, columns)
+    y_first, y_last = cell_range(np.minimum(ay, by), np.maximum(ay, by), origin_y, rows)
+    span_x = x_last - x_first + 1
+    counts = span_x * (y_last - y_first + 1)
+    edge_ids = np.repeat(np.arange(len(ax)), counts)
+    k = np.arange(len(edge_ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_x = x_first[edge_ids] + k % span_x[edge_ids]
+    cell_y = y_first[edge_ids] + k // span_x[edge_ids]
+
+    # Drop cells whose (grown) corners all lie strictly on one side of the edge's line
+    dx, dy = (bx - ax)[edge_ids], (by - ay)[edge_ids]
+    left = origin_x + cell_x * cell_size - BROADPHASE_CELL_MARGIN - ax[edge_ids]
+    top = origin_y + cell_y * cell_size - BROADPHASE_CELL_MARGIN - ay[edge_ids]
+    reach = cell_size + 2 * BROADPHASE_CELL_MARGIN
+    sides = np.stack([dx * (top + oy) - dy * (left + ox) for ox in (0, reach) for oy in (0, reach)])
+    touching = ~(np.all(sides > 0, axis=0) | np.all(sides < 0, axis=0))
+    cells = (cell_y * columns + cell_x)[touching]
+    edge_ids = edge_ids[touching]
+
+    order = np.argsort(cells, kind='stable')
+    cell_offsets = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=columns * rows))])
+
+    fx, fy = BROADPHASE_REF_FRACTION
+    ref_x, ref_y = np.meshgrid(origin_x + (np.arange(columns) + fx) * cell_size,
+                               origin_y + (np.arange(rows) + fy) * cell_size)
+    cell_islands = island_at_points(islands, ref_x.ravel(), ref_y.ravel())
+
+    mixed = np.diff(cell_offsets) > 0
+    print(f"  {columns}x{rows} cells of {cell_size}px: {np.count_nonzero(~mixed & (cell_islands < 0))} water, "
+          f"{np.count_nonzero(~mixed & (cell_islands >= 0))} land, {np.count_nonzero(mixed)} coastline "
+          f"(up to {int(np.diff(cell_offsets).max(initial=0))} edges, {len(edge_ids)} entries)")
+    return {
+        'cell_size': cell_size,
+        'columns': columns,
+        'rows': rows,
+        'origin': (origin_x, origin_y),
+        'ref_fraction': BROADPHASE_REF_FRACTION,
+        'cell_islands': cell_islands,
+        'cell_offsets': cell_offsets,
+        'cell_edges': edge_ids[order]
+    }
+
+def broadphase_island_at(grid, edges, x, y):
+    """
+    Reference broadphase query (mirrors Collision.islandAt): island id at world (x, y),
+    -1 on water. edges: broadphase_edges() of the same islands, as lists.
+    """
+    cell_size, (origin_x, origin_y), (fx, fy) = grid['cell_size'], grid['origin'], grid['ref_fraction']
+    cx, cy = math.floor((x - origin_x) / cell_size), math.floor((y - origin_y) / cell_size)
+    if not (0 <= cx < grid['columns'] and 0 <= cy < grid['rows']):
+        return -1
+    cell = cy * grid['columns'] + cx
+    ref_x, ref_y = origin_x + (cx + fx) * cell_size, origin_y + (cy + fy) * cell_size
+
+    ax, ay, bx, by, edge_islands = edges
+    inside = {int(grid['cell_islands'][cell])} - {-1}
+    for e in grid['cell_edges'][grid['cell_offsets'][cell]:grid['cell_offsets'][cell + 1]].tolist():
+        if segments_cross(ref_x, ref_y, x, y, ax[e], ay[e], bx[e], by[e]):
+            inside ^= {edge_islands[e]}
+    return min(inside, default=-1)
+
+def validate_broadphase_grid(collision_data, grid, samples=BROADPHASE_VALIDATION_SAMPLES):
+    """
+    Compare broadphase_island_at with the full polygon test at random points: half spread
+    over the map, half near the coastline. Raises ValueError on any disagreement.
+    """
+    islands = collision_data['islands']
+    edges = broadphase_edges(islands)
+    rng = np.random.default_rng(0)
+    width, height = collision_data['mapWidth'], collision_data['mapHeight']
+    xs = rng.uniform(-width / 2, width / 2, samples)
+    ys = rng.uniform(-height / 2, height / 2, samples)
+    if len(edges[0]):
+        coast = rng.integers(len(edges[0]), size=samples // 2)
+        t = rng.uniform(0, 1, len(coast))
+        jitter = rng.uniform(-BROADPHASE_COAST_JITTER, BROADPHASE_COAST_JITTER, (2, len(coast)))
+        xs[:len(coast)] = edges[0][coast] + t * (edges[2][coast] - edges[0][coast]) + jitter[0]
+        ys[:len(coast)] = edges[1][coast] + t * (edges[3][coast] - edges[1][coast]) + jitter[1]
+
+    expected = island_at_points(islands, xs, ys)
+    edge_lists = [column.tolist() for column in edges]
+    found = np.array([broadphase_island_at(grid, edge_lists, x, y) for x, y in zip(xs.tolist(), ys.tolist())])
+    mismatches = int(np.count_nonzero(found != expected))
+    if mismatches:
+        raise ValueError(f"broadphase grid disagrees with the polygons at {mismatches} of {samples} points")
+    print(f"  Matches the polygon test at {samples} sample points")
+
+def encode_broadphase_grid(grid):
+    """Pack a grid from build_broadphase_grid for the collision data (little-endian, base64)."""
+    def pack(array, dtype):
+        return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+    return {
+        'cellSize': grid['cell_size'],
+        'columns': grid['columns'],
+        'rows': grid['rows'],
+        'originX': grid['origin'][0],
+        'originY': grid['origin'][1],
+        'refX': grid['ref_fraction'][0],
+        'refY': grid['ref_fraction'][1],
+        'cellIslands': pack(grid['cell_islands'], '<i4'),
+        'cellOffsets': pack(grid['cell_offsets'], '<u4'),
+        'cellEdges': pack(grid['cell_edges'], '<u4')
+    }
+
+def decode_broadphase_grid(encoded):
+    """Inverse of encode_broadphase_grid."""
+    def unpack(name, dtype):
+        return np.frombuffer(base64.b64decode(encoded[name]), dtype=dtype)
+
+    return {
+        'cell_size': encoded['cellSize'],
+        'columns': encoded['columns'],
+        'rows': encoded['rows'],
+        'origin': (encoded['originX'], encoded['originY']),
+        'ref_fraction': (encoded['refX'], encoded['refY']),
+        'cell_islands': unpack('cellIslands', '<i4'),
+        'cell_offsets': unpack('cellOffsets', '<u4'),
+        'cell_edges': unpack('cellEdges', '<u4')
+    }
+
+# AIDEV-NOTE: Binary collision format (.bin), little-endian, version 2. A 32-byte header
+# is followed by a section table of (offset u32, byte length u32) pairs, in
+# COLLISION_BIN_SECTIONS order. Every section starts on an 8-byte boundary, so each one
+# maps directly onto a JS typed array over the ArrayBuffer (or np.frombuffer/np.memmap).
+# Coordinates are world space, int16 when every value is integral and fits (flag bit 0),
+# else float32. Island polygons and waypoint adjacency are CSR: offsets[i]..offsets[i+1].
+# Version 2 appends the broadphase grid sections (empty when baked without --broadphase);
+# version 1 files (first six sections only) still load.
+COLLISION_BIN_MAGIC = b'BOTC'
+COLLISION_BIN_VERSION = 2
+COLLISION_BIN_FLAG_INT16 = 1  # Coordinates (points, bounds, waypoints) stored as int16
+COLLISION_BIN_HEADER = 32  # Bytes before the section table
+COLLISION_BIN_ALIGN = 8
+COLLISION_BIN_SECTIONS = ('islandOffsets', 'islandBounds', 'points', 'waypoints', 'adjacencyOffsets', 'adjacency',
+                          'broadphaseGrid', 'cellIslands', 'cellOffsets', 'cellEdges')
+COLLISION_BIN_SECTION_COUNTS = {1: 6, 2: 10}  # Sections present per file version
+
+def encode_collision_binary(data):
+    """
+    Pack islands, the waypoint graph and the broadphase grid (if baked) from
+    generate_collision_data in the binary layout above. Other extras (routing,
+    navmesh, ...) stay JSON-only. Returns (bytes, True if coordinates are int16).
+    """
+    islands = data['islands']
+    waypoints = data.get('waypoints', [])
+    points = np.array([p for island in islands for p in island['polygon']], dtype=np.float64).reshape(-1, 2)
+    bounds = np.array([[i['bounds']['minX'], i['bounds']['minY'], i['bounds']['maxX'], i['bounds']['maxY']]
+                       for i in islands], dtype=np.float64).reshape(-1, 4)
+    wp_xy = np.array([[wp['x'], wp['y']] for wp in waypoints], dtype=np.float64).reshape(-1, 2)
+    if any(wp['id'] != i for i, wp in enumerate(waypoints)):
+        raise ValueError("binary export needs waypoint ids equal to their index")
+
+    coords = np.concatenate([points.ravel(), bounds.ravel(), wp_xy.ravel()])
+    int16 = np.iinfo(np.int16)
+    compact = bool(np.all(coords == np.round(coords)) and np.all((coords >= int16.min) & (coords <= int16.max)))
+    coord_dtype = '<i2' if compact else '<f4'
+
+    sections = {
+        'islandOffsets': np.cumsum([0] + [len(i['polygon']) for i in islands]).astype('<u4'),
+        'islandBounds': bounds.astype(coord_dtype),
+        'points': points.astype(coord_dtype),
+        'waypoints': wp_xy.astype(coord_dtype),
+        'adjacencyOffsets': np.cumsum([0] + [len(wp['connections']) for wp in waypoints]).astype('<u4'),
+        'adjacency': np.array([c for wp in waypoints for c in wp['connections']], dtype='<u4'),
+        'broadphaseGrid': np.zeros(0, dtype='<f8'),
+        'cellIslands': np.zeros(0, dtype='<i4'),
+        'cellOffsets': np.zeros(0, dtype='<u4'),
+        'cellEdges': np.zeros(0, dtype='<u4')
+    }
+    if 'broadphase' in data:
+        grid = decode_broadphase_grid(data['broadphase'])
+        sections['broadphaseGrid'] = np.array([grid['cell_size'], grid['columns'], grid['rows'],
+                                               *grid['origin'], *grid['ref_fraction']], dtype='<f8')
+        sections['cellIslands'] = grid['cell_islands']
+        sections['cellOffsets'] = grid['cell_offsets'].astype('<u4')
+        sections['cellEdges'] = grid['cell_edges'].astype('<u4')
+
+    header = np.zeros(COLLISION_BIN_HEADER, dtype=np.uint8)
+    header[:4] = np.frombuffer(COLLISION_BIN_MAGIC, dtype=np.uint8)
+    header[4:8] = np.frombuffer(np.array([COLLISION_BIN_VERSION, COLLISION_BIN_FLAG_INT16 if compact else 0],
+                                         dtype='<u2').tobytes(), dtype=np.uint8)
+    header[8:32] = np.frombuffer(np.array([data['mapWidth'], data['mapHeight'], len(islands), len(points),
+                                           len(waypoints), len(sections['adjacency'])], dtype='<u4').tobytes(),
+                                 dtype=np.uint8)
+
+    table = []
+    offset = COLLISION_BIN_HEADER + 8 * len(COLLISION_BIN_SECTIONS)
+    for name in COLLISION_BIN_SECTIONS:
+        offset = -(-offset // COLLISION_BIN_ALIGN) * COLLISION_BIN_ALIGN
+        table += [offset, sections[name].nbytes]
+        offset += sections[name].nbytes
+
+    parts = [header.tobytes(), np.array(table, dtype='<u4').tobytes()]
+    size = COLLISION_BIN_HEADER + 8 * len(COLLISION_BIN_SECTIONS)
+    for name, section_offset in zip(COLLISION_BIN_SECTIONS, table[::2]):
+        parts += [b'\0' * (section_offset - size), sections[name].tobytes()]
+        size = section_offset + sections[name].nbytes
+    return b''.join(parts), compact
+
+def save_collision_binary(data, output_path):
+    """Save the encode_collision_binary layout of collision data as a .bin file."""
+    encoded, compact = encode_collision_binary(data)
+    with atomic_write(output_path, 'wb') as f:
+        f.write(encoded)
+
+    print(f"Binary collision data saved to: {output_path} ({len(encoded) // 1024}KB, "
+          f"{'int16' if compact else 'float32'} coordinates)")
+
+def load_collision_binary(path):
+    """
+    Read a file written by save_collision_binary (memory-mapped, zero-copy sections).
+    Returns the generate_collision_data dict shape (islands, waypoints, broadphase) for
+    round-trip checks.
+    """
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(data[:4]) != COLLISION_BIN_MAGIC:
+        raise ValueError(f"{path} is not a BOTA collision file (bad magic)")
+    version, flags = (int(v) for v in np.frombuffer(data, dtype='<u2', count=2, offset=4))
+    if version not in COLLISION_BIN_SECTION_COUNTS:
+        raise ValueError(f"{path}: unsupported collision file version {version}")
+    map_width, map_height = (int(v) for v in np.frombuffer(data, dtype='<u4', count=6, offset=8)[:2])
+    names = COLLISION_BIN_SECTIONS[:COLLISION_BIN_SECTION_COUNTS[version]]
+    table = np.frombuffer(data, dtype='<u4', count=2 * len(names), offset=COLLISION_BIN_HEADER)
+
+    coord_dtype = np.dtype('<i2' if flags & COLLISION_BIN_FLAG_INT16 else '<f4')
+    dtypes = {'islandOffsets': np.dtype('<u4'), 'islandBounds': coord_dtype, 'points': coord_dtype,
+              'waypoints': coord_dtype, 'adjacencyOffsets': np.dtype('<u4'), 'adjacency': np.dtype('<u4'),
+              'broadphaseGrid': np.dtype('<f8'), 'cellIslands': np.dtype('<i4'), 'cellOffsets': np.dtype('<u4'),
+              'cellEdges': np.dtype('<u4')}
+    sections = {name: np.frombuffer(data, dtype=dtypes[name], count=int(table[2 * k + 1]) // dtypes[name].itemsize,
+                                    offset=int(table[2 * k]))
+                for k, name in enumerate(names)}
+
+    island_offsets = sections['islandOffsets']
+    points = sections['points'].reshape(-1, 2).tolist()
+    bounds = sections['islandBounds'].reshape(-1, 4).tolist()
+    islands = [{'id': i,
+                'polygon': points[island_offsets[i]:island_offsets[i + 1]],
+                'bounds': {'minX': b[0], 'maxX': b[2], 'minY': b[1], 'maxY': b[3]},
+                'area': int(island_offsets[i + 1] - island_offsets[i])}
+               for i, b in enumerate(bounds)]
+
+    adjacency_offsets = sections['adjacencyOffsets']
+    adjacency = sections['adjacency'].tolist()
+    waypoints = [{'id': i, 'x': x, 'y': y, 'connections': adjacency[adjacency_offsets[i]:adjacency_offsets[i + 1]]}
+                 for i, (x, y) in enumerate(sections['waypoints'].reshape(-1, 2).tolist())]
+
+    result = {'mapWidth': map_width, 'mapHeight': map_height, 'islands': islands}
+    if waypoints:
+        result['waypoints'] = waypoints
+    if len(sections.get('broadphaseGrid', ())):
+        cell_size, columns, rows, origin_x, origin_y, ref_x, ref_y = sections['broadphaseGrid'].tolist()
+        result['broadphase'] = encode_broadphase_grid({
+            'cell_size': int(cell_size), 'columns': int(columns), 'rows': int(rows),
+            'origin': (origin_x, origin_y), 'ref_fraction': (ref_x, ref_y),
+            'cell_islands': sections['cellIslands'], 'cell_offsets': sections['cellOffsets'],
+            'cell_edges': sections['cellEdges']})
+    return result
+
+def save_collision_js(data, output_path, binary=False):
+    """
+    Save collision data as JavaScript module.
+    binary: carry islands, waypoints and the broadphase grid as one base64 string in the
+    binary layout (collision.js decodes it with typed arrays) instead of JSON literals.
+    """
+    if binary:
+        encoded, _ = encode_collision_binary(data)
+        data = {key: value for key, value in data.items() if key not in ('islands', 'waypoints', 'broadphase')}
+        data['binary'] = base64.b64encode(encoded).decode('ascii')
+    with atomic_write(output_path) as f:
         f.write('// BOTA - Collision Data (Auto-generated)\n')
         f.write('// Regenerate with: python detect_islands.py --visualize\n')
         f.write('// AIDEV-NOTE: All coordinates are in WORLD SPACE (0,0 at center of map)\n\n')
         f.write('const COLLISION_DATA = ')
         json.dump(data, f, indent=2)
         f.write(';\n')
-    print(f"JavaScript collision data saved to: {output_path}")
+    print(f"JavaScript collision data saved to: {output_path}" + (" (binary islands and waypoints)" if binary else ""))
+
+# AIDEV-NOTE: Debug rendering draws every element through one function for any map
+# region. Connections go into one overlay that is blended once (a blend per edge was a
+# full-frame copy per edge). OpenCV clips lines to the canvas before rasterizing, which
+# can shift pixels, so deep-zoom base tiles are drawn on a canvas padded by the longest
+# drawn segment: no line touching a tile is clipped, and tiles match the full image
+# (minus its legend). Elements are culled per region with a margin that covers line
+# thickness, waypoint circles and island id labels.
+VIS_EDGE_ALPHA = 0.3  # Opacity of waypoint connection lines
+VIS_CULL_MARGIN = 32  # px around a region within which elements are still drawn
+VIS_TILE_SIZE = 256  # Deep-zoom tile edge (px)
+DZI_NAMESPACE = 'http://schemas.microsoft.com/deepzoom/2008'
+
+def visualization_elements(island_contours, waypoints):
+    """Collect what visualize_collision draws: contours, id label anchors, edges and waypoints."""
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for visualization.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    contours = [np.array(contour, dtype=np.int32).reshape(-1, 1, 2) for contour in island_contours]
+    labels = []
+    for i, cv_contour in enumerate(contours):
+        M = cv2.moments(cv_contour)
+        if M['m00'] != 0:
+            labels.append((f"#{i}", int(M['m10'] / M['m00']), int(M['m01'] / M['m00'])))
+
+    waypoints = waypoints or []
+    points = np.array([[wp['x'], wp['y']] for wp in waypoints], dtype=np.int32).reshape(-1, 2)
+    # Each connection once (from lower ID to higher ID)
+    edges = np.array([(wp['id'], conn_id) for wp in waypoints for conn_id in wp['connections']
+                      if conn_id > wp['id']], dtype=np.int64).reshape(-1, 2)
+    segments = points[edges]
+    lengths = [np.hypot(*(segments[:, 1] - segments[:, 0]).T)]
+    lengths += [np.hypot(*(np.roll(c[:, 0], -1, axis=0) - c[:, 0]).T) for c in contours]
+    return {
+        'contours': contours,
+        'contour_bounds': np.array([cv2.boundingRect(c) for c in contours], dtype=np.int64).reshape(-1, 4),
+        'labels': labels,
+        'segments': segments,
+        'points': points,
+        'reach': int(np.ceil(max((l.max() for l in lengths if len(l)), default=0))) + VIS_CULL_MARGIN
+    }
+
+def draw_visualization(canvas, x0, y0, elements):
+    """Draw the debug overlay into canvas, which shows the map region starting at (x0, y0)."""
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for visualization.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+    height, width = canvas.shape[:2]
+    lo = np.array([x0 - VIS_CULL_MARGIN, y0 - VIS_CULL_MARGIN])
+    hi = np.array([x0 + width + VIS_CULL_MARGIN, y0 + height + VIS_CULL_MARGIN])
+    origin = np.array([x0, y0], dtype=np.int32)
+
+    # Waypoint connections first (so they're behind waypoints), one blend for all of them
+    segments = elements['segments']
+    seg_lo, seg_hi = segments.min(axis=1), segments.max(axis=1)
+    segments = segments[((seg_hi >= lo) & (seg_lo < hi)).all(axis=1)]
+    if len(segments):
+        overlay = canvas.copy()
+        cv2.polylines(overlay, list(segments - origin), False, (0, 255, 0), 1)
+        cv2.addWeighted(canvas, 1 - VIS_EDGE_ALPHA, overlay, VIS_EDGE_ALPHA, 0, dst=canvas)
+
+    # Island contours in red
+    bounds = elements['contour_bounds']
+    visible = ((bounds[:, :2] + bounds[:, 2:] >= lo) & (bounds[:, :2] < hi)).all(axis=1)
+    contours = [c for c, keep in zip(elements['contours'], visible) if keep]
+    cv2.drawContours(canvas, contours, -1, (255, 0, 0), 2, offset=(-x0, -y0))
+
+    # Island IDs at centroids
+    for text, cx, cy in elements['labels']:
+        if lo[0] <= cx < hi[0] and lo[1] <= cy < hi[1]:
+            cv2.putText(canvas, text, (cx - x0, cy - y0), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+
+    # Waypoints as green circles
+    points = elements['points']
+    for x, y in points[((points >= lo) & (points < hi)).all(axis=1)].tolist():
+        cv2.circle(canvas, (x - x0, y - y0), 5, (0, 255, 0), -1)
 
 def visualize_collision(img_array, island_contours, waypoints, output_path):
     """
@@ -960,47 +2671,10 @@ def visualize_collision(img_array, island_contours, waypoints, output_path):
         print("Skipping visualization (OpenCV not available)")
         return
     
-    # Create output image
-    vis = img_array.copy()
-    
-    # Draw waypoint connections first (so they're behind waypoints)
-    if waypoints:
-        print("Drawing waypoint connections...")
-        for wp in waypoints:
-            for conn_id in wp['connections']:
-                # Only draw each connection once (from lower ID to higher ID)
-                if conn_id > wp['id']:
-                    conn_wp = waypoints[conn_id]
-                    # Draw green line with transparency
-                    overlay = vis.copy()
-                    cv2.line(overlay, 
-                            (wp['x'], wp['y']), 
-                            (conn_wp['x'], conn_wp['y']), 
-                            (0, 255, 0), 1)
-                    # Blend with alpha 0.3
-                    vis = cv2.addWeighted(vis, 0.7, overlay, 0.3, 0)
-    
-    # Draw island contours in red
-    for i, contour in enumerate(island_contours):
-        # Convert back to cv2 format
-        cv_contour = np.array(contour, dtype=np.int32).reshape(-1, 1, 2)
-        
-        # Draw contour in red
-        cv2.drawContours(vis, [cv_contour], -1, (255, 0, 0), 2)
-        
-        # Draw island ID at centroid
-        M = cv2.moments(cv_contour)
-        if M['m00'] != 0:
-            cx = int(M['m10'] / M['m00'])
-            cy = int(M['m01'] / M['m00'])
-            cv2.putText(vis, f"#{i}", (cx, cy), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
-    
-    # Draw waypoints as green circles
-    if waypoints:
-        print(f"Drawing {len(waypoints)} waypoints...")
-        for wp in waypoints:
-            cv2.circle(vis, (wp['x'], wp['y']), 5, (0, 255, 0), -1)
+    elements = visualization_elements(island_contours, waypoints)
+    print(f"Drawing {len(elements['segments'])} waypoint connections and {len(elements['points'])} waypoints...")
+    vis = np.array(img_array)
+    draw_visualization(vis, 0, 0, elements)
     
     # Add legend
     legend_y = 30
@@ -1015,57 +2689,1198 @@ def visualize_collision(img_array, island_contours, waypoints, output_path):
     Image.fromarray(vis).save(output_path)
     print(f"Visualization saved to: {output_path}")
 
-def main():
-    """Main script entry point."""
-    import argparse
-    
-    parser = argparse.ArgumentParser(description='Detect island boundaries from map')
-    parser.add_argument('--input', default='assets/map/world_map.png',
-                       help='Path to input map image')
-    parser.add_argument('--output', default='assets/map/collision_data.json',
-                       help='Path to output collision data JSON')
-    parser.add_argument('--js-output', default='src/collision_data.js',
-                       help='Path to output JavaScript module')
-    parser.add_argument('--visualize', action='store_true',
-                       help='Create visualization image')
-    parser.add_argument('--vis-output', default='assets/map/islands_debug.png',
-                       help='Path to visualization output')
-    
-    args = parser.parse_args()
-    
-    print("BOTA - Island Boundary Detection")
-    print("=" * 50)
-    print(f"Loading map: {args.input}")
-    
-    # Load map
-    img_array = load_map(args.input)
+def save_visualization_tiles(img_array, island_contours, waypoints, dzi_path, tile_size=VIS_TILE_SIZE):
+    """
+    Write the visualization as a Deep Zoom pyramid: dzi_path (XML index, readable by
+    OpenSeadragon and similar viewers) plus <name>_files/<level>/<col>_<row>.png.
+    Full-resolution tiles are rendered straight from the map region, and every coarser
+    tile is downsampled from its four children, so only one tile per level is in memory.
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for deep-zoom tiles.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    elements = visualization_elements(island_contours, waypoints)
+    height, width = img_array.shape[:2]
+    max_level = int(np.ceil(np.log2(max(width, height, 2))))
+    tiles_dir = os.path.splitext(dzi_path)[0] + '_files'
+
+    def level_size(level):
+        scale = 1 << (max_level - level)
+        return -(-width // scale), -(-height // scale)
+
+    def build(level, col, row):
+        level_w, level_h = level_size(level)
+        x0, y0 = col * tile_size, row * tile_size
+        tile_w, tile_h = min(tile_size, level_w - x0), min(tile_size, level_h - y0)
+        if level == max_level:
+            pad = elements['reach']
+            px0, py0 = max(x0 - pad, 0), max(y0 - pad, 0)
+            canvas = np.array(img_array[py0:min(y0 + tile_h + pad, height), px0:min(x0 + tile_w + pad, width)])
+            draw_visualization(canvas, px0, py0, elements)
+            tile = canvas[y0 - py0:y0 - py0 + tile_h, x0 - px0:x0 - px0 + tile_w]
+        else:
+            child_w, child_h = level_size(level + 1)
+            children = np.zeros((min(2 * tile_size, child_h - 2 * y0), min(2 * tile_size, child_w - 2 * x0), 3),
+                                dtype=np.uint8)
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    if 2 * x0 + dx * tile_size < child_w and 2 * y0 + dy * tile_size < child_h:
+                        child = build(level + 1, 2 * col + dx, 2 * row + dy)
+                        children[dy * tile_size:dy * tile_size + child.shape[0],
+                                 dx * tile_size:dx * tile_size + child.shape[1]] = child
+            tile = cv2.resize(children, (tile_w, tile_h), interpolation=cv2.INTER_AREA)
+
+        level_dir = os.path.join(tiles_dir, str(level))
+        os.makedirs(level_dir, exist_ok=True)
+        Image.fromarray(tile).save(os.path.join(level_dir, f"{col}_{row}.png"))
+        return tile
+
+    print(f"Rendering deep-zoom tiles ({max_level + 1} levels, {tile_size}px tiles)...")
+    build(0, 0, 0)
+    with open(dzi_path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<Image xmlns="{DZI_NAMESPACE}" TileSize="{tile_size}" Overlap="0" Format="png">\n'
+                f'  <Size Width="{width}" Height="{height}"/>\n'
+                '</Image>\n')
+    print(f"Deep-zoom visualization saved to: {dzi_path}")
+
+# AIDEV-NOTE: Stage cache keys hash the upstream key, explicit params and the source
+# of every function a stage runs. Editing a magic number inside generate_waypoints
+# invalidates only waypoints + connections; the decoded image, water mask and contours
+# are reused. Keep these lists in sync when a stage starts calling a new helper.
+STAGE_FUNCTIONS = {
+    'image': [load_map],
+    'water': [classify_water, detect_water],
+    'water_lut': [build_water_lut, evaluate_water_rules, eval_rule_condition, _eval_rule_expr,
+                  detect_water],
+    'contours': [find_island_contours, simplify_island_contours, ring_neighbours, ring_areas, remove_kinks],
+    'mask': [create_water_mask_from_polygons, create_island_label_map, island_label_dtype,
+             compute_clearance_field, signed_distance],
+    'waypoints': [generate_waypoints, push_rings_out, ring_neighbours, push_waypoints_out, pushed_positions_valid,
+                  batch_line_of_sight, _mask_samples, ring_edges, append_unique_edges,
+                  waypoint_graph_arrays],
+    'connections': [calculate_waypoint_connections, find_pairs_within_radius,
+                    batch_line_of_sight, _mask_samples, append_unique_edges],
+}
+CACHE_ENTRIES_PER_STAGE = 3  # Most recently used entries kept per stage
+BAKE_MANIFEST_NAME = 'last_bake.json'  # Previous bake state used by --dirty
+
+def file_digest(path):
+    """SHA-256 of a file's bytes (streams, so large maps don't need a second copy in memory)."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    except OSError as e:
+        print(f"Error loading map: {e}")
+        sys.exit(1)
+    return digest.hexdigest()
+
+class StageCache:
+    """
+    Content-hashed store of bake stage outputs (.npz for arrays and waypoint graphs, .json for polygons).
+    A rerun only recomputes stages whose key changed and everything downstream of them.
+    cache_dir=None disables caching (every stage recomputes).
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, stage, upstream_key, params=None):
+        """Key for a stage from its upstream key, params and implementation source."""
+        digest = hashlib.sha256()
+        digest.update(stage.encode())
+        digest.update(upstream_key.encode())
+        for func in STAGE_FUNCTIONS[stage]:
+            digest.update(inspect.getsource(func).encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()[:20]
+
+    def run(self, stage, key, compute, kind):
+        """
+        Return the cached output for (stage, key), or compute and store it.
+        kind='npz' expects compute() to return a dict of arrays; kind='json' any JSON value.
+        """
+        if self.cache_dir is None:
+            return compute()
+
+        path = os.path.join(self.cache_dir, f"{stage}-{key}.{kind}")
+        if os.path.exists(path):
+            print(f"  [cache] Reusing {stage} stage ({key[:8]})")
+            os.utime(path)  # Mark as recently used for pruning
+            return self._load(path, kind)
+
+        result = compute()
+        self._store(path, kind, result)
+        self._prune(stage)
+        return result
+
+    def load(self, stage, key, kind):
+        """Return a stored stage output, or None if it is not in the cache."""
+        path = os.path.join(self.cache_dir, f"{stage}-{key}.{kind}")
+        if not os.path.exists(path):
+            return None
+        return self._load(path, kind)
+
+    def save_manifest(self, bake):
+        """Record the last completed bake (image key, parameters, polygons, waypoints) for dirty rebakes."""
+        manifest = {
+            'image_key': bake['image_key'],
+            'water_lut_key': bake['water_lut_key'],
+            'params': bake['params'],
+            'width': bake['width'],
+            'height': bake['height'],
+            'island_contours': bake['island_contours'],
+            'waypoints': bake['waypoints']
+        }
+        self._store(os.path.join(self.cache_dir, BAKE_MANIFEST_NAME), 'json', manifest)
+
+    def load_manifest(self):
+        """Return the last completed bake recorded by save_manifest, or None."""
+        path = os.path.join(self.cache_dir, BAKE_MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        return self._load(path, 'json')
+
+    def _load(self, path, kind):
+        if kind == 'json':
+            with open(path) as f:
+                return json.load(f)
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def _store(self, path, kind, result):
+        # Write then rename so an interrupted bake never leaves a truncated entry
+        with atomic_write(path, 'wb' if kind == 'npz' else 'w') as f:
+            if kind == 'json':
+                json.dump(result, f)
+            else:
+                np.savez(f, **result)
+
+    def _prune(self, stage):
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                   if name.startswith(stage + '-') and not name.endswith('.tmp')]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for stale in entries[CACHE_ENTRIES_PER_STAGE:]:
+            os.remove(stale)
+
+def detect_image_water(img_array, image_key, cache, water_lut):
+    """Water mask of the whole map image (cached stage). Returns (mask, stage key)."""
+    water_key = cache.key('water', image_key, water_lut['key'] if water_lut else None)
+    image_water_mask = cache.run('water', water_key,
+                                 lambda: {'water': classify_water(img_array, water_lut)}, 'npz')['water']
+    return image_water_mask, water_key
+
+# AIDEV-NOTE: Bake tuning parameters (--params PARAMS.json, --sweep grids, --watch).
+# Each name is a stage function argument and defaults to its module constant. The
+# stage cache keys on these values, so a change reruns only the stages that read it:
+# contours for the first three, waypoints for the push passes, connections for the radius.
+BAKE_PARAMETERS = {
+    'min_collision_area': MIN_COLLISION_AREA,
+    'epsilon_buckets': CONTOUR_EPSILON_BUCKETS,
+    'kink_threshold': KINK_DOT_THRESHOLD,
+    'push_distances': PUSH_DISTANCES,
+    'push_visibility': PUSH_VISIBILITY,
+    'max_connection_distance': MAX_CONNECTION_DISTANCE
+}
+
+def json_tuples(value):
+    """A JSON value with every list turned into a tuple, so it compares equal to the defaults."""
+    return tuple(json_tuples(v) for v in value) if isinstance(value, list) else value
+
+def load_bake_params(path):
+    """Read a bake parameters JSON file ({parameter: value}). Parameters it leaves out keep their defaults."""
+    with open(path) as f:
+        overrides = json.load(f)
+    unknown = sorted(set(overrides) - set(BAKE_PARAMETERS))
+    if unknown:
+        raise ValueError(f"{path}: unknown bake parameter(s) {unknown} (known: {sorted(BAKE_PARAMETERS)})")
+    return {**BAKE_PARAMETERS, **{name: json_tuples(value) for name, value in overrides.items()}}
+
+def run_bake_stages(input_path, cache, water_lut=None, params=BAKE_PARAMETERS):
+    """
+    Run the bake from map image to connected waypoints, reusing cached stages.
+    water_lut: table from load_water_lut, or None to classify with detect_water.
+    params: bake tuning parameters (BAKE_PARAMETERS names).
+    Returns a dict with every stage output.
+    """
+    PROFILER.start_stage('image')
+    print(f"Loading map: {input_path}")
+    image_key = cache.key('image', file_digest(input_path))
+    img_array = cache.run('image', image_key, lambda: {'image': load_map(input_path)}, 'npz')['image']
     height, width = img_array.shape[:2]
     print(f"Map size: {width}x{height}")
-    
+
     # Detect water from image (used only for initial contour detection)
+    PROFILER.start_stage('water')
     print("Detecting water/land boundaries from image...")
-    image_water_mask = detect_water(img_array)
+    image_water_mask, water_key = detect_image_water(img_array, image_key, cache, water_lut)
     water_percent = (image_water_mask.sum() / image_water_mask.size) * 100
     print(f"Initial water coverage: {water_percent:.1f}%")
-    
+
     # Find island contours (simplified polygons)
+    PROFILER.start_stage('contours')
     print("Finding island contours...")
-    island_contours = find_island_contours(image_water_mask)
+    contours_key = cache.key('contours', water_key,
+                             [params['min_collision_area'], params['epsilon_buckets'], params['kink_threshold']])
+    island_contours = cache.run('contours', contours_key, lambda: find_island_contours(
+        image_water_mask, params['min_collision_area'], params['epsilon_buckets'], params['kink_threshold']), 'json')
     print(f"Found {len(island_contours)} islands")
-    
-    # Generate authoritative water mask from simplified collision polygons
+
+    # Generate authoritative water mask from simplified collision polygons, plus the
+    # clearance field and island label raster derived from the same polygons
+    PROFILER.start_stage('mask')
     print("Generating water mask from collision polygons (authoritative)...")
+    mask_key = cache.key('mask', contours_key, [width, height])
+
+    def compute_masks():
+        water_mask = create_water_mask_from_polygons(island_contours, width, height)
+        print("Computing clearance field...")
+        return {
+            'water_mask': water_mask,
+            'clearance': compute_clearance_field(water_mask),
+            'island_labels': create_island_label_map(island_contours, width, height)
+        }
+
+    masks = cache.run('mask', mask_key, compute_masks, 'npz')
+    water_mask = masks['water_mask']
+
+    # Generate waypoints using polygon-based water mask
+    PROFILER.start_stage('waypoints')
+    waypoints_key = cache.key('waypoints', mask_key,
+                              [LOS_SAMPLE_INTERVAL, params['push_distances'], params['push_visibility']])
+    graph = cache.run('waypoints', waypoints_key, lambda: generate_waypoints(
+        island_contours, water_mask, masks['island_labels'], width, height,
+        push_distances=params['push_distances'], push_visibility=params['push_visibility']), 'npz')
+    report_waypoint_clearance(graph, masks['clearance'])
+
+    # Calculate cross-water connections between islands
+    PROFILER.start_stage('connections')
+    connections_key = cache.key('connections', waypoints_key, [LOS_SAMPLE_INTERVAL, params['max_connection_distance']])
+    graph = cache.run('connections', connections_key, lambda: calculate_waypoint_connections(
+        graph, water_mask, params['max_connection_distance']), 'npz')
+
+    return {
+        'image_key': image_key,
+        'water_lut_key': water_lut['key'] if water_lut else None,
+        'params': params,
+        'img_array': img_array,
+        'width': width,
+        'height': height,
+        'image_water_mask': image_water_mask,
+        'island_contours': island_contours,
+        'water_mask': water_mask,
+        'clearance': masks['clearance'],
+        'island_labels': masks['island_labels'],
+        'waypoints': waypoint_dicts(graph)
+    }
+
+# AIDEV-NOTE: Partial rebake tuning. Islands within DIRTY_INFLUENCE_MARGIN of an
+# edited tile are rebaked too: the 10+15+20px push passes and the merge-pass LOS
+# checks read the mask that far from the coastline.
+DIRTY_TILE_SIZE = 64  # Map diff granularity (px)
+DIRTY_INFLUENCE_MARGIN = 48  # px
+
+def find_dirty_tiles(old_img, new_img, tile_size):
+    """
+    Compare two map images tile by tile.
+    Returns a boolean grid [tiles_y, tiles_x] where True = some pixel in the tile changed.
+    """
+    height, width = new_img.shape[:2]
+    changed = old_img != new_img
+    if changed.ndim == 3:
+        changed = changed.any(axis=2)
+
+    tiles_y = -(-height // tile_size)
+    tiles_x = -(-width // tile_size)
+    padded = np.zeros((tiles_y * tile_size, tiles_x * tile_size), dtype=bool)
+    padded[:height, :width] = changed
+    return padded.reshape(tiles_y, tile_size, tiles_x, tile_size).any(axis=(1, 3))
+
+def contour_bounds(contour):
+    """Inclusive pixel bounds (min_x, min_y, max_x, max_y) of a contour."""
+    pts = np.asarray(contour)
+    return (int(pts[:, 0].min()), int(pts[:, 1].min()), int(pts[:, 0].max()), int(pts[:, 1].max()))
+
+def rects_hit_tiles(tiles, tile_size, rects):
+    """
+    Vectorized test of (N, 4) inclusive pixel rects against a boolean tile grid.
+    Returns True where the rect overlaps any set tile (summed-area table lookup).
+    """
+    rects = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+    integral = np.pad(tiles.astype(np.int64).cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    tx0 = np.clip(rects[:, 0] // tile_size, 0, tiles.shape[1] - 1)
+    ty0 = np.clip(rects[:, 1] // tile_size, 0, tiles.shape[0] - 1)
+    tx1 = np.clip(rects[:, 2] // tile_size, 0, tiles.shape[1] - 1) + 1
+    ty1 = np.clip(rects[:, 3] // tile_size, 0, tiles.shape[0] - 1) + 1
+    hits = integral[ty1, tx1] - integral[ty0, tx1] - integral[ty1, tx0] + integral[ty0, tx0]
+    return hits > 0
+
+def mark_rect_tiles(tiles, tile_size, rect):
+    """Set every tile overlapped by an inclusive pixel rect."""
+    min_x, min_y, max_x, max_y = rect
+    tiles[min_y // tile_size:max_y // tile_size + 1, min_x // tile_size:max_x // tile_size + 1] = True
+
+def dirty_zone_mask(dirty, tile_size, margin, width, height):
+    """Pixel mask of the edited tiles grown by margin (where rebaked islands can be affected)."""
+    zone = np.zeros((height, width), dtype=bool)
+    for tile_y, tile_x in zip(*np.nonzero(dirty)):
+        zone[max(tile_y * tile_size - margin, 0):(tile_y + 1) * tile_size + margin,
+             max(tile_x * tile_size - margin, 0):(tile_x + 1) * tile_size + margin] = True
+    return zone
+
+def rasterize_contour(contour, bounds):
+    """Fill a contour into a boolean mask covering just its inclusive bounds."""
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for contour rasterization.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    min_x, min_y, max_x, max_y = bounds
+    mask = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.uint8)
+    pts = np.array(contour, dtype=np.int32) - [min_x, min_y]
+    cv2.fillPoly(mask, [pts], 1)
+    return mask > 0
+
+def find_contours_in_window(image_water_mask, window):
+    """Run contour finding on a map window [x0, y0, x1, y1) of the image water mask only."""
+    x0, y0, x1, y1 = (int(v) for v in window)
+    contours = find_island_contours(image_water_mask[y0:y1, x0:x1])
+    return [[[x + x0, y + y0] for x, y in contour] for contour in contours]
+
+def find_rebaked_contours(image_water_mask, zone, old_labels, old_bounds, affected):
+    """
+    Detect the new contours around the edited tiles.
+    A new island is rebaked if it lies in the dirty zone or covers an old island being
+    replaced; old islands covered by a rebaked island are replaced too (merges/splits).
+    The window grows until every rebaked island fits inside it.
+    Returns (new_contours, affected).
+    """
+    height, width = image_water_mask.shape
+    zone_ys, zone_xs = np.nonzero(zone)
+    window = np.array([zone_xs.min(), zone_ys.min(), zone_xs.max() + 1, zone_ys.max() + 1])
+    full_map = np.array([0, 0, width, height])
+
+    while True:
+        for i in affected:
+            window = np.concatenate([np.minimum(window[:2], old_bounds[i][:2]),
+                                     np.maximum(window[2:], old_bounds[i][2:] + 1)])
+        window = np.clip(window, 0, [width, height, width, height])
+
+        print(f"  Detecting contours in window ({window[0]},{window[1]})-({window[2]},{window[3]})...")
+        window_contours = find_contours_in_window(image_water_mask, window)
+
+        rebaked = []
+        covered = set()
+        for contour in window_contours:
+            bounds = contour_bounds(contour)
+            min_x, min_y, max_x, max_y = bounds
+            inside = rasterize_contour(contour, bounds)
+            under = old_labels[min_y:max_y + 1, min_x:max_x + 1][inside]
+            old_ids = {int(label) - 1 for label in np.unique(under) if label > 0}
+            in_zone = zone[min_y:max_y + 1, min_x:max_x + 1][inside].any()
+            if in_zone or old_ids & affected:
+                rebaked.append(contour)
+                covered |= old_ids
+
+        grown = covered - affected
+        affected |= grown
+
+        # Rebaked islands touching an inner window edge may be clipped
+        clipped = False
+        for contour in rebaked:
+            min_x, min_y, max_x, max_y = contour_bounds(contour)
+            touches = np.array([min_x <= window[0], min_y <= window[1],
+                                max_x >= window[2] - 1, max_y >= window[3] - 1])
+            clipped |= bool((touches & (window != full_map)).any())
+
+        if (not grown and not clipped) or (window == full_map).all():
+            return rebaked, affected
+        if clipped:
+            window = window + [-DIRTY_TILE_SIZE, -DIRTY_TILE_SIZE, DIRTY_TILE_SIZE, DIRTY_TILE_SIZE]
+
+def assign_stable_island_ids(kept_ids, freed_ids, old_bounds, new_bounds):
+    """
+    Give every island a final id, keeping old ids where possible.
+    New islands take the freed id of the old island they overlap most, then any
+    remaining freed ids, then fresh ids. Leftover holes are filled by moving the
+    highest-numbered islands down so ids stay contiguous.
+    Returns a list indexed by final id of ('old', old_id) or ('new', new_index).
+    """
+    slots = {i: ('old', i) for i in kept_ids}
+    free = sorted(freed_ids)
+    unassigned = list(range(len(new_bounds)))
+
+    for old_id in list(free):
+        if not unassigned:
+            break
+        ob = old_bounds[old_id]
+        overlap = [max(0, min(ob[2], new_bounds[k][2]) - max(ob[0], new_bounds[k][0]) + 1) *
+                   max(0, min(ob[3], new_bounds[k][3]) - max(ob[1], new_bounds[k][1]) + 1)
+                   for k in unassigned]
+        best = int(np.argmax(overlap))
+        if overlap[best] > 0:
+            slots[old_id] = ('new', unassigned.pop(best))
+            free.remove(old_id)
+
+    next_id = max(list(slots) + list(freed_ids) + [-1]) + 1
+    for k in unassigned:
+        if free:
+            slots[free.pop(0)] = ('new', k)
+        else:
+            slots[next_id] = ('new', k)
+            next_id += 1
+
+    # Compact: fill remaining holes with the highest ids
+    for hole in free:
+        top = max(slots, default=-1)
+        if top > hole:
+            slots[hole] = slots.pop(top)
+
+    return [slots[i] for i in sorted(slots)]
+
+def rebake_dirty_region(prev_state, old_img, img_array, image_water_mask):
+    """
+    Rebake only the islands near edited map tiles and splice them into the previous bake.
+    Unaffected islands keep their polygon, waypoints and id. Cross-water connections
+    are only retested where they involve a rebaked waypoint or cross a changed tile.
+    Returns (island_contours, waypoint graph, water_mask, island_labels) for the whole map.
+    """
+    height, width = img_array.shape[:2]
+    old_contours = prev_state['island_contours']
+    old_waypoints = prev_state['waypoints']
+
+    dirty = find_dirty_tiles(old_img, img_array, DIRTY_TILE_SIZE)
+    print(f"  {int(dirty.sum())} of {dirty.size} map tiles changed ({DIRTY_TILE_SIZE}px tiles)")
+
+    old_bounds = np.array([contour_bounds(c) for c in old_contours]).reshape(-1, 4)
+    affected = set()
+    new_contours = []
+    if dirty.any():
+        # Old islands with any polygon pixel near an edit are rebaked
+        zone = dirty_zone_mask(dirty, DIRTY_TILE_SIZE, DIRTY_INFLUENCE_MARGIN, width, height)
+        old_labels = create_island_label_map(old_contours, width, height)
+        affected = {int(label) - 1 for label in np.unique(old_labels[zone]) if label > 0}
+        new_contours, affected = find_rebaked_contours(image_water_mask, zone, old_labels, old_bounds, affected)
+    print(f"  Rebaking {len(new_contours)} island(s) in place of {len(affected)} old island(s)")
+
+    kept_ids = [i for i in range(len(old_contours)) if i not in affected]
+    new_bounds = np.array([contour_bounds(c) for c in new_contours]).reshape(-1, 4)
+    slots = assign_stable_island_ids(kept_ids, affected, old_bounds, new_bounds)
+    island_contours = [old_contours[src] if kind == 'old' else new_contours[src] for kind, src in slots]
+
     water_mask = create_water_mask_from_polygons(island_contours, width, height)
+    island_labels = create_island_label_map(island_contours, width, height)
+
+    rebaked_ids = [final_id for final_id, (kind, _) in enumerate(slots) if kind == 'new']
+    rebaked = generate_waypoints([island_contours[i] for i in rebaked_ids], water_mask,
+                                 island_labels, width, height, island_ids=rebaked_ids)
+
+    # Gather each island's waypoint ring (in ring order) under its final id
+    old_rings = {}
+    for wp in old_waypoints:
+        old_rings.setdefault(wp['island'], []).append(wp)
+    new_rings = {}
+    for start, end in zip(rebaked['ring_offsets'][:-1].tolist(), rebaked['ring_offsets'][1:].tolist()):
+        if end > start:
+            new_rings[int(rebaked['island'][start])] = list(zip(rebaked['x'][start:end].tolist(),
+                                                                 rebaked['y'][start:end].tolist()))
+
+    xs, ys, islands, ring_lengths = [], [], [], []
+    old_id_map = {}  # old waypoint id -> final waypoint id (kept islands only)
+    for final_id, (kind, src) in enumerate(slots):
+        if kind == 'old':
+            ring = old_rings.get(src, [])
+            for wp in ring:
+                old_id_map[wp['id']] = len(xs)
+                xs.append(wp['x'])
+                ys.append(wp['y'])
+        else:
+            ring = new_rings.get(final_id, [])
+            xs += [x for x, _ in ring]
+            ys += [y for _, y in ring]
+        islands += [final_id] * len(ring)
+        ring_lengths.append(len(ring))
+
+    graph = waypoint_graph_arrays(xs, ys, islands, ring_lengths, np.zeros((0, 2), dtype=np.int64))
+    ring_edge_list = ring_edges(graph['ring_offsets'])
+    ring_pairs = {(min(a, b), max(a, b)) for a, b in ring_edge_list.tolist()}
+
+    # Tiles whose mask may have changed: edits plus every replaced/rebaked polygon
+    changed = dirty.copy()
+    for rect in list(old_bounds[sorted(affected)]) + list(new_bounds):
+        mark_rect_tiles(changed, DIRTY_TILE_SIZE, rect)
+
+    # Keep old cross-water edges between kept waypoints unless they cross a changed tile
+    xs = graph['x'].astype(np.float64)
+    ys = graph['y'].astype(np.float64)
+    cross_pairs = set()
+    for wp in old_waypoints:
+        for conn in wp['connections']:
+            if wp['id'] in old_id_map and conn in old_id_map:
+                a, b = sorted((old_id_map[wp['id']], old_id_map[conn]))
+                if (a, b) not in ring_pairs:
+                    cross_pairs.add((a, b))
+    if cross_pairs:
+        pairs = np.array(sorted(cross_pairs))
+        crosses_changed = rects_hit_tiles(changed, DIRTY_TILE_SIZE, segment_bounds(xs, ys, pairs))
+        cross_pairs = {tuple(p) for p in pairs[~crosses_changed].tolist()}
+
+    # Retest candidate pairs that involve a rebaked waypoint or cross a changed tile
+    is_new = np.ones(len(xs), dtype=bool)
+    is_new[np.array(list(old_id_map.values()), dtype=np.int64)] = False
+    pair_i, pair_j = find_pairs_within_radius(xs, ys, MAX_CONNECTION_DISTANCE)
+    pairs = np.stack([pair_i, pair_j], axis=1)
+    retest = is_new[pair_i] | is_new[pair_j] | rects_hit_tiles(changed, DIRTY_TILE_SIZE,
+                                                               segment_bounds(xs, ys, pairs))
+    pairs = pairs[retest]
+    clear = batch_line_of_sight(xs[pairs[:, 0]], ys[pairs[:, 0]], xs[pairs[:, 1]], ys[pairs[:, 1]], water_mask)
+    print(f"  Retested {len(pairs)} candidate connections, kept {len(cross_pairs)} untouched ones")
+    PROFILER.count('edges_tested', len(pairs))
+    PROFILER.count('edges_accepted', clear.sum())
+    cross_pairs |= {tuple(p) for p in pairs[clear].tolist()}
+    cross_pairs -= ring_pairs
+
+    # Ring edges first, then cross-water edges in (i, j) order (like a full bake)
+    graph['edges'] = append_unique_edges(graph['edges'], ring_edge_list)
+    graph['edges'] = append_unique_edges(graph['edges'], np.array(sorted(cross_pairs), dtype=np.int64).reshape(-1, 2))
+
+    print(f"Spliced bake: {len(island_contours)} islands, {len(xs)} waypoints")
+    return island_contours, graph, water_mask, island_labels
+
+def segment_bounds(xs, ys, pairs):
+    """Inclusive pixel bounds (N, 4) of the segments between waypoint index pairs."""
+    x0, x1 = xs[pairs[:, 0]], xs[pairs[:, 1]]
+    y0, y1 = ys[pairs[:, 0]], ys[pairs[:, 1]]
+    return np.stack([np.minimum(x0, x1), np.minimum(y0, y1),
+                     np.maximum(x0, x1), np.maximum(y0, y1)], axis=1).astype(np.int64)
+
+class DirtyRebakeUnavailable(Exception):
+    """The recorded bake cannot seed a dirty rebake; a full bake is needed."""
+
+def run_dirty_rebake(input_path, cache, water_lut=None):
+    """
+    Rebake only what an edit to the map touched, starting from the last bake recorded
+    in the cache. Returns the same dict shape as run_bake_stages.
+    Raises DirtyRebakeUnavailable when the recorded bake cannot be used.
+    """
+    manifest = cache.load_manifest() if cache.cache_dir else None
+    if manifest is None:
+        raise DirtyRebakeUnavailable("--dirty needs a previous bake recorded in --cache-dir "
+                                     "(run once without --dirty first)")
+    water_lut_key = water_lut['key'] if water_lut else None
+    if manifest.get('water_lut_key') != water_lut_key:
+        raise DirtyRebakeUnavailable("water classification rules changed since the last bake; run a full bake")
+    baked_params = manifest.get('params')
+    if baked_params is not None and {name: json_tuples(v) for name, v in baked_params.items()} != BAKE_PARAMETERS:
+        raise DirtyRebakeUnavailable("the last bake used custom --params (dirty rebakes use the defaults); "
+                                     "run a full bake")
+
+    PROFILER.start_stage('image')
+    print(f"Loading map: {input_path}")
+    image_key = cache.key('image', file_digest(input_path))
+    img_array = cache.run('image', image_key, lambda: {'image': load_map(input_path)}, 'npz')['image']
+    height, width = img_array.shape[:2]
+    print(f"Map size: {width}x{height}")
+
+    previous = cache.load('image', manifest['image_key'], 'npz')
+    if previous is None:
+        raise DirtyRebakeUnavailable("previously baked map is no longer in the cache; run a full bake")
+    if previous['image'].shape != img_array.shape:
+        raise DirtyRebakeUnavailable(f"map size changed ({previous['image'].shape} -> {img_array.shape}); "
+                                     "run a full bake")
+
+    PROFILER.start_stage('water')
+    image_water_mask, _ = detect_image_water(img_array, image_key, cache, water_lut)
+
+    PROFILER.start_stage('dirty_rebake')
+    print("Diffing map against the previous bake...")
+    island_contours, graph, water_mask, island_labels = rebake_dirty_region(
+        manifest, previous['image'], img_array, image_water_mask)
+
+    PROFILER.start_stage('clearance')
+    print("Computing clearance field...")
+    clearance = compute_clearance_field(water_mask)
+    report_waypoint_clearance(graph, clearance)
+
+    return {
+        'image_key': image_key,
+        'water_lut_key': water_lut_key,
+        'params': BAKE_PARAMETERS,
+        'img_array': img_array,
+        'width': width,
+        'height': height,
+        'image_water_mask': image_water_mask,
+        'island_contours': island_contours,
+        'water_mask': water_mask,
+        'clearance': clearance,
+        'island_labels': island_labels,
+        'waypoints': waypoint_dicts(graph)
+    }
+
+# AIDEV-NOTE: Tiled pipeline for very large maps. The map and every full-size mask
+# live in memory-mapped .npy files under the scratch dir; stages stream over tiles in
+# a thread pool (NumPy and OpenCV release the GIL). Tiles overlap by one pixel so every
+# 8-connected pixel pair shares a tile: land components are labelled per tile, merged
+# across seams with union-find, and each island is traced from a crop of its own
+# bounds. The contours (values and order) match a full-image findContours exactly.
+TILE_SIZE = 2048  # Default tile edge (px)
+MAP_STRIP_ROWS = 256  # Rows per strip when streaming full-size arrays to/from disk
+TILE_CLEARANCE_HALO = 256  # Tiled clearance is exact up to this many px, saturates beyond
+TILED_SCRATCH_FILES = ('map.npy', 'image_water.npy', 'island_labels.npy', 'water_mask.npy', 'clearance.npy')
+
+def iter_tiles(height, width, tile_size, overlap=0):
+    """Yield (y0, y1, x0, x1) tiles covering the map; tiles extend `overlap` px past their core."""
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size + overlap, height), x0, min(x0 + tile_size + overlap, width)
+
+def open_map_memmap(path, backing_path):
+    """
+    Return the map as a read-only memory-mapped array.
+    A .npy input is mapped directly. Other formats are decoded once by Pillow and
+    copied into a .npy backing store in row strips; later stages only page in the
+    tiles they touch.
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+
+    Image.MAX_IMAGE_PIXELS = None  # Our own maps are this large on purpose
+    try:
+        img = Image.open(path)
+        img.load()
+    except Exception as e:
+        print(f"Error loading map: {e}")
+        sys.exit(1)
+
+    bands = len(img.getbands())
+    shape = (img.height, img.width, bands) if bands > 1 else (img.height, img.width)
+    store = np.lib.format.open_memmap(backing_path, mode='w+', dtype=np.uint8, shape=shape)
+    for y0 in range(0, img.height, MAP_STRIP_ROWS):
+        y1 = min(y0 + MAP_STRIP_ROWS, img.height)
+        store[y0:y1] = np.asarray(img.crop((0, y0, img.width, y1)))
+    store.flush()
+    del store, img
+
+    return np.load(backing_path, mmap_mode='r')
+
+def detect_water_tiled(img, water_out, tile_size, workers, water_lut=None):
+    """Classify water tile by tile into a preallocated (memmapped) boolean mask."""
+    height, width = img.shape[:2]
+
+    def classify(tile):
+        y0, y1, x0, x1 = tile
+        classify_water(img[y0:y1, x0:x1], water_lut, out=water_out[y0:y1, x0:x1])
+
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(classify, iter_tiles(height, width, tile_size)))
+
+def _label_land_tile(water, tile, width):
+    """
+    Label 8-connected land components in one overlapping tile.
+    Returns per-label global bounds and first pixel (raster key), plus the
+    tile's edge label rows/cols for seam merging. Label 0 is water.
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for contour detection.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    y0, y1, x0, x1 = tile
+    land = (~np.asarray(water[y0:y1, x0:x1])).astype(np.uint8)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(land, connectivity=8, ltype=cv2.CV_32S)
+
+    # First pixel of each label in raster order (= its top-most, left-most pixel)
+    flat = labels.ravel()
+    land_idx = np.flatnonzero(flat)
+    _, first = np.unique(flat[land_idx], return_index=True)
+    first_idx = land_idx[first]
+    tile_w = x1 - x0
+    start_keys = (first_idx // tile_w + y0) * width + (first_idx % tile_w + x0)
+
+    bounds = np.stack([stats[1:, cv2.CC_STAT_LEFT] + x0,
+                       stats[1:, cv2.CC_STAT_TOP] + y0,
+                       stats[1:, cv2.CC_STAT_LEFT] + stats[1:, cv2.CC_STAT_WIDTH] - 1 + x0,
+                       stats[1:, cv2.CC_STAT_TOP] + stats[1:, cv2.CC_STAT_HEIGHT] - 1 + y0], axis=1)
+
+    return {
+        'count': count - 1,
+        'bounds': bounds.astype(np.int64),
+        'start_keys': start_keys.astype(np.int64),
+        'first_row': labels[0].copy(),
+        'last_row': labels[-1].copy(),
+        'first_col': labels[:, 0].copy(),
+        'last_col': labels[:, -1].copy()
+    }
+
+def _find_root(parent, i):
+    """Union-find root with path halving."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def label_land_components_tiled(water, tile_size, workers):
+    """
+    Find every 8-connected land component of a (memmapped) water mask tile by tile.
+    Returns (bounds, start_keys): inclusive global bounds (N, 4) and the raster key
+    (y * width + x) of each component's top-most, left-most pixel.
+    """
+    height, width = water.shape
+    tiles = list(iter_tiles(height, width, tile_size, overlap=1))
+    with ThreadPoolExecutor(workers) as pool:
+        parts = list(pool.map(lambda tile: _label_land_tile(water, tile, width), tiles))
+
+    offsets = np.cumsum([0] + [part['count'] for part in parts])
+    parent = list(range(int(offsets[-1])))
+
+    # Merge labels that share an overlap row/column with the tile below/right
+    tiles_x = -(-width // tile_size)
+    for t, part in enumerate(parts):
+        neighbours = [(t + tiles_x, 'last_row', 'first_row')] if t + tiles_x < len(parts) else []
+        if (t + 1) % tiles_x != 0:
+            neighbours.append((t + 1, 'last_col', 'first_col'))
+        for n, edge, other_edge in neighbours:
+            a, b = part[edge], parts[n][other_edge]
+            shared = (a > 0) & (b > 0)
+            pairs = np.unique(np.stack([a[shared] + offsets[t] - 1, b[shared] + offsets[n] - 1], axis=1), axis=0)
+            for i, j in pairs.tolist():
+                root_i, root_j = _find_root(parent, i), _find_root(parent, j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    roots = np.array([_find_root(parent, i) for i in range(len(parent))], dtype=np.int64)
+    all_bounds = np.concatenate([part['bounds'] for part in parts]).reshape(-1, 4)
+    all_keys = np.concatenate([part['start_keys'] for part in parts])
+
+    unique_roots, component = np.unique(roots, return_inverse=True)
+    bounds = np.empty((len(unique_roots), 4), dtype=np.int64)
+    bounds[:, :2] = np.iinfo(np.int64).max
+    bounds[:, 2:] = -1
+    np.minimum.at(bounds[:, 0], component, all_bounds[:, 0])
+    np.minimum.at(bounds[:, 1], component, all_bounds[:, 1])
+    np.maximum.at(bounds[:, 2], component, all_bounds[:, 2])
+    np.maximum.at(bounds[:, 3], component, all_bounds[:, 3])
+    start_keys = np.full(len(unique_roots), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(start_keys, component, all_keys)
+
+    return bounds, start_keys
+
+def find_island_contours_tiled(water, tile_size, workers, min_collision_area=MIN_COLLISION_AREA):
+    """
+    Tiled equivalent of find_island_contours for memory-mapped masks.
+    Traces each land component from a crop of its own bounds, drops components
+    nested inside another one (RETR_EXTERNAL skips those) and orders contours like
+    findContours (descending raster order of their first pixel).
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is required for contour detection.")
+        print("Install with: pip install opencv-python")
+        sys.exit(1)
+
+    height, width = water.shape
+    bounds, start_keys = label_land_components_tiled(water, tile_size, workers)
+    print(f"  Labelled {len(bounds)} land components across tiles")
+
+    traced = []  # (start_key, bounds, contour) for components not enclosed within their crop
+    for (min_x, min_y, max_x, max_y), key in zip(bounds.tolist(), start_keys.tolist()):
+        crop = (~np.asarray(water[min_y:max_y + 1, min_x:max_x + 1])).astype(np.uint8) * 255
+        contours, _ = cv2.findContours(crop, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(min_x, min_y))
+        start = [key % width, key // width]
+        for contour in contours:
+            if contour[0, 0].tolist() == start:
+                traced.append((key, (min_x, min_y, max_x, max_y), contour))
+                break
+
+    # A component inside another one's outer contour sits in a lake: not an outer contour
+    traced_bounds = np.array([b for _, b, _ in traced]).reshape(-1, 4)
+    top_level = []
+    for key, (min_x, min_y, max_x, max_y), contour in traced:
+        encloses = np.flatnonzero((traced_bounds[:, 0] <= min_x) & (traced_bounds[:, 1] <= min_y) &
+                                  (traced_bounds[:, 2] >= max_x) & (traced_bounds[:, 3] >= max_y))
+        point = (float(key % width), float(key // width))
+        nested = any(traced[k][0] != key and cv2.pointPolygonTest(traced[k][2], point, False) > 0
+                     for k in encloses)
+        if not nested:
+            top_level.append((key, contour))
+
+    top_level.sort(key=lambda item: item[0], reverse=True)
+    return simplify_island_contours([contour for _, contour in top_level], min_collision_area)
+
+def compute_clearance_field_tiled(water_mask, clearance_out, tile_size, workers):
+    """
+    Tiled clearance field into a preallocated (memmapped) float32 array.
+    Each tile is computed with a TILE_CLEARANCE_HALO px halo, so values are exact
+    up to the halo distance and saturate at +/- TILE_CLEARANCE_HALO beyond it.
+    """
+    height, width = water_mask.shape
+    halo = TILE_CLEARANCE_HALO
+
+    def tile_clearance(tile):
+        y0, y1, x0, x1 = tile
+        hy0, hx0 = max(y0 - halo, 0), max(x0 - halo, 0)
+        hy1, hx1 = min(y1 + halo, height), min(x1 + halo, width)
+        field = signed_distance(water_mask[hy0:hy1, hx0:hx1])
+        core = np.clip(field[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0], -halo, halo)
+        clearance_out[y0:y1, x0:x1] = core
+        over_water = core[core > 0]
+        return over_water.sum(dtype=np.float64), over_water.size, over_water.max(initial=0.0)
+
+    with ThreadPoolExecutor(workers) as pool:
+        stats = list(pool.map(tile_clearance, iter_tiles(height, width, tile_size)))
+
+    total = sum(s[0] for s in stats)
+    count = sum(s[1] for s in stats)
+    if count > 0:
+        print(f"  Clearance field: max {max(s[2] for s in stats):.1f}px from shore "
+              f"(saturates at {halo}px), mean {total / count:.1f}px over water")
+
+def run_tiled_bake(input_path, scratch_dir, tile_size, workers, water_lut=None):
+    """
+    Bake a very large map through memory-mapped tiles.
+    Returns the same dict shape as run_bake_stages (full-size arrays are memmaps).
+    """
+    os.makedirs(scratch_dir, exist_ok=True)
+
+    def scratch(name, dtype, shape):
+        return np.lib.format.open_memmap(os.path.join(scratch_dir, name), mode='w+', dtype=dtype, shape=shape)
+
+    PROFILER.start_stage('image')
+    print(f"Loading map into memory-mapped tiles: {input_path}")
+    img_array = open_map_memmap(input_path, os.path.join(scratch_dir, 'map.npy'))
+    height, width = img_array.shape[:2]
+    print(f"Map size: {width}x{height} ({tile_size}px tiles, {workers} workers)")
+
+    PROFILER.start_stage('water')
+    print("Detecting water/land boundaries from image (tiled)...")
+    image_water_mask = scratch('image_water.npy', bool, (height, width))
+    detect_water_tiled(img_array, image_water_mask, tile_size, workers, water_lut)
+    water_percent = sum(int(np.count_nonzero(image_water_mask[y0:y1])) for y0, y1, _, _ in
+                        iter_tiles(height, 1, tile_size)) / (width * height) * 100
+    print(f"Initial water coverage: {water_percent:.1f}%")
+
+    PROFILER.start_stage('contours')
+    print("Finding island contours (tiled)...")
+    island_contours = find_island_contours_tiled(image_water_mask, tile_size, workers)
+    print(f"Found {len(island_contours)} islands")
+
+    PROFILER.start_stage('mask')
+    print("Generating water mask from collision polygons (authoritative)...")
+    island_labels = scratch('island_labels.npy', island_label_dtype(len(island_contours)), (height, width))
+    create_island_label_map(island_contours, width, height, out=island_labels)
+    water_mask = scratch('water_mask.npy', bool, (height, width))
+    for y0, y1, _, _ in iter_tiles(height, 1, tile_size):
+        np.equal(island_labels[y0:y1], 0, out=water_mask[y0:y1])
+    print(f"  Generated water mask from {len(island_contours)} collision polygons")
+
+    print("Computing clearance field (tiled)...")
+    clearance = scratch('clearance.npy', np.float32, (height, width))
+    compute_clearance_field_tiled(water_mask, clearance, tile_size, workers)
+
+    PROFILER.start_stage('waypoints')
+    graph = generate_waypoints(island_contours, water_mask, island_labels, width, height)
+    report_waypoint_clearance(graph, clearance)
+    PROFILER.start_stage('connections')
+    graph = calculate_waypoint_connections(graph, water_mask)
+
+    return {
+        'image_key': None,
+        'water_lut_key': water_lut['key'] if water_lut else None,
+        'img_array': img_array,
+        'width': width,
+        'height': height,
+        'image_water_mask': image_water_mask,
+        'island_contours': island_contours,
+        'water_mask': water_mask,
+        'clearance': clearance,
+        'island_labels': island_labels,
+        'waypoints': waypoint_dicts(graph)
+    }
+
+def remove_tiled_scratch(scratch_dir, input_path):
+    """
+    Delete the full-size working arrays of a tiled bake (several GB on the largest maps),
+    and the scratch dir itself once it is empty. Every memmap must be closed first.
+    A .npy map input is never deleted, even if it sits in the scratch dir.
+    """
+    for name in TILED_SCRATCH_FILES:
+        path = os.path.join(scratch_dir, name)
+        if os.path.exists(path) and os.path.abspath(path) != os.path.abspath(input_path):
+            os.remove(path)
+    if not os.listdir(scratch_dir):
+        os.rmdir(scratch_dir)
+    print(f"Removed tiled working arrays from: {scratch_dir}")
+
+# AIDEV-NOTE: Parameter sweep (--sweep GRID.json). The grid maps tuning parameter names
+# (BAKE_PARAMETERS) to lists of values. Every combination is baked from contours to
+# connections in a process pool. The map is decoded and classified once; the workers
+# share that water mask as a read-only memmap in the scratch dir. Bake times are
+# measured inside a busy pool, so compare them with each other, not with a lone bake.
+SWEEP_MASK_NAME = 'sweep_water.npy'
+SWEEP_RESULT_COLUMNS = ('islands', 'waypoints', 'edges', 'stuck', 'components', 'largest_component', 'seconds')
+
+_sweep_water = None  # Shared image water mask inside each sweep worker
+
+def load_sweep_grid(path):
+    """
+    Read a sweep grid JSON file ({parameter: [values, ...]}).
+    Returns (swept parameter names, one full parameter dict per combination).
+    """
+    with open(path) as f:
+        grid = json.load(f)
+    unknown = sorted(set(grid) - set(BAKE_PARAMETERS))
+    if unknown:
+        raise ValueError(f"{path}: unknown sweep parameter(s) {unknown} (known: {sorted(BAKE_PARAMETERS)})")
+    for name, values in grid.items():
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"{path}: '{name}' needs a non-empty list of values")
+
+    swept = [name for name in BAKE_PARAMETERS if name in grid]
+    axes = [[json_tuples(v) for v in grid[name]] if name in grid else [default]
+            for name, default in BAKE_PARAMETERS.items()]
+    return swept, [dict(zip(BAKE_PARAMETERS, combo)) for combo in itertools.product(*axes)]
+
+def graph_components(count, edges):
+    """Connected component index (0..k-1) of each of count nodes joined by an (E, 2) edge list."""
+    parent = list(range(count))
+    for a, b in edges.tolist():
+        root_a, root_b = _find_root(parent, a), _find_root(parent, b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    roots = np.array([_find_root(parent, i) for i in range(count)], dtype=np.int64)
+    return np.unique(roots, return_inverse=True)[1]
+
+def _open_sweep_mask(path):
+    """Process pool initializer: map the shared image water mask read-only."""
+    global _sweep_water
+    _sweep_water = np.load(path, mmap_mode='r')
+
+def sweep_bake(params):
+    """Bake one sweep configuration from the shared water mask (bake logs suppressed). Returns its results."""
+    height, width = _sweep_water.shape
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        contours = find_island_contours(_sweep_water, params['min_collision_area'], params['epsilon_buckets'],
+                                        params['kink_threshold'])
+        water_mask = create_water_mask_from_polygons(contours, width, height)
+        labels = create_island_label_map(contours, width, height)
+        graph = generate_waypoints(contours, water_mask, labels, width, height,
+                                   push_distances=params['push_distances'],
+                                   push_visibility=params['push_visibility'])
+        graph = calculate_waypoint_connections(graph, water_mask, params['max_connection_distance'])
+    seconds = time.perf_counter() - start
+
+    sizes = np.bincount(graph_components(len(graph['x']), graph['edges']))
+    return {
+        'islands': len(contours),
+        'waypoints': len(graph['x']),
+        'edges': len(graph['edges']),
+        'stuck': int(graph['stuck']),
+        'components': len(sizes),
+        'largest_component': float(sizes.max() / sizes.sum()) if len(sizes) else 0.0,
+        'seconds': round(seconds, 3)
+    }
+
+def run_parameter_sweep(input_path, configs, workers, scratch_dir, water_lut=None):
+    """
+    Bake every configuration from load_sweep_grid in a process pool over one shared
+    water mask. Returns one row per configuration: its parameters plus sweep_bake results.
+    """
+    print(f"Loading map: {input_path}")
+    img_array = load_map(input_path)
+    print("Detecting water/land boundaries from image...")
+    image_water_mask = classify_water(img_array, water_lut)
+    del img_array
+
+    os.makedirs(scratch_dir, exist_ok=True)
+    mask_path = os.path.join(scratch_dir, SWEEP_MASK_NAME)
+    np.save(mask_path, image_water_mask)
+    del image_water_mask
+
+    print(f"Baking {len(configs)} configurations ({workers} workers)...")
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_sweep_mask, initargs=(mask_path,)) as pool:
+            for params, result in zip(configs, pool.map(sweep_bake, configs)):
+                rows.append({**params, **result})
+                print(f"  [{len(rows)}/{len(configs)}] {result['waypoints']} waypoints, "
+                      f"{result['edges']} edges in {result['seconds']:.2f}s")
+    finally:
+        os.remove(mask_path)
+    return rows
+
+def format_sweep_value(value):
+    """Compact text for a parameter value (sequences as JSON)."""
+    return json.dumps(value, separators=(',', ':')) if isinstance(value, tuple) else str(value)
+
+def print_sweep_table(rows, swept):
+    """Print one line per configuration: the swept parameter values, then the bake results."""
+    columns = ['#'] + swept + list(SWEEP_RESULT_COLUMNS)
+    cells = []
+    for k, row in enumerate(rows):
+        line = [str(k + 1)] + [format_sweep_value(row[name]) for name in swept]
+        line += [str(row[name]) for name in SWEEP_RESULT_COLUMNS[:-2]]
+        line += [f"{row['largest_component'] * 100:.1f}%", f"{row['seconds']:.2f}s"]
+        cells.append(line)
+    widths = [max(len(text) for text in [name] + [line[i] for line in cells]) for i, name in enumerate(columns)]
+    print("  " + "  ".join(name.rjust(width) for name, width in zip(columns, widths)))
+    for line in cells:
+        print("  " + "  ".join(text.rjust(width) for text, width in zip(line, widths)))
+
+def save_sweep_table(rows, output_path):
+    """Write the sweep rows as CSV (every parameter, then the results)."""
+    columns = list(BAKE_PARAMETERS) + list(SWEEP_RESULT_COLUMNS)
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([format_sweep_value(row[name]) for name in columns])
+    print(f"Sweep table saved to: {output_path}")
+
+# AIDEV-NOTE: Watch mode (--watch) keeps one warm process (imports, stage cache) alive and
+# rebakes when the map or the --params file changes. An edit to the map alone takes the
+# dirty-rebake path when the bake uses the default parameters; anything else reruns the
+# staged bake, which recomputes only the stages whose key changed. The collision outputs
+# are replaced atomically. Hot reloads go through two scripts the page loads with <script>
+# tags, like collision_data.js (so they work from file:// too): a reload copy of the data
+# next to --js-output, then the signal file, written last. The signal's version is a
+# digest of the collision JSON, so the editor (Collision.pollHotReload) reloads only real
+# changes. Script URLs are relative to index.html, which sits next to this script.
+WATCH_POLL_SECONDS = 0.25  # How often the watched files are checked
+WATCH_SETTLE_SECONDS = 0.2  # A change must hold this long before baking (editors save in bursts)
+WATCH_CACHE_DIR = '.bake_cache'  # Stage cache used when --watch runs without --cache-dir
+GAME_ROOT = os.path.dirname(os.path.abspath(__file__))
+WATCH_SIGNAL_PATH = os.path.join(GAME_ROOT, 'src', 'collision_signal.js')  # Collision.HOT_RELOAD_SIGNAL_URL
+
+def file_stamp(path):
+    """(mtime, size) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def game_url(path):
+    """URL of a file relative to the game page. Raises ValueError if the page cannot reach it."""
+    relative = os.path.relpath(os.path.abspath(path), GAME_ROOT)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        raise ValueError(f"{path} is outside the game directory {GAME_ROOT}, so the page cannot load it")
+    return relative.replace(os.sep, '/')
+
+def hot_reload_path(js_output):
+    """Reload copy of the collision data, written next to the JS module."""
+    return os.path.splitext(js_output)[0] + '_reload.js'
+
+def write_hot_reload(data_path, js_output):
+    """Write the reload script for freshly saved collision JSON, then the signal pointing at it."""
+    version = file_digest(data_path)[:16]
+    reload_path = hot_reload_path(js_output)
+    with open(data_path) as f:
+        data_json = f.read()
+    with atomic_write(reload_path) as f:
+        f.write('// BOTA - Collision hot-reload data (written by detect_islands.py --watch)\n')
+        f.write(f'Collision.receiveRebakeData({json.dumps(version)}, {data_json});\n')
+    with atomic_write(WATCH_SIGNAL_PATH) as f:
+        f.write('// BOTA - Collision hot-reload signal (written by detect_islands.py --watch)\n')
+        f.write(f'Collision.receiveRebakeSignal({json.dumps(version)}, {json.dumps(game_url(reload_path))});\n')
+    print(f"Hot-reload signal written to: {WATCH_SIGNAL_PATH} (version {version})")
+
+def watch_bake(args, cache, water_lut):
+    """Rebake and re-export whenever a watched file changes, until interrupted (Ctrl+C)."""
+    watched = [args.input] + [path for path in (args.params, args.ports) if path]
+    stamps = None
+    baked_params = None  # Parameters of the last bake this process exported
+    print(f"Watching {', '.join(watched)} for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            current = [file_stamp(path) for path in watched]
+            if current == stamps:
+                time.sleep(WATCH_POLL_SECONDS)
+                continue
+            time.sleep(WATCH_SETTLE_SECONDS)
+            if [file_stamp(path) for path in watched] != current:
+                continue  # Still being written
+            stamps = current
+
+            print("\n" + "=" * 50)
+            start = time.perf_counter()
+            try:
+                params = load_bake_params(args.params) if args.params else BAKE_PARAMETERS
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}")
+                print("Keeping the previous outputs until the parameters file is fixed")
+                continue
+
+            bake = None
+            if params == baked_params == BAKE_PARAMETERS:
+                try:
+                    bake = run_dirty_rebake(args.input, cache, water_lut)
+                except DirtyRebakeUnavailable as e:
+                    print(f"Dirty rebake not possible: {e}")
+                    print("Rerunning the bake stages instead")
+            if bake is None:
+                bake = run_bake_stages(args.input, cache, water_lut, params)
+
+            cache.save_manifest(bake)
+            try:
+                export_bake(args, bake)
+            except (ValueError, UnsnappablePort) as e:
+                print(f"Error: {e}")
+                print("Keeping the previous outputs until the input is fixed")
+                continue
+            write_hot_reload(args.output, args.js_output)
+            baked_params = params
+            print(f"Rebaked in {time.perf_counter() - start:.2f}s; watching for changes")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
+def export_bake(args, bake):
+    """Build the optional extras requested on the command line and write every output file for a bake."""
+    img_array = bake['img_array']
+    width, height = bake['width'], bake['height']
+    island_contours = bake['island_contours']
+    waypoints = bake['waypoints']
+    clearance = bake['clearance']
+    island_labels = bake['island_labels']
     
-    # Generate waypoints using polygon-based water mask
-    waypoints = generate_waypoints(island_contours, water_mask, width, height)
+    # Prune redundant connections (after the manifest: dirty rebakes splice the full graph)
+    if args.prune_stretch:
+        PROFILER.start_stage('prune')
+        print("Pruning redundant waypoint connections...")
+        prune_waypoint_connections(waypoints, args.prune_stretch, args.prune_sectors, args.prune_sector_degree)
     
-    # Calculate cross-water connections between islands
-    calculate_waypoint_connections(waypoints, water_mask, island_contours)
+    # Coarser conservative polygons per island for cheap broadphase rejection
+    lods = None
+    if args.lod:
+        PROFILER.start_stage('lod')
+        print("Building island levels of detail...")
+        lods = build_island_lods(island_contours, args.lod_epsilon, args.lod_auto)
     
     # Generate collision data
+    PROFILER.start_stage('collision_data')
     print("Generating collision data...")
-    collision_data = generate_collision_data(island_contours, width, height, waypoints)
+    collision_data = generate_collision_data(island_contours, width, height, waypoints, lods)
+    
+    # Uniform grid of coastline edges so land queries only test the edges near them
+    if args.broadphase:
+        PROFILER.start_stage('broadphase')
+        print("Building broadphase grid...")
+        grid = build_broadphase_grid(collision_data, args.broadphase_cell)
+        validate_broadphase_grid(collision_data, grid)
+        collision_data['broadphase'] = encode_broadphase_grid(grid)
     
     # Print island info
     for island in collision_data['islands']:
@@ -1073,17 +3888,246 @@ def main():
               f"bounds=({island['bounds']['minX']},{island['bounds']['minY']}) to "
               f"({island['bounds']['maxX']},{island['bounds']['maxY']})")
     
+    # Embed the clearance grid in the collision data (game-side distance-to-shore and steering lookups)
+    if args.clearance:
+        PROFILER.start_stage('clearance_grid')
+        print("Encoding clearance grid...")
+        collision_data['clearance'] = encode_clearance_grid(clearance, args.clearance_dtype, args.clearance_cell)
+    
+    # Bake all-pairs next-hop/distance tables so routes become table lookups in game
+    if args.routing:
+        PROFILER.start_stage('routing')
+        print("Baking routing tables...")
+        next_hop, distance = compute_routing_tables(waypoints)
+        collision_data['routing'] = encode_routing_tables(next_hop, distance, args.routing_distance_dtype)
+    
+    # Precompute string-pulled routes between every pair of ports
+    if args.ports:
+        PROFILER.start_stage('route_atlas')
+        print("Building port route atlas...")
+        ports = load_ports(args.ports, width, height)
+        collision_data['routeAtlas'] = build_route_atlas(ports, waypoints, bake['water_mask'], clearance,
+                                                         clearance_gradient(clearance), width, height)
+    
+    # Two-level cluster graph so long routes only search entrance waypoints
+    if args.hierarchy:
+        PROFILER.start_stage('hierarchy')
+        print("Building waypoint hierarchy...")
+        collision_data['hierarchy'] = build_waypoint_hierarchy(waypoints, width, height, args.cluster_size)
+    
+    # Triangulate the water into a navmesh for funnel/string-pulling path queries
+    if args.navmesh:
+        PROFILER.start_stage('navmesh')
+        print("Building water navmesh...")
+        navmesh = build_water_navmesh(island_contours, width, height, args.navmesh_max_edge)
+        collision_data['navmesh'] = encode_navmesh(navmesh, width, height)
+    
+    # Export island label raster (binary RLE + .npy) for O(1) land lookups
+    if args.labels_output:
+        PROFILER.start_stage('labels')
+        collision_data['labels'] = save_island_labels(island_labels, args.labels_output)
+    
     # Save collision data
+    PROFILER.start_stage('export')
     save_collision_data(collision_data, args.output)
     
     # Save JavaScript module
-    save_collision_js(collision_data, args.js_output)
+    save_collision_js(collision_data, args.js_output, args.js_binary)
+    
+    # Save compact binary islands + waypoint graph (typed-array / memmap friendly)
+    if args.binary_output:
+        save_collision_binary(collision_data, args.binary_output)
     
     # Create visualization if requested
     if args.visualize:
+        PROFILER.start_stage('visualize')
         print("Creating visualization...")
         visualize_collision(img_array, island_contours, waypoints, args.vis_output)
     
+    # Deep-zoom tiles of the same visualization (never builds the full-size image)
+    if args.vis_tiles:
+        PROFILER.start_stage('visualize_tiles')
+        save_visualization_tiles(img_array, island_contours, waypoints, args.vis_tiles, args.vis_tile_size)
+
+def main():
+    """Main script entry point."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Detect island boundaries from map')
+    parser.add_argument('--input', default='assets/map/world_map.png',
+                       help='Path to input map image')
+    parser.add_argument('--output', default='assets/map/collision_data.json',
+                       help='Path to output collision data JSON')
+    parser.add_argument('--js-output', default='src/collision_data.js',
+                       help='Path to output JavaScript module')
+    parser.add_argument('--visualize', action='store_true',
+                       help='Create visualization image')
+    parser.add_argument('--vis-output', default='assets/map/islands_debug.png',
+                       help='Path to visualization output')
+    parser.add_argument('--lod', action='store_true',
+                       help='Export a convex hull and a coarse outer polygon per island (each contains the finer level)')
+    parser.add_argument('--lod-epsilon', type=float, default=LOD_COARSE_EPSILON,
+                       help='Max distance (px) a coarse polygon edge may sit outside the detail coastline')
+    parser.add_argument('--lod-auto', action='store_true',
+                       help='With --lod: keep a level only on islands where it lowers the expected edges tested')
+    parser.add_argument('--broadphase', action='store_true',
+                       help='Export a uniform grid of coastline edges for fast land / line-of-sight queries')
+    parser.add_argument('--broadphase-cell', type=int, default=BROADPHASE_CELL_SIZE,
+                       help='Broadphase grid cell size in pixels')
+    parser.add_argument('--vis-tiles', default=None,
+                       help='Also write the visualization as a deep-zoom tile pyramid (.dzi index '
+                            'plus <name>_files/ PNG tiles) for browsing large maps')
+    parser.add_argument('--vis-tile-size', type=int, default=VIS_TILE_SIZE,
+                       help='Deep-zoom tile size (px)')
+    parser.add_argument('--binary-output', default=None,
+                       help='Path to compact binary islands/waypoints file, e.g. assets/map/collision_data.bin')
+    parser.add_argument('--js-binary', action='store_true',
+                       help='Write islands, waypoints and the broadphase grid into the JS output in the binary '
+                            'layout (base64) instead of JSON')
+    parser.add_argument('--clearance', action='store_true',
+                       help='Embed a quantized clearance (distance to shore) grid in the collision data')
+    parser.add_argument('--clearance-cell', type=int, default=CLEARANCE_CELL_SIZE,
+                       help='Clearance grid cell size in pixels')
+    parser.add_argument('--clearance-dtype', choices=sorted(CLEARANCE_ENCODINGS), default='uint8',
+                       help='Clearance grid encoding (uint8 = whole px over water, uint16 = signed 1/16px)')
+    parser.add_argument('--cache-dir', default=None,
+                       help='Reuse unchanged stage outputs from this directory (e.g. .bake_cache)')
+    parser.add_argument('--dirty', action='store_true',
+                       help='Only rebake islands near tiles that changed since the last bake in --cache-dir')
+    parser.add_argument('--labels-output', default=None,
+                       help='Base path for island label raster (writes <base>.npy and <base>.bin), '
+                            'e.g. assets/map/island_labels')
+    parser.add_argument('--prune-stretch', type=float, default=None,
+                       help='Drop connections whose ends stay within this route stretch (e.g. 1.1)')
+    parser.add_argument('--prune-sectors', type=int, default=0,
+                       help='With --prune-stretch, cap connections per angular sector (number of sectors)')
+    parser.add_argument('--prune-sector-degree', type=int, default=2,
+                       help='Connections kept per sector with --prune-sectors')
+    parser.add_argument('--routing', action='store_true',
+                       help='Bake all-pairs next-hop and distance tables into the collision data')
+    parser.add_argument('--routing-distance-dtype', choices=ROUTING_DISTANCE_DTYPES, default='float32',
+                       help='Routing distance table encoding (uint16 = quantized)')
+    parser.add_argument('--ports', default=None,
+                       help='JSON list of ports [{id, x, y, entryX?, entryY?}] (world space) to bake a route atlas for')
+    parser.add_argument('--hierarchy', action='store_true',
+                       help='Export a two-level (HPA*-style) cluster graph over the waypoints')
+    parser.add_argument('--cluster-size', type=int, default=HIERARCHY_CLUSTER_SIZE,
+                       help='Hierarchy cluster edge (px)')
+    parser.add_argument('--navmesh', action='store_true',
+                       help='Triangulate the water into a navmesh (triangles, adjacency, portals)')
+    parser.add_argument('--navmesh-max-edge', type=float, default=NAVMESH_MAX_EDGE,
+                       help='Longest coastline/border edge before triangulation (px)')
+    parser.add_argument('--water-lut', action='store_true',
+                       help='Classify water through a cached colour lookup table')
+    parser.add_argument('--water-rules', default=None,
+                       help='JSON water rule set or palette for map variants (implies --water-lut)')
+    parser.add_argument('--water-lut-bits', type=int, choices=range(4, 9), default=WATER_LUT_BITS,
+                       help='Lookup table bits per channel (8 = exact)')
+    parser.add_argument('--lut-cache-dir', default='.bake_cache',
+                       help='Directory for cached water lookup tables')
+    parser.add_argument('--tiled', action='store_true',
+                       help='Stream very large maps (PNG or .npy) through memory-mapped tiles')
+    parser.add_argument('--tile-size', type=int, default=TILE_SIZE,
+                       help='Tile edge in px for --tiled')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                       help='Worker threads for --tiled')
+    parser.add_argument('--scratch-dir', default='.bake_scratch',
+                       help='Directory for the memory-mapped working arrays of --tiled')
+    parser.add_argument('--keep-scratch', action='store_true',
+                       help='Keep the --tiled working arrays in --scratch-dir after the bake (deleted by default)')
+    parser.add_argument('--sweep', default=None,
+                       help='Bake every combination in a parameter grid JSON file and print a comparison table '
+                            '(uses --workers and --scratch-dir; nothing is exported)')
+    parser.add_argument('--sweep-output', default=None,
+                       help='Also write the --sweep table as CSV')
+    parser.add_argument('--params', default=None,
+                       help='Bake tuning parameters JSON ({name: value}, same names as --sweep grids)')
+    parser.add_argument('--watch', action='store_true',
+                       help='Keep running: rebake when the map or --params file changes, replace the outputs '
+                            'atomically and signal the game to hot-reload them')
+    parser.add_argument('--profile', nargs='?', const='bake_profile.json', default=None,
+                       help='Write a JSON report of wall/CPU time, peak traced memory per stage '
+                            'and work counters (default path: bake_profile.json)')
+    parser.add_argument('--profile-cprofile', default=None,
+                       help='With --profile: run stages under cProfile and dump the slowest '
+                            "stage's stats here (pstats format; inflates timings)")
+    
+    args = parser.parse_args()
+    if args.tiled and (args.dirty or args.cache_dir):
+        parser.error('--tiled cannot be combined with --dirty or --cache-dir')
+    if args.sweep and (args.tiled or args.dirty or args.profile):
+        parser.error('--sweep cannot be combined with --tiled, --dirty or --profile')
+    if args.sweep_output and not args.sweep:
+        parser.error('--sweep-output needs --sweep')
+    if args.keep_scratch and not args.tiled:
+        parser.error('--keep-scratch needs --tiled')
+    if args.lod_auto and not args.lod:
+        parser.error('--lod-auto needs --lod')
+    if args.js_binary and args.lod:
+        parser.error('--js-binary cannot be combined with --lod (the binary layout has no island levels)')
+    if args.params and (args.tiled or args.dirty or args.sweep):
+        parser.error('--params cannot be combined with --tiled, --dirty or --sweep')
+    if args.watch and (args.tiled or args.dirty or args.sweep or args.profile):
+        parser.error('--watch cannot be combined with --tiled, --dirty, --sweep or --profile')
+    if args.watch:
+        try:
+            game_url(hot_reload_path(args.js_output))
+        except ValueError as e:
+            parser.error(f'--js-output: {e}')
+    if args.profile_cprofile and not args.profile:
+        parser.error('--profile-cprofile needs --profile')
+    if args.profile:
+        PROFILER.enable(use_cprofile=bool(args.profile_cprofile))
+    
+    print("BOTA - Island Boundary Detection")
+    print("=" * 50)
+    cache = StageCache(args.cache_dir)
+    water_lut = None
+    if args.water_lut or args.water_rules:
+        PROFILER.start_stage('water_lut')
+        water_lut = load_water_lut(args.water_rules, args.water_lut_bits, StageCache(args.lut_cache_dir))
+    if args.sweep:
+        swept, configs = load_sweep_grid(args.sweep)
+        rows = run_parameter_sweep(args.input, configs, args.workers, args.scratch_dir, water_lut)
+        print()
+        print_sweep_table(rows, swept)
+        if args.sweep_output:
+            save_sweep_table(rows, args.sweep_output)
+        return
+    if args.watch:
+        watch_bake(args, StageCache(args.cache_dir or WATCH_CACHE_DIR), water_lut)
+        return
+    if args.tiled:
+        bake = run_tiled_bake(args.input, args.scratch_dir, args.tile_size, args.workers, water_lut)
+    elif args.dirty:
+        try:
+            bake = run_dirty_rebake(args.input, cache, water_lut)
+        except DirtyRebakeUnavailable as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    else:
+        params = load_bake_params(args.params) if args.params else BAKE_PARAMETERS
+        bake = run_bake_stages(args.input, cache, water_lut, params)
+    if args.cache_dir:
+        PROFILER.start_stage('manifest')
+        cache.save_manifest(bake)
+    try:
+        export_bake(args, bake)
+    except (ValueError, UnsnappablePort) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    if args.profile:
+        mode = 'tiled' if args.tiled else 'dirty' if args.dirty else 'full'
+        PROFILER.write_report(args.profile, {'input': args.input, 'mode': mode,
+                                             'width': bake['width'], 'height': bake['height']},
+                              args.profile_cprofile)
+    
+    # Drop the bake (and with it every scratch memmap) before deleting the backing files
+    if args.tiled and not args.keep_scratch:
+        del bake
+        remove_tiled_scratch(args.scratch_dir, args.input)
+    
     print("\n" + "=" * 50)
     print("Done! Collision data is ready for use in game.")
     print("\nUsage in JavaScript:")
@@ -3,6 +3,8 @@
 
 const Collision = {
     data: null,
+    broadphase: null,
+    clearance: null,
     loaded: false,
     
     // Alias for loaded (used in game.js)
@@ -18,17 +20,7 @@ const Collision = {
                 throw new Error('COLLISION_DATA not found - missing collision_data.js?');
             }
             
-            // AIDEV-NOTE: Collision data is already in world space (0,0 at center)
-            // No coordinate conversion needed - Python script outputs world space directly
-            this.data = COLLISION_DATA;
-            
-            this.loaded = true;
-            console.log(`Loaded ${this.data.islands.length} islands (world space coordinates)`);
-            
-            // Log waypoint count if available
-            if (this.data.waypoints) {
-                console.log(`Loaded ${this.data.waypoints.length} waypoints for pathfinding`);
-            }
+            this.setData(COLLISION_DATA);
         } catch (error) {
             console.error('Failed to load collision data:', error);
             this.loaded = false;
@@ -36,6 +28,85 @@ const Collision = {
         }
     },
 
+    // Install a collision data object (initial load and hot reloads)
+    setData(data) {
+        // AIDEV-NOTE: Collision data is already in world space (0,0 at center)
+        // No coordinate conversion needed - Python script outputs world space directly
+        let grid = data.broadphase ? this.decodeBroadphase(data.broadphase) : null;
+        if (data.binary) {
+            const unpacked = this.decodeBinary(data.binary);
+            grid = unpacked.broadphase;
+            data = Object.assign({}, data, { islands: unpacked.islands, waypoints: unpacked.waypoints });
+        }
+        this.data = data;
+        this.broadphase = grid ? this.buildBroadphase(grid, data.islands) : null;
+        this.clearance = data.clearance ? this.buildClearance(data.clearance, data.mapWidth, data.mapHeight) : null;
+        
+        this.loaded = true;
+        console.log(`Loaded ${data.islands.length} islands (world space coordinates)`);
+        
+        // Log waypoint count if available
+        if (data.waypoints) {
+            console.log(`Loaded ${data.waypoints.length} waypoints for pathfinding`);
+        }
+    },
+
+    // AIDEV-NOTE: Hot reload for editing sessions (detect_islands.py --watch). After every
+    // rebake the watcher rewrites src/collision_signal.js, a one-line script calling
+    // receiveRebakeSignal(version, dataUrl); the version changes only when the collision
+    // data does. A new version loads dataUrl, a script calling receiveRebakeData. Both are
+    // injected <script> tags like collision_data.js, so this also works from file://.
+    // Port Edit Mode starts/stops it; the game loop calls pollHotReload each frame.
+    // Pathfinding caches are keyed on the data object, so swapping it is enough.
+    HOT_RELOAD_SIGNAL_URL: 'src/collision_signal.js',
+    HOT_RELOAD_POLL_MS: 500,
+    hotReload: null, // { lastPoll, version } while following rebakes
+
+    startHotReload() {
+        this.hotReload = { lastPoll: -Infinity, version: null };
+    },
+
+    stopHotReload() {
+        this.hotReload = null;
+    },
+
+    pollHotReload(now) {
+        if (!this.hotReload || now - this.hotReload.lastPoll < this.HOT_RELOAD_POLL_MS) return;
+        this.hotReload.lastPoll = now;
+        this.injectScript(`${this.HOT_RELOAD_SIGNAL_URL}?t=${Math.round(now)}`);
+    },
+
+    // Load a script once and remove its tag; a missing script stops hot reload with one error
+    injectScript(url) {
+        const script = document.createElement('script');
+        script.src = url;
+        script.onload = () => script.remove();
+        script.onerror = () => {
+            script.remove();
+            if (!this.hotReload) return;
+            console.error(`Collision hot reload stopped: could not load ${url} ` +
+                          '(run detect_islands.py --watch, then toggle Port Edit Mode)');
+            this.stopHotReload();
+        };
+        document.head.appendChild(script);
+    },
+
+    receiveRebakeSignal(version, dataUrl) {
+        if (!this.hotReload || version === this.hotReload.version) return;
+        
+        // First signal only records the version the page started with
+        const first = this.hotReload.version === null;
+        this.hotReload.version = version;
+        if (!first) {
+            this.injectScript(`${dataUrl}?v=${version}`);
+        }
+    },
+
+    receiveRebakeData(version, data) {
+        this.setData(data);
+        console.log(`Hot-reloaded collision data (version ${version})`);
+    },
+
     // AIDEV-NOTE: Point-in-polygon test using ray casting algorithm
     // Returns true if point is inside the polygon
     pointInPolygon(x, y, polygon) {
@@ -76,9 +147,249 @@ const Collision = {
                y <= bounds.maxY;
     },
 
+    // AIDEV-NOTE: Broadphase -> narrowphase land test against one island.
+    // Islands baked with --lod carry island.lod.hull and island.lod.coarse (with --lod-auto
+    // only the levels build_island_lods in detect_islands.py finds lower the expected
+    // edges tested for a point in the island's bounds). Each level contains the
+    // finer ones, so a point outside any of them is on water, and only points near the
+    // coastline reach the detailed polygon.
+    pointOnIsland(x, y, island) {
+        if (!this.pointInBounds(x, y, island.bounds)) {
+            return false;
+        }
+        const lod = island.lod;
+        if (lod) {
+            if (lod.hull && !this.pointInPolygon(x, y, lod.hull)) {
+                return false;
+            }
+            if (lod.coarse && !this.pointInPolygon(x, y, lod.coarse)) {
+                return false;
+            }
+        }
+        return this.pointInPolygon(x, y, island.polygon);
+    },
+
+    // AIDEV-NOTE: Broadphase grid (detect_islands.py --broadphase). Each cell lists the
+    // polygon edges touching it and the island (-1 = water) at a fixed reference point
+    // inside it. Edge ids index the island polygons' points concatenated in id order.
+    decodeBroadphase(encoded) {
+        return {
+            cellSize: encoded.cellSize,
+            columns: encoded.columns,
+            rows: encoded.rows,
+            originX: encoded.originX,
+            originY: encoded.originY,
+            refX: encoded.refX,
+            refY: encoded.refY,
+            cellIslands: new Int32Array(this.decodeBase64(encoded.cellIslands)),
+            cellOffsets: new Uint32Array(this.decodeBase64(encoded.cellOffsets)),
+            cellEdges: new Uint32Array(this.decodeBase64(encoded.cellEdges))
+        };
+    },
+
+    // Add the coastline edge table to a decoded grid
+    buildBroadphase(grid, islands) {
+        let edgeCount = 0;
+        for (const island of islands) {
+            edgeCount += island.polygon.length;
+        }
+        const edges = new Float64Array(edgeCount * 4); // ax, ay, bx, by per edge
+        const edgeIslands = new Int32Array(edgeCount);
+        let e = 0;
+        for (const island of islands) {
+            const polygon = island.polygon;
+            for (let i = 0; i < polygon.length; i++, e++) {
+                const a = polygon[i];
+                const b = polygon[(i + 1) % polygon.length];
+                edges.set([a[0], a[1], b[0], b[1]], e * 4);
+                edgeIslands[e] = island.id;
+            }
+        }
+        
+        return Object.assign({}, grid, { edges, edgeIslands });
+    },
+
+    // Base64 text to an ArrayBuffer. Views over it assume a little-endian host (every
+    // browser host), which is how detect_islands.py bakes typed data.
+    decodeBase64(text) {
+        const binary = atob(text);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return bytes.buffer;
+    },
+
+    // AIDEV-NOTE: Binary collision layout (detect_islands.py --js-binary; see the
+    // COLLISION_BIN_* constants there). A 32-byte header [magic 'BOTC', u16 version,
+    // u16 flags, u32 x 6 counts] is followed by a table of (offset, byteLength) u32 pairs,
+    // one per section below. Sections start 8-byte aligned, so each is viewed in place as
+    // a typed array. Coordinates are int16 when flag bit 0 is set, else float32.
+    BINARY_MAGIC: 'BOTC',
+    BINARY_VERSION: 2,
+    BINARY_HEADER_BYTES: 32,
+    BINARY_SECTIONS: ['islandOffsets', 'islandBounds', 'points', 'waypoints', 'adjacencyOffsets', 'adjacency',
+                      'broadphaseGrid', 'cellIslands', 'cellOffsets', 'cellEdges'],
+
+    // Unpack { islands, waypoints, broadphase } in the JSON shapes (broadphase decoded)
+    decodeBinary(text) {
+        const sections = this.binarySections(this.decodeBase64(text));
+        const grid = sections.broadphaseGrid;
+        return {
+            islands: this.binaryIslands(sections),
+            waypoints: sections.waypoints.length ? this.binaryWaypoints(sections) : undefined,
+            broadphase: grid.length ? {
+                cellSize: grid[0], columns: grid[1], rows: grid[2], originX: grid[3], originY: grid[4],
+                refX: grid[5], refY: grid[6], cellIslands: sections.cellIslands,
+                cellOffsets: sections.cellOffsets, cellEdges: sections.cellEdges
+            } : null
+        };
+    },
+
+    // Typed array views over every section of a binary collision buffer
+    binarySections(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (magic !== this.BINARY_MAGIC || view.getUint16(4, true) !== this.BINARY_VERSION) {
+            throw new Error(`Unsupported binary collision data (${magic} v${view.getUint16(4, true)})`);
+        }
+        const Coord = view.getUint16(6, true) & 1 ? Int16Array : Float32Array;
+        const types = [Uint32Array, Coord, Coord, Coord, Uint32Array, Uint32Array,
+                       Float64Array, Int32Array, Uint32Array, Uint32Array];
+        const sections = {};
+        this.BINARY_SECTIONS.forEach((name, k) => {
+            const offset = view.getUint32(this.BINARY_HEADER_BYTES + 8 * k, true);
+            const byteLength = view.getUint32(this.BINARY_HEADER_BYTES + 8 * k + 4, true);
+            sections[name] = new types[k](buffer, offset, byteLength / types[k].BYTES_PER_ELEMENT);
+        });
+        return sections;
+    },
+
+    binaryIslands(sections) {
+        const { islandOffsets, islandBounds, points } = sections;
+        const islands = [];
+        for (let i = 0; i + 1 < islandOffsets.length; i++) {
+            const polygon = [];
+            for (let p = islandOffsets[i]; p < islandOffsets[i + 1]; p++) {
+                polygon.push([points[2 * p], points[2 * p + 1]]);
+            }
+            const b = islandBounds.subarray(4 * i, 4 * i + 4);
+            const bounds = { minX: b[0], maxX: b[2], minY: b[1], maxY: b[3] };
+            islands.push({ id: i, polygon, bounds, area: polygon.length });
+        }
+        return islands;
+    },
+
+    binaryWaypoints(sections) {
+        const { waypoints, adjacencyOffsets, adjacency } = sections;
+        const result = [];
+        for (let i = 0; i < waypoints.length / 2; i++) {
+            const connections = Array.from(adjacency.subarray(adjacencyOffsets[i], adjacencyOffsets[i + 1]));
+            result.push({ id: i, x: waypoints[2 * i], y: waypoints[2 * i + 1], connections });
+        }
+        return result;
+    },
+
+    // AIDEV-NOTE: Clearance grid (detect_islands.py --clearance): distance to shore sampled
+    // at the centre of every cellSize px cell, quantized as
+    // distance = (value - zeroLevel) * step (uint8 clamps land to 0, uint16 keeps it negative).
+    buildClearance(encoded, mapWidth, mapHeight) {
+        const ArrayType = encoded.dtype === 'uint16' ? Uint16Array : Uint8Array;
+        
+        return {
+            cellSize: encoded.cellSize,
+            columns: encoded.columns,
+            rows: encoded.rows,
+            // World position of cell (0, 0)'s sample
+            originX: Math.floor(encoded.cellSize / 2) - mapWidth / 2,
+            originY: Math.floor(encoded.cellSize / 2) - mapHeight / 2,
+            step: encoded.step,
+            zeroLevel: encoded.zeroLevel,
+            values: new ArrayType(this.decodeBase64(encoded.values))
+        };
+    },
+
+    // AIDEV-NOTE: Distance to shore (px, negative on land with uint16 grids) and its
+    // gradient at a world point, bilinear between cell samples (clamped at the map edge).
+    // The gradient points away from the nearest shore, so steering along it moves a boat
+    // into open water. Returns null without a baked clearance grid.
+    clearanceAt(x, y) {
+        const grid = this.clearance;
+        if (!grid) return null;
+        
+        const gx = Math.min(Math.max((x - grid.originX) / grid.cellSize, 0), grid.columns - 1);
+        const gy = Math.min(Math.max((y - grid.originY) / grid.cellSize, 0), grid.rows - 1);
+        const cx = Math.min(Math.floor(gx), grid.columns - 2);
+        const cy = Math.min(Math.floor(gy), grid.rows - 2);
+        const fx = gx - cx;
+        const fy = gy - cy;
+        const sample = (column, row) => (grid.values[row * grid.columns + column] - grid.zeroLevel) * grid.step;
+        const d00 = sample(cx, cy), d10 = sample(cx + 1, cy);
+        const d01 = sample(cx, cy + 1), d11 = sample(cx + 1, cy + 1);
+        
+        const top = d00 + (d10 - d00) * fx;
+        const bottom = d01 + (d11 - d01) * fx;
+        return {
+            distance: top + (bottom - top) * fy,
+            gradX: ((d10 - d00) * (1 - fy) + (d11 - d01) * fy) / grid.cellSize,
+            gradY: (bottom - top) / grid.cellSize
+        };
+    },
+
+    // AIDEV-NOTE: Island ID at a point, null on water.
+    // With a broadphase grid the point is reached from its cell's reference point: that
+    // segment stays inside the cell, so only the cell's edges can cross it, and each
+    // crossing toggles in or out of the edge's island (half-open side tests, so a vertex
+    // on the segment counts once). Mirrors broadphase_island_at in detect_islands.py.
+    // Without one, every island is tested (bounds, levels of detail, polygon).
+    islandAt(x, y) {
+        const grid = this.broadphase;
+        if (!grid) {
+            for (const island of this.data.islands) {
+                if (this.pointOnIsland(x, y, island)) {
+                    return island.id;
+                }
+            }
+            return null;
+        }
+        
+        const cx = Math.floor((x - grid.originX) / grid.cellSize);
+        const cy = Math.floor((y - grid.originY) / grid.cellSize);
+        if (cx < 0 || cy < 0 || cx >= grid.columns || cy >= grid.rows) {
+            return null; // Off the map
+        }
+        const cell = cy * grid.columns + cx;
+        const rx = grid.originX + (cx + grid.refX) * grid.cellSize;
+        const ry = grid.originY + (cy + grid.refY) * grid.cellSize;
+        const ux = x - rx;
+        const uy = y - ry;
+        const edges = grid.edges;
+        
+        const inside = grid.cellIslands[cell] >= 0 ? [grid.cellIslands[cell]] : [];
+        for (let k = grid.cellOffsets[cell]; k < grid.cellOffsets[cell + 1]; k++) {
+            const e = grid.cellEdges[k];
+            const ax = edges[4 * e], ay = edges[4 * e + 1], bx = edges[4 * e + 2], by = edges[4 * e + 3];
+            if ((ux * (ay - ry) - uy * (ax - rx) > 0) === (ux * (by - ry) - uy * (bx - rx) > 0)) {
+                continue;
+            }
+            const vx = bx - ax;
+            const vy = by - ay;
+            if ((vx * (ry - ay) - vy * (rx - ax) > 0) === (vx * (y - ay) - vy * (x - ax) > 0)) {
+                continue;
+            }
+            const at = inside.indexOf(grid.edgeIslands[e]);
+            if (at >= 0) {
+                inside.splice(at, 1);
+            } else {
+                inside.push(grid.edgeIslands[e]);
+            }
+        }
+        return inside.length ? Math.min(...inside) : null;
+    },
+
     // AIDEV-NOTE: Check if a point is on land
     // Returns island ID if on land, null if on water
-    // Uses bounding box test first for performance
+    // Uses the broadphase grid when baked, else bounding box tests first
     // padding: additional radius to check around the point (considers "near land" as on land)
     isOnLand(x, y, padding = 0) {
         if (!this.loaded) {
@@ -88,19 +399,7 @@ const Collision = {
 
         // If no padding, do simple point test
         if (padding <= 0) {
-            // Test each island
-            for (const island of this.data.islands) {
-                // Quick rejection using bounding box
-                if (!this.pointInBounds(x, y, island.bounds)) {
-                    continue;
-                }
-                
-                // Precise test using polygon
-                if (this.pointInPolygon(x, y, island.polygon)) {
-                    return island.id;
-                }
-            }
-            return null; // On water
+            return this.islandAt(x, y);
         }
         
         // With padding, check center and 8 points around it in a circle
@@ -118,13 +417,9 @@ const Collision = {
         
         // Check if any test point is on land
         for (const point of testPoints) {
-            for (const island of this.data.islands) {
-                if (!this.pointInBounds(point.x, point.y, island.bounds)) {
-                    continue;
-                }
-                if (this.pointInPolygon(point.x, point.y, island.polygon)) {
-                    return island.id;
-                }
+            const islandId = this.islandAt(point.x, point.y);
+            if (islandId !== null) {
+                return islandId;
             }
         }
         
@@ -332,9 +627,13 @@ const Collision = {
 
     // AIDEV-NOTE: Get distance to nearest land from water point
     // Useful for keeping boats from getting too close to shore
+    // One grid lookup with a baked clearance grid, else a polygon edge scan
     distanceToLand(x, y) {
         if (!this.loaded) return Infinity;
         if (this.isOnLand(x, y) !== null) return 0;
+        if (this.clearance) {
+            return Math.max(this.clearanceAt(x, y).distance, 0);
+        }
         
         let minDist = Infinity;
         
@@ -459,6 +459,7 @@ const Game = {
                 // Handle port editing or normal gameplay
                 if (this.debug.portEditMode) {
                     this.handlePortDragInput();
+                    Collision.pollHotReload(performance.now());
                 } else {
                     this.handleClickInput();
                 }
@@ -28,12 +28,61 @@ const Pathfinding = {
             return [];
         }
         
-        // Run A* algorithm
+        // Follow baked next-hop tables when available, otherwise run A*
+        const routing = this.getRoutingTables(collision);
+        if (routing) {
+            return this.tableRoute(startWP.id, endWP.id, routing);
+        }
         const path = this.astar(startWP.id, endWP.id, waypoints);
         
         return path;
     },
     
+    // AIDEV-NOTE: Baked routing tables (detect_islands.py --routing) turn a route into a
+    // chain of next-hop lookups. nextHop is a row-major [from][to] uint16 matrix, stored
+    // base64 little-endian; it is decoded once and cached per collision data object.
+    routingTables: null,
+    
+    getRoutingTables(collision) {
+        const routing = collision.data && collision.data.routing;
+        if (!routing) return null;
+        
+        if (!this.routingTables || this.routingTables.source !== routing) {
+            this.routingTables = {
+                source: routing,
+                count: routing.count,
+                unreachable: routing.unreachable,
+                nextHop: this.decodeUint16(routing.nextHop)
+            };
+        }
+        return this.routingTables;
+    },
+    
+    // AIDEV-NOTE: Decode a base64 little-endian uint16 array
+    decodeUint16(encoded) {
+        const binary = atob(encoded);
+        const values = new Uint16Array(binary.length / 2);
+        for (let i = 0; i < values.length; i++) {
+            values[i] = binary.charCodeAt(2 * i) | (binary.charCodeAt(2 * i + 1) << 8);
+        }
+        return values;
+    },
+    
+    // AIDEV-NOTE: Walk next hops from start to end
+    // Returns array of waypoint IDs like astar(), or null if end is unreachable
+    tableRoute(startId, endId, routing) {
+        const path = [startId];
+        let current = startId;
+        
+        while (current !== endId) {
+            current = routing.nextHop[current * routing.count + endId];
+            if (current === routing.unreachable) return null;
+            path.push(current);
+        }
+        
+        return path;
+    },
+    
     // AIDEV-NOTE: Find nearest waypoint to given position
     // Only considers waypoints that have line-of-sight to position
     findNearestWaypoint(x, y, waypoints, collision) {
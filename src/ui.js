@@ -483,6 +483,7 @@ const UI = {
                 if (debugOptions.portEditMode) {
                     debugOptions.portEditMode = false;
                     this.hidePortEditWindow();
+                    Collision.stopHotReload();
                 }
                 
                 // Update all toggle button states
@@ -512,11 +513,13 @@ const UI = {
             }
         });
         this.addDebugToggle(content, 'Port Edit Mode', debugOptions, 'portEditMode', (isActive) => {
-            // Show or hide port edit window
+            // Show or hide port edit window, and follow collision rebakes while editing
             if (isActive) {
                 this.showPortEditWindow();
+                Collision.startHotReload();
             } else {
                 this.hidePortEditWindow();
+                Collision.stopHotReload();
             }
         });
 
@@ -0,0 +1,276 @@
+"""
+Regression tests for the island bake, run on a small synthetic map.
+
+Run with: python -m pytest tests
+"""
+
+import base64
+import contextlib
+import copy
+import json
+import math
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+import detect_islands as di
+from bench_bake import synthetic_map
+
+# AIDEV-NOTE: One small rough map is baked once per test module. Its islands are large
+# enough (> 5000 px²) for the bisector push and kink removal paths to run.
+MAP_SIZE = 640
+MAP_ISLANDS = 6
+MAP_ROUGHNESS = 0.6
+MAP_SEED = 3
+
+@pytest.fixture(scope='module')
+def bake():
+    """Water mask, contours, labels and exported collision data for the synthetic map."""
+    img = synthetic_map(MAP_SIZE, MAP_ISLANDS, MAP_ROUGHNESS, MAP_SEED)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        contours = di.find_island_contours(di.detect_water(img))
+        water_mask = di.create_water_mask_from_polygons(contours, MAP_SIZE, MAP_SIZE)
+        labels = di.create_island_label_map(contours, MAP_SIZE, MAP_SIZE)
+        graph = di.generate_waypoints(contours, water_mask, labels, MAP_SIZE, MAP_SIZE)
+        graph = di.calculate_waypoint_connections(graph, water_mask)
+        data = di.generate_collision_data(contours, MAP_SIZE, MAP_SIZE, di.waypoint_dicts(graph))
+        data['broadphase'] = di.encode_broadphase_grid(di.build_broadphase_grid(data))
+    return {'contours': contours, 'water_mask': water_mask, 'labels': labels, 'data': data}
+
+# Reference implementations: the scalar loops the batched kernels replaced
+
+def reference_line_of_sight(x0, y0, x1, y1, water_mask, reach, include_start, include_end):
+    dx, dy = x1 - x0, y1 - y0
+    num_samples = int(math.sqrt(dx * dx + dy * dy) * reach / di.LOS_SAMPLE_INTERVAL) + 1
+    for k in range(0 if include_start else 1, num_samples + 1 if include_end else num_samples):
+        t = (k / num_samples) * reach
+        test_x, test_y = int(x0 + dx * t), int(y0 + dy * t)
+        if not (0 <= test_x < water_mask.shape[1] and 0 <= test_y < water_mask.shape[0]):
+            return False
+        if not water_mask[test_y, test_x]:
+            return False
+    return True
+
+def reference_push(x, y, prev, following, centroid, push_distance, water_mask, visibility_pct):
+    def valid(test_x, test_y):
+        if not (0 <= test_x < water_mask.shape[1] and 0 <= test_y < water_mask.shape[0]):
+            return False
+        if not water_mask[test_y, test_x]:
+            return False
+        return all(reference_line_of_sight(test_x, test_y, nx, ny, water_mask, visibility_pct, False, True)
+                   for nx, ny in (prev, following) if (nx, ny) != (test_x, test_y))
+
+    def unit(vx, vy):
+        length = math.sqrt(vx * vx + vy * vy)
+        return (vx / length, vy / length) if length > 0.1 else None
+
+    center = unit(x - centroid[0], y - centroid[1])
+    v1 = unit(prev[0] - x, prev[1] - y) or (0.0, 0.0)
+    v2 = unit(following[0] - x, following[1] - y) or (0.0, 0.0)
+    direction = unit(v1[0] + v2[0], v1[1] + v2[1])
+    if direction is not None:
+        cross = (x - prev[0]) * (following[1] - y) - (y - prev[1]) * (following[0] - x)
+        if cross < 0:
+            direction = (-direction[0], -direction[1])
+    else:
+        direction = center
+
+    for attempt in (direction, center):
+        if attempt is None:
+            continue
+        new_x, new_y = int(x + attempt[0] * push_distance), int(y + attempt[1] * push_distance)
+        if valid(new_x, new_y):
+            return new_x, new_y, True
+    return x, y, False
+
+def reference_remove_kinks(points, kink_threshold):
+    cleaned = []
+    n = len(points)
+    for i in range(n):
+        p0, p1, p2 = points[(i - 1) % n], points[i], points[(i + 1) % n]
+        v1 = (p1[0] - p0[0], p1[1] - p0[1])
+        v2 = (p2[0] - p1[0], p2[1] - p1[1])
+        len1 = math.sqrt(v1[0] ** 2 + v1[1] ** 2)
+        len2 = math.sqrt(v2[0] ** 2 + v2[1] ** 2)
+        if len1 < 1 or len2 < 1:
+            continue
+        dot = (v1[0] / len1) * (v2[0] / len2) + (v1[1] / len1) * (v2[1] / len2)
+        if abs(dot) < kink_threshold or (len1 > 8 and len2 > 8):
+            cleaned.append(p1)
+    return cleaned if len(cleaned) >= 4 else points
+
+def random_rings(rng, count, max_points, span):
+    """Jagged integer rings (random walks with short, repeated and long steps)."""
+    rings = []
+    for _ in range(count):
+        steps = rng.integers(-12, 13, size=(int(rng.integers(3, max_points)), 2))
+        steps[rng.random(len(steps)) < 0.1] = 0
+        rings.append(np.cumsum(steps, axis=0) + rng.integers(0, span, size=2))
+    return rings
+
+# File formats
+
+@pytest.mark.parametrize('shift', [0.0, 0.25])
+def test_collision_binary_round_trip(bake, tmp_path, shift):
+    """int16 (integral) and float32 (fractional) coordinates both load back unchanged."""
+    data = copy.deepcopy(bake['data'])
+    for island in data['islands']:
+        island['polygon'] = [[x + shift, y + shift] for x, y in island['polygon']]
+        island['bounds'] = {key: value + shift for key, value in island['bounds'].items()}
+    for wp in data['waypoints']:
+        wp['x'] += shift
+        wp['y'] += shift
+
+    path = str(tmp_path / 'collision.bin')
+    di.save_collision_binary(data, path)
+    loaded = di.load_collision_binary(path)
+
+    assert (loaded['mapWidth'], loaded['mapHeight']) == (data['mapWidth'], data['mapHeight'])
+    assert [i['polygon'] for i in loaded['islands']] == [i['polygon'] for i in data['islands']]
+    assert [i['bounds'] for i in loaded['islands']] == [i['bounds'] for i in data['islands']]
+    assert [(wp['x'], wp['y'], wp['connections']) for wp in loaded['waypoints']] == \
+           [(wp['x'], wp['y'], wp['connections']) for wp in data['waypoints']]
+    assert loaded['broadphase'] == data['broadphase']
+
+def test_collision_binary_rejects_bad_magic(tmp_path):
+    path = tmp_path / 'collision.bin'
+    path.write_bytes(b'NOPE' + bytes(60))
+    with pytest.raises(ValueError):
+        di.load_collision_binary(str(path))
+
+def test_collision_js_binary_embeds_binary_file(bake, tmp_path):
+    """--js-binary carries the .bin bytes (base64) and keeps the other keys as JSON."""
+    data = dict(bake['data'], routing={'count': 0})
+    js_path, bin_path = tmp_path / 'collision.js', tmp_path / 'collision.bin'
+    di.save_collision_js(data, str(js_path), binary=True)
+    di.save_collision_binary(data, str(bin_path))
+
+    module = json.loads(js_path.read_text().split('const COLLISION_DATA = ', 1)[1].rstrip().rstrip(';'))
+    assert base64.b64decode(module.pop('binary')) == bin_path.read_bytes()
+    assert module == {'mapWidth': MAP_SIZE, 'mapHeight': MAP_SIZE, 'routing': {'count': 0}}
+
+def test_label_rle_round_trip(bake, tmp_path):
+    base = str(tmp_path / 'island_labels')
+    meta = di.save_island_labels(bake['labels'], base)
+
+    decoded = di.load_island_labels_rle(base + '.bin')
+    assert decoded.dtype == bake['labels'].dtype
+    assert np.array_equal(decoded, bake['labels'])
+    assert np.array_equal(np.load(base + '.npy'), bake['labels'])
+    assert (meta['width'], meta['height']) == (MAP_SIZE, MAP_SIZE)
+
+def test_label_rle_round_trip_uint16(tmp_path):
+    """More than 255 islands switch the raster to uint16."""
+    rng = np.random.default_rng(0)
+    labels = np.repeat(rng.integers(0, 300, size=(37, 8)), rng.integers(1, 9, size=8), axis=1)
+    labels = labels.astype(di.island_label_dtype(299))
+    base = str(tmp_path / 'island_labels')
+    di.save_island_labels(labels, base)
+    assert np.array_equal(di.load_island_labels_rle(base + '.bin'), labels)
+
+# Vectorized kernels vs the reference loops
+
+@pytest.mark.parametrize('reach, include_start, include_end',
+                         [(1.0, True, True), (0.75, False, True), (1.0, True, False), (0.9, False, False)])
+def test_batch_line_of_sight_matches_per_pair_loop(bake, monkeypatch, reach, include_start, include_end):
+    # A small batch limit exercises the batch boundaries too
+    monkeypatch.setattr(di, 'LOS_BATCH_SAMPLES', 97)
+    rng = np.random.default_rng(1)
+    water_mask = bake['water_mask']
+    x0, y0, x1, y1 = rng.integers(-20, MAP_SIZE + 20, size=(4, 2000))
+    x1[:50], y1[:50] = x0[:50], y0[:50]  # Zero-length segments
+
+    visible = di.batch_line_of_sight(x0, y0, x1, y1, water_mask, reach, include_start, include_end)
+    expected = [reference_line_of_sight(*segment, water_mask, reach, include_start, include_end)
+                for segment in zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())]
+    assert visible.tolist() == expected
+    assert 0 < sum(expected) < len(expected)
+
+@pytest.mark.parametrize('radius', [7.5, 40, 300])
+def test_find_pairs_within_radius_matches_brute_force(radius):
+    rng = np.random.default_rng(2)
+    xs = np.concatenate([rng.integers(0, 400, 400), [10, 10, 10 + 40]]).astype(np.float64)
+    ys = np.concatenate([rng.uniform(-50, 350, 400), [5, 5, 5]])  # Duplicates and an exact-radius pair
+
+    pair_i, pair_j = di.find_pairs_within_radius(xs, ys, radius)
+    expected = [(i, j) for i in range(len(xs)) for j in range(i + 1, len(xs))
+                if np.sqrt((xs[j] - xs[i]) ** 2 + (ys[j] - ys[i]) ** 2) <= radius]
+    assert list(zip(pair_i.tolist(), pair_j.tolist())) == expected
+
+def test_find_pairs_within_radius_single_point():
+    pair_i, pair_j = di.find_pairs_within_radius(np.array([1.0]), np.array([2.0]), 10)
+    assert len(pair_i) == len(pair_j) == 0
+
+@pytest.mark.parametrize('push_distance, visibility_pct', list(zip(di.PUSH_DISTANCES, di.PUSH_VISIBILITY)))
+def test_push_rings_out_matches_sequential_walk(bake, push_distance, visibility_pct):
+    contours = bake['contours']
+    water_mask = bake['water_mask']
+    xs = np.array([p[0] for contour in contours for p in contour], dtype=np.int64)
+    ys = np.array([p[1] for contour in contours for p in contour], dtype=np.int64)
+    offsets = np.cumsum([0] + [len(contour) for contour in contours])
+    rings = [np.arange(start, end, dtype=np.int64) for start, end in zip(offsets[:-1], offsets[1:])]
+    centroids = [(sum(p[0] for p in contour) / len(contour), sum(p[1] for p in contour) / len(contour))
+                 for contour in contours]
+
+    # Reference: walk each ring in order, moving waypoints in place
+    ref_x, ref_y = xs.tolist(), ys.tolist()
+    ref_success = []
+    for ring, centroid in zip(rings, centroids):
+        ring = ring.tolist()
+        for k, i in enumerate(ring):
+            p, f = ring[k - 1], ring[(k + 1) % len(ring)]
+            ref_x[i], ref_y[i], pushed = reference_push(ref_x[i], ref_y[i], (ref_x[p], ref_y[p]), (ref_x[f], ref_y[f]),
+                                                        centroid, push_distance, water_mask, visibility_pct)
+            ref_success.append(pushed)
+
+    success = di.push_rings_out(xs, ys, rings, centroids, push_distance, water_mask, visibility_pct)
+    assert xs.tolist() == ref_x
+    assert ys.tolist() == ref_y
+    assert success.tolist() == ref_success
+    assert 0 < sum(ref_success) < len(ref_success)
+
+def test_remove_kinks_matches_per_vertex_loop(bake):
+    rng = np.random.default_rng(4)
+    polygons = random_rings(rng, 200, 40, 1000) + [np.array(c, dtype=np.int64) for c in bake['contours']]
+
+    cleaned = di.remove_kinks(polygons, di.KINK_DOT_THRESHOLD)
+    expected = [reference_remove_kinks(polygon.tolist(), di.KINK_DOT_THRESHOLD) for polygon in polygons]
+    assert [polygon.tolist() for polygon in cleaned] == expected
+    assert any(len(e) < len(p) for e, p in zip(expected, polygons))
+    assert any(e == p.tolist() and len(p) >= 4 for e, p in zip(expected, polygons))
+
+def test_ring_areas_match_contour_area(bake):
+    rng = np.random.default_rng(5)
+    rings = random_rings(rng, 200, 60, 30000) + [np.array(c, dtype=np.int64) for c in bake['contours']]
+
+    areas = di.ring_areas(rings)
+    expected = [cv2.contourArea(ring.astype(np.int32).reshape(-1, 1, 2)) for ring in rings]
+    assert areas.tolist() == expected
+
+def test_routing_tables_without_waypoints():
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        next_hop, distance = di.compute_routing_tables([])
+        routing = di.encode_routing_tables(next_hop, distance, 'uint16')
+    assert next_hop.shape == distance.shape == (0, 0)
+    assert routing['count'] == 0
+
+def test_routing_tables_reject_too_many_waypoints():
+    waypoints = [{'x': 0, 'y': 0, 'connections': []}] * di.ROUTING_UNREACHABLE
+    with pytest.raises(ValueError, match='at most'):
+        di.all_pairs_shortest_paths(waypoints)
+
+def test_route_atlas_rejects_port_far_inland(bake):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        clearance = di.compute_clearance_field(bake['water_mask'])
+    y, x = np.unravel_index(np.argmin(clearance), clearance.shape)
+    assert clearance[y, x] < -di.PORT_SNAP_DISTANCE
+    ports = [{'id': 'inland', 'x': float(x), 'y': float(y)}]
+    with pytest.raises(di.UnsnappablePort, match='inland'):
+        di.build_route_atlas(ports, bake['data']['waypoints'], bake['water_mask'], clearance,
+                             di.clearance_gradient(clearance), MAP_SIZE, MAP_SIZE)